@@ -0,0 +1,91 @@
+"""Benchmarks of the JSON decoders API responses can be decoded with.
+
+Run from the repository root:
+
+  python -m benchmarks.decoders [--save-baseline]
+
+Every installed decoder of pydrive.model.AUTO_DECODERS decodes files.list
+pages of 1000 files, as returned by the fake Drive, through the model of the
+service. 'list_1000' lists such a page through a GoogleDrive using each
+decoder, to show their share of a whole listing. Results are compared to the
+baselines in decoders.json, see benchmarks.throughput.
+"""
+import json
+import os
+import sys
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.model import AUTO_DECODERS
+from pydrive.model import DriveJsonModel
+from pydrive.model import LoadDecoder
+
+from .harness import Main
+from .harness import Measure
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'decoders.json')
+PAGE_SIZE = 1000
+
+
+def _Fake(count):
+  """Returns a fake holding 'count' files with typical metadata."""
+  fake = FakeDrive()
+  for i in range(count):
+    fake.AddFile({
+        'title': u'Quarterly report %d été.docx' % i,
+        'description': 'Shared with the finance team, revision %d.' % i,
+        'mimeType': 'application/vnd.openxmlformats-officedocument.'
+                    'wordprocessingml.document',
+        'owners': [{'kind': 'drive#user', 'displayName': 'Ann Example',
+                    'emailAddress': 'ann@example.com', 'isAuthenticatedUser':
+                    True, 'permissionId': '0123456789'}],
+        'properties': [{'key': 'project', 'value': 'p%d' % (i % 10)}],
+    })
+  return fake
+
+
+def DecodePage(decoder, repeat):
+  def Benchmark(args):
+    fake = _Fake(PAGE_SIZE)
+    page = json.dumps({'kind': 'drive#fileList', 'etag': '"etag"',
+                       'items': list(fake.files.values())}).encode('utf-8')
+    model = DriveJsonModel(decoder)
+    return Measure(lambda: model.deserialize(page), repeat=repeat,
+                   size=len(page))
+  return Benchmark
+
+
+def ListPage(decoder, repeat):
+  def Benchmark(args):
+    fake = _Fake(PAGE_SIZE)
+    if args.serve:
+      fake.Serve()
+    gauth = GoogleAuth()
+    gauth.json_decoder = decoder
+    drive = GoogleDrive(fake.Authorize(gauth))
+
+    def List():
+      assert len(drive.ListFile({'maxResults': PAGE_SIZE}).GetList()) == \
+          PAGE_SIZE
+    return Measure(List, repeat=repeat)
+  return Benchmark
+
+
+def _Installed():
+  for name in AUTO_DECODERS:
+    try:
+      LoadDecoder(name)
+    except ImportError:
+      continue
+    yield name
+
+
+BENCHMARKS = []
+for _name in _Installed():
+  BENCHMARKS.append(('decode_page_1000_%s' % _name, DecodePage(_name, 100)))
+  BENCHMARKS.append(('list_1000_%s' % _name, ListPage(_name, 20)))
+
+
+if __name__ == '__main__':
+  sys.exit(Main(BENCHMARKS, BASELINE_FILE, description=__doc__))
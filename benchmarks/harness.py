@@ -0,0 +1,181 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+_clock = getattr(time, 'perf_counter', time.time)
+# Relative change of a metric, against its baseline, reported as a regression.
+DEFAULT_THRESHOLD = 0.2
+
+
+class Result(object):
+  """Metrics of one benchmark.
+
+  'metrics' maps the name of every metric to its value, and 'lower_is_better'
+  names the metrics for which smaller values are better.
+  """
+
+  def __init__(self, metrics, lower_is_better=(), name=None):
+    self.name = name
+    self.metrics = metrics
+    self.lower_is_better = set(lower_is_better)
+
+  def Compare(self, baseline, threshold):
+    """Returns a message for every metric worse than baseline by threshold.
+
+    :param baseline: metrics of the baseline run.
+    :type baseline: dict.
+    :param threshold: relative change tolerated, e.g. 0.2 for 20%.
+    :type threshold: float.
+    :returns: list -- the regressions found.
+    """
+    regressions = []
+    for metric, value in sorted(self.metrics.items()):
+      expected = baseline.get(metric)
+      if not expected:
+        continue
+      change = (value - expected) / float(expected)
+      worse = change if metric in self.lower_is_better else -change
+      if worse > threshold:
+        regressions.append('%s %s: %.4g, baseline %.4g (%+.0f%%)' % (
+            self.name, metric, value, expected, change * 100))
+    return regressions
+
+
+def Measure(function, repeat=10, warmup=1, size=0, setup=None):
+  """Times repeated calls of function.
+
+  :param function: the operation to time, called with the return value of
+    setup if it is given.
+  :type function: callable.
+  :param repeat: number of timed calls.
+  :type repeat: int.
+  :param warmup: number of calls made before timing.
+  :type warmup: int.
+  :param size: number of bytes each call transfers.
+  :type size: int.
+  :param setup: called, untimed, before every call of function.
+  :type setup: callable.
+  :returns: Result -- ops/s, p50 and p99 latency in seconds, and bytes/s.
+  """
+  samples = []
+  for i in range(warmup + repeat):
+    args = (setup(),) if setup is not None else ()
+    start = _clock()
+    function(*args)
+    if i >= warmup:
+      samples.append(_clock() - start)
+  samples.sort()
+  total = sum(samples) or 1e-9
+  metrics = {
+      'ops_per_second': len(samples) / total,
+      'p50': Percentile(samples, 50),
+      'p99': Percentile(samples, 99),
+  }
+  if size:
+    metrics['bytes_per_second'] = size * len(samples) / total
+  return Result(metrics, lower_is_better=('p50', 'p99'))
+
+
+def MeasureMemory(function, count, setup=None):
+  """Measures the memory allocated by one call of function, with tracemalloc.
+
+  :param function: the operation to measure, called with the return value of
+    setup if it is given. Its return value is kept alive while measuring, so
+    the memory it references counts as retained.
+  :type function: callable.
+  :param count: number of items the call handles, e.g. files listed.
+  :type count: int.
+  :param setup: called, unmeasured, before function.
+  :type setup: callable.
+  :returns: Result -- peak and retained bytes per item.
+  """
+  import tracemalloc
+
+  args = (setup(),) if setup is not None else ()
+  gc.collect()
+  tracemalloc.start()
+  try:
+    before = tracemalloc.get_traced_memory()[0]
+    result = function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+  finally:
+    tracemalloc.stop()
+  del result
+  metrics = {
+      'peak_bytes_per_item': float(peak - before) / count,
+      'retained_bytes_per_item': float(retained - before) / count,
+  }
+  return Result(metrics, lower_is_better=metrics)
+
+
+def Percentile(samples, percent):
+  """Returns a percentile of sorted samples, by the nearest-rank method."""
+  rank = int(round(percent / 100.0 * len(samples) + 0.5)) - 1
+  return samples[max(0, min(len(samples) - 1, rank))]
+
+
+def Main(benchmarks, baseline_file, description=None, argv=None,
+         threshold=DEFAULT_THRESHOLD):
+  """Runs benchmarks, prints their results and compares them to a baseline.
+
+  :param benchmarks: pairs of benchmark name and a function returning its
+    Result, called with the parsed command line arguments.
+  :type benchmarks: list.
+  :param baseline_file: path of the JSON file baselines are kept in.
+  :type baseline_file: str.
+  :param description: description of the command line.
+  :type description: str.
+  :param threshold: default of the --threshold option.
+  :type threshold: float.
+  :returns: int -- exit status, 1 if a regression was found.
+  """
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument('--filter', default='',
+                      help='only run benchmarks whose name contains this')
+  parser.add_argument('--threshold', type=float, default=threshold,
+                      help='relative change reported as a regression')
+  parser.add_argument('--baseline', default=baseline_file,
+                      help='JSON file with the baseline results')
+  parser.add_argument('--save-baseline', action='store_true',
+                      help='store the results as the new baseline')
+  parser.add_argument('--full', action='store_true',
+                      help='include the largest, slowest sizes')
+  parser.add_argument('--serve', action='store_true',
+                      help='talk to the fake Drive over a local socket')
+  args = parser.parse_args(argv)
+
+  baselines = {}
+  if os.path.exists(args.baseline):
+    with open(args.baseline) as f:
+      baselines = json.load(f)
+  regressions = []
+  results = {}
+  for name, benchmark in benchmarks:
+    if args.filter not in name:
+      continue
+    if name.endswith('_full') and not args.full:
+      continue
+    result = benchmark(args)
+    if args.serve:
+      name += '_served'  # Sockets are slower, so keep separate baselines.
+    result.name = name
+    results[name] = result.metrics
+    print('%-32s %s' % (name, '  '.join(
+        '%s=%.4g' % item for item in sorted(result.metrics.items()))))
+    sys.stdout.flush()
+    if name in baselines:
+      regressions.extend(result.Compare(baselines[name], args.threshold))
+
+  if args.save_baseline:
+    baselines.update(results)
+    with open(args.baseline, 'w') as f:
+      json.dump(baselines, f, indent=2, sort_keys=True)
+      f.write('\n')
+  for regression in regressions:
+    print('REGRESSION ' + regression)
+  return 1 if regressions and not args.save_baseline else 0
@@ -0,0 +1,178 @@
+"""Memory benchmarks of PyDrive resource objects, measured with tracemalloc.
+
+Run from the repository root:
+
+  python -m benchmarks.memory [--full] [--save-baseline]
+
+Every benchmark reports the peak and the retained bytes allocated per item:
+per listed file, per downloaded MB or per GoogleDriveFile. Responses are
+canned JSON pages and contents served from memory, so nothing touches the
+network. Results are compared to the baselines in memory.json, and growth
+beyond --threshold makes the run fail. Allocations depend on the Python
+version, so store baselines with the version that runs the comparison.
+Benchmarks ending in '_full' only run with --full.
+"""
+import json
+import os
+import sys
+
+from six.moves.urllib.parse import parse_qsl
+from six.moves.urllib.parse import urlsplit
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.files import GoogleDriveFile
+
+from .harness import Main
+from .harness import MeasureMemory
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'memory.json')
+# Memory use barely varies between runs, so small growths are regressions.
+THRESHOLD = 0.1
+PAGE_SIZE = 1000
+MB = 1024 * 1024
+
+
+class CannedHttp(object):
+  """httplib2.Http compatible factory and object answering canned responses.
+
+  Files.list() requests get the pages in order and media downloads get a copy
+  of 'content'. Pages are serialized up front, so that only the memory PyDrive
+  allocates is measured.
+  """
+
+  def __init__(self, resources=(), content=b''):
+    self.pages = []
+    for start in range(0, len(resources), PAGE_SIZE):
+      page = {'kind': 'drive#fileList',
+              'items': resources[start:start + PAGE_SIZE]}
+      if start + PAGE_SIZE < len(resources):
+        page['nextPageToken'] = str(len(self.pages) + 1)
+      self.pages.append(json.dumps(page).encode('utf-8'))
+    self.content = content
+
+  def __call__(self, timeout=None):
+    return self
+
+  def request(self, uri, method='GET', body=None, headers=None,
+              redirections=5, connection_type=None):
+    import httplib2
+
+    query = dict(parse_qsl(urlsplit(uri).query))
+    if query.get('alt') == 'media':
+      content = bytes(bytearray(self.content))  # A fresh buffer, as received.
+    else:
+      content = self.pages[int(query.get('pageToken') or 0)]
+    return httplib2.Response({'status': '200'}), content
+
+
+def _Resources(count):
+  """Returns 'count' realistic file resources."""
+  fake = FakeDrive()
+  return [fake.AddFile({'title': 'file%d.txt' % i}, b'content')
+          for i in range(count)]
+
+
+def _Drive(http):
+  """Returns a GoogleDrive answered by http, with dummy credentials."""
+  from oauth2client.client import AccessTokenCredentials
+
+  gauth = GoogleAuth()
+  gauth.http_factory = http
+  # Decoders allocate differently, so results must not depend on which one
+  # is installed.
+  gauth.json_decoder = 'json'
+  gauth.credentials = AccessTokenCredentials('token', None)
+  gauth.Authorize()
+  return GoogleDrive(gauth)
+
+
+def ListFiles(count):
+  def Benchmark(args):
+    drive = _Drive(CannedHttp(_Resources(count)))
+    return MeasureMemory(lambda: drive.ListFile().GetList(), count)
+  return Benchmark
+
+
+def IterFiles(count):
+  """Lists files with IterList(), keeping none of them, as streaming does."""
+  def Benchmark(args):
+    drive = _Drive(CannedHttp(_Resources(count)))
+
+    def Iterate():
+      for file1 in drive.ListFile().IterList():
+        pass
+    return MeasureMemory(Iterate, count)
+  return Benchmark
+
+
+def PageFiles(count):
+  """Lists files a page at a time, keeping none of them.
+
+  The baseline of IterFiles(): the same pages decoded whole by GetList().
+  """
+  def Benchmark(args):
+    drive = _Drive(CannedHttp(_Resources(count)))
+
+    def Iterate():
+      for file_list in drive.ListFile({'maxResults': PAGE_SIZE}):
+        pass
+    return MeasureMemory(Iterate, count)
+  return Benchmark
+
+
+def GetContentString(size):
+  def Benchmark(args):
+    drive = _Drive(CannedHttp(content=b'x' * size))
+    metadata = _Resources(1)[0]
+
+    def Download(file1):
+      file1.GetContentString()
+      return file1
+    return MeasureMemory(
+        Download, size // MB,
+        setup=lambda: GoogleDriveFile(auth=drive.auth, metadata=metadata,
+                                      uploaded=True))
+  return Benchmark
+
+
+def ConstructFiles(count):
+  def Benchmark(args):
+    resources = _Resources(count)
+    return MeasureMemory(
+        lambda: [GoogleDriveFile(metadata=r, uploaded=True)
+                 for r in resources], count)
+  return Benchmark
+
+
+def UpdateMetadata(count):
+  def Benchmark(args):
+    resources = _Resources(count)
+
+    def Update(files):
+      for file1, resource in zip(files, resources):
+        file1.UpdateMetadata(resource)
+      return files
+    return MeasureMemory(
+        Update, count,
+        setup=lambda: [GoogleDriveFile(metadata=r, uploaded=True)
+                       for r in resources])
+  return Benchmark
+
+
+BENCHMARKS = [
+    ('list_file_10k', ListFiles(10000)),
+    ('list_file_100k_full', ListFiles(100000)),
+    ('page_list_file_10k', PageFiles(10000)),
+    ('iter_list_file_10k', IterFiles(10000)),
+    ('get_content_string_1mb', GetContentString(MB)),
+    ('get_content_string_64mb_full', GetContentString(64 * MB)),
+    ('construct_file_10k', ConstructFiles(10000)),
+    ('update_metadata_10k', UpdateMetadata(10000)),
+]
+
+
+if __name__ == '__main__':
+  sys.exit(Main(BENCHMARKS, BASELINE_FILE, description=__doc__,
+                threshold=THRESHOLD))
@@ -0,0 +1,173 @@
+"""Throughput and latency benchmarks of PyDrive against a fake Drive.
+
+Run from the repository root:
+
+  python -m benchmarks.throughput [--full] [--serve] [--save-baseline]
+
+Every benchmark reports ops/s, p50 and p99 latency in seconds, and bytes/s
+for transfers. Results are compared to the baselines in throughput.json and
+regressions beyond --threshold make the run fail. Baselines depend on the
+machine, so store them with --save-baseline on the machine running the
+comparison. Benchmarks ending in '_full' only run with --full.
+"""
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.files import GoogleDriveFile
+from pydrive.files import MIME_TYPE_TO_BOM
+
+from .harness import Main
+from .harness import Measure
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'throughput.json')
+BOM = MIME_TYPE_TO_BOM['application/vnd.google-apps.document']['text/plain']
+KB = 1024
+MB = 1024 * KB
+
+
+def _Drive(args, files=0, content=None):
+  """Returns a GoogleDrive talking to a new fake holding 'files' files.
+
+  :returns: tuple -- the GoogleDrive and the resource of the first file.
+  """
+  fake = FakeDrive()
+  resources = [fake.AddFile({'title': 'file%d' % i}, content)
+               for i in range(files)]
+  if args.serve:
+    fake.Serve()
+  drive = GoogleDrive(fake.Authorize(GoogleAuth()))
+  return drive, resources[0] if resources else None
+
+
+def ListFiles(count, repeat):
+  def Benchmark(args):
+    drive, _ = _Drive(args, files=count)
+
+    def List():
+      assert len(drive.ListFile().GetList()) == count
+    return Measure(List, repeat=repeat, warmup=0)
+  return Benchmark
+
+
+def IterFiles(count, repeat):
+  def Benchmark(args):
+    drive, _ = _Drive(args, files=count)
+
+    def Iterate():
+      assert sum(1 for _ in drive.ListFile().IterList()) == count
+    return Measure(Iterate, repeat=repeat, warmup=0)
+  return Benchmark
+
+
+def FirstFile(stream, repeat):
+  """Times getting the first file of a 1000 file page."""
+  def Benchmark(args):
+    drive, _ = _Drive(args, files=1000)
+
+    def First():
+      file_list = drive.ListFile({'maxResults': 1000})
+      if stream:
+        return next(file_list.IterList())
+      return file_list.GetList()[0]
+    return Measure(First, repeat=repeat)
+  return Benchmark
+
+
+def FetchMetadata(args):
+  drive, resource = _Drive(args, files=1)
+  return Measure(lambda f: f.FetchMetadata(), repeat=200,
+                 setup=lambda: drive.CreateFile({'id': resource['id']}))
+
+
+def Upload(size, repeat):
+  def Benchmark(args):
+    drive, _ = _Drive(args)
+    content = b'x' * size
+
+    def NewFile():
+      file1 = drive.CreateFile({'title': 'upload'})
+      file1.content = io.BytesIO(content)
+      file1['mimeType'] = 'application/octet-stream'
+      return file1
+    return Measure(lambda f: f.Upload(), repeat=repeat, size=size,
+                   setup=NewFile)
+  return Benchmark
+
+
+def GetContentFile(size, repeat):
+  def Benchmark(args):
+    drive, metadata = _Drive(args, files=1, content=b'x' * size)
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, 'content')
+    try:
+      return Measure(lambda f: f.GetContentFile(filename),
+                     repeat=repeat, size=size,
+                     setup=lambda: GoogleDriveFile(
+                         auth=drive.auth, metadata=metadata, uploaded=True))
+    finally:
+      shutil.rmtree(directory)
+  return Benchmark
+
+
+def ConstructFiles(count, repeat):
+  """Builds GoogleDriveFile objects from decoded resources, as listing does."""
+  def Benchmark(args):
+    fake = FakeDrive()
+    page = json.dumps([fake.AddFile({'title': 'file%d' % i})
+                       for i in range(count)])
+    return Measure(
+        lambda resources: [GoogleDriveFile._FromResource(r, auth=None)
+                           for r in resources],
+        repeat=repeat, setup=lambda: json.loads(page))
+  return Benchmark
+
+
+def RemovePrefix(size, repeat):
+  def Benchmark(args):
+    content = BOM + b'x' * size
+    return Measure(lambda f: GoogleDriveFile._RemovePrefix(f, BOM),
+                   repeat=repeat, size=size,
+                   setup=lambda: io.BytesIO(content))
+  return Benchmark
+
+
+def InsertPrefix(size, repeat):
+  def Benchmark(args):
+    content = b'x' * size
+    return Measure(lambda f: GoogleDriveFile._InsertPrefix(f, BOM),
+                   repeat=repeat, size=size,
+                   setup=lambda: io.BytesIO(content))
+  return Benchmark
+
+
+BENCHMARKS = [
+    ('list_10k', ListFiles(10000, 5)),
+    ('list_100k', ListFiles(100000, 2)),
+    ('list_1m_full', ListFiles(1000000, 1)),
+    ('iter_list_10k', IterFiles(10000, 5)),
+    ('first_file_list', FirstFile(False, 20)),
+    ('first_file_iter_list', FirstFile(True, 20)),
+    ('fetch_metadata', FetchMetadata),
+    ('upload_1kb', Upload(KB, 100)),
+    ('upload_16mb', Upload(16 * MB, 5)),
+    ('get_content_file_1kb', GetContentFile(KB, 100)),
+    ('get_content_file_16mb', GetContentFile(16 * MB, 5)),
+    ('construct_files_10k', ConstructFiles(10000, 20)),
+    ('remove_prefix_1kb', RemovePrefix(KB, 10000)),
+    ('remove_prefix_1mb', RemovePrefix(MB, 20)),
+    ('remove_prefix_16mb_full', RemovePrefix(16 * MB, 3)),
+    ('insert_prefix_1kb', InsertPrefix(KB, 10000)),
+    ('insert_prefix_1mb', InsertPrefix(MB, 20)),
+    ('insert_prefix_16mb_full', InsertPrefix(16 * MB, 3)),
+]
+
+
+if __name__ == '__main__':
+  sys.exit(Main(BENCHMARKS, BASELINE_FILE, description=__doc__))
@@ -0,0 +1,662 @@
+import asyncio
+import io
+import time
+
+from .apiattr import ApiAttribute
+from .apiattr import ApiAttributeMixin
+from .apiattr import ApiResource
+from .apiattr import ApiResourceList
+from .auth import GZIP_HEADERS
+from .auth import LoadAuth
+from .files import ApiRequestError
+from .files import CONTENT_FIELDS
+from .files import FileNotDownloadableError
+from .files import FileNotUploadedError
+from .files import GoogleDriveFile
+from .files import GoogleDriveFileList
+from .files import MIME_TYPE_TO_BOM
+from .files import _HttpError
+from .hooks import DOWNLOAD_OPERATION
+from .hooks import FileId
+from .hooks import OperationName
+from .retry import IsIdempotent
+
+# Number of connections an AsyncGoogleDrive keeps open at most by default.
+CONNECTION_LIMIT = 100
+_clock = getattr(time, 'perf_counter', time.time)
+# Returns the event loop of the running coroutine. Before Python 3.7,
+# get_event_loop() does the same when called from a coroutine.
+_GetRunningLoop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+@LoadAuth
+def _LoadAuth(drive):
+  """Loads auth of drive, all of the work is done by the decorator."""
+
+
+class AsyncGoogleDrive(ApiAttributeMixin, object):
+  """Google Drive client for asyncio applications.
+
+  Mirrors pydrive.drive.GoogleDrive, with awaitable API calls made over a
+  non-blocking aiohttp session. Requests are built by the service of the
+  GoogleAuth instance and sent with its credentials, and failed requests are
+  retried according to its retry policy. The rate and concurrency limiters of
+  GoogleAuth block their thread and are therefore not used; bound concurrency
+  with 'connection_limit' instead.
+
+  Requires the aiohttp package. Close the instance when done, or use it as an
+  async context manager.
+  """
+  session = ApiAttribute('session')
+
+  def __init__(self, auth=None, connection_limit=CONNECTION_LIMIT):
+    """Create an instance of AsyncGoogleDrive.
+
+    :param auth: authorized GoogleAuth instance.
+    :type auth: pydrive.auth.GoogleAuth.
+    :param connection_limit: maximum number of simultaneous connections.
+    :type connection_limit: int.
+    """
+    ApiAttributeMixin.__init__(self)
+    self.auth = auth
+    self.connection_limit = connection_limit
+    self.single_flight = None
+    self._auth_lock = None
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *exc_info):
+    await self.Close()
+
+  def CreateFile(self, metadata=None):
+    """Create an instance of AsyncGoogleDriveFile with this instance.
+
+    This method would not upload a file to GoogleDrive.
+
+    :param metadata: file resource to initialize AsyncGoogleDriveFile with.
+    :type metadata: dict.
+    :returns: pydrive.aio.AsyncGoogleDriveFile -- initialized with this instance.
+    """
+    return AsyncGoogleDriveFile(drive=self, metadata=metadata)
+
+  def ListFile(self, param=None):
+    """Create an instance of AsyncGoogleDriveFileList with this instance.
+
+    This method will not fetch from Files.List().
+
+    :param param: parameter to be sent to Files.List().
+    :type param: dict.
+    :returns: pydrive.aio.AsyncGoogleDriveFileList -- initialized with this instance.
+    """
+    return AsyncGoogleDriveFileList(drive=self, param=param)
+
+  def EnableRequestCoalescing(self):
+    """Coalesces concurrent identical requests of files, see pydrive.singleflight.
+
+    Concurrent FetchMetadata() calls for the same fields of the same file,
+    and FetchContent() calls for the same file and mimetype, then share one
+    request and its result.
+
+    :returns: pydrive.singleflight.SingleFlight -- the coalescer.
+    """
+    from .singleflight import SingleFlight
+
+    self.single_flight = SingleFlight()
+    return self.single_flight
+
+  async def GetAbout(self):
+    """Return information about the Google Drive of the auth instance.
+
+    :returns: A dictionary of Google Drive information like user, usage, quota etc.
+    """
+    await self.LoadAuth()
+    return await self.Execute(self.auth.service.about().get())
+
+  async def Close(self):
+    """Closes the connections of this instance."""
+    if self.session is not None:
+      await self.session.close()
+      self.session = None
+
+  async def LoadAuth(self):
+    """Checks if the auth is valid and loads it in an executor if not.
+
+    Does the work of pydrive.auth.LoadAuth, without blocking the event loop.
+    """
+    if self.auth is not None and self.auth.service is not None and \
+            not self.auth.access_token_expired and \
+            not self.auth.access_token_expiring:
+      return
+    if self._auth_lock is None:
+      self._auth_lock = asyncio.Lock()
+    async with self._auth_lock:
+      await _GetRunningLoop().run_in_executor(None, _LoadAuth, self)
+
+  async def Execute(self, request):
+    """Executes an API request, retrying it according to the retry policy.
+
+    Events are fired on the hooks of the GoogleAuth instance.
+
+    :param request: the request to execute.
+    :type request: googleapiclient.http.HttpRequest
+    :returns: dict -- the deserialized response.
+    :raises: googleapiclient.errors.HttpError
+    """
+    resp, content = await self._Call(
+        self._Request, method=request.method, uri=request.uri,
+        body=request.body, headers=request.headers,
+        operation=OperationName(request), file_id=FileId(request.uri))
+    return request.postproc(resp, content)
+
+  async def Download(self, url, file_id=None):
+    """Downloads url, retrying it according to the retry policy.
+
+    Events are fired on the hooks of the GoogleAuth instance.
+
+    :param url: the url to download.
+    :type url: str.
+    :param file_id: id of the downloaded file, reported to hooks.
+    :type file_id: str.
+    :returns: bytes -- the downloaded content.
+    :raises: googleapiclient.errors.HttpError
+    """
+    resp, content = await self._Call(
+        self._Request, method='GET', uri=url, headers=GZIP_HEADERS,
+        operation=DOWNLOAD_OPERATION, file_id=file_id or FileId(url))
+    return content
+
+  async def _Call(self, function, *args, **kwargs):
+    """Awaits function until it succeeds or may not be retried.
+
+    Requests which are not idempotent, according to the 'method' and 'uri'
+    keyword arguments of function, are only retried if they were not
+    applied, see pydrive.retry.RetryPolicy. Fires on_retry before every
+    retry, for the 'operation' and 'file_id' keyword arguments of function.
+    """
+    import aiohttp
+
+    policy = self.auth.retry_policy
+    hooks = self.auth.hooks
+    method, uri = kwargs.get('method'), kwargs.get('uri')
+    if IsIdempotent(method, uri):
+      network_errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+    else:
+      network_errors = aiohttp.ClientConnectorError  # Not sent.
+    retry_number = 0
+    while True:
+      try:
+        result = await function(*args, **kwargs)
+      except Exception as error:
+        retryable = policy.IsRetryable(error, method, uri) or \
+            isinstance(error, network_errors)
+        if retry_number >= policy.max_retries or not retryable or \
+                not policy.budget.Withdraw():
+          raise
+        delay = policy.GetDelay(retry_number, error)
+        await asyncio.sleep(delay)
+        retry_number += 1
+        if hooks:
+          hooks.Fire('on_retry', operation=kwargs.get('operation'),
+                     file_id=kwargs.get('file_id'), attempt=retry_number + 1,
+                     status=getattr(getattr(error, 'resp', None), 'status',
+                                    None),
+                     duration=delay, error=error)
+      else:
+        policy.budget.Deposit()
+        return result
+
+  async def _Request(self, method, uri, body=None, headers=None,
+                     operation=None, file_id=None):
+    """Sends one authorized request, refreshing the token once on 401.
+
+    :returns: tuple -- httplib2.Response and content of the response.
+    :raises: googleapiclient.errors.HttpError
+    """
+    from apiclient import errors
+    from httplib2 import Response
+
+    hooks = self.auth.hooks
+    hooked = bool(hooks)  # Registering mid-request takes effect next time.
+    fields = {'operation': operation, 'file_id': file_id, 'method': method}
+    for attempt in range(2):
+      request_headers = dict(headers or {})
+      self.auth.credentials.apply(request_headers)
+      if hooked:
+        hooks.Fire('before_request', bytes=len(body or b''), **fields)
+        start = _clock()
+      try:
+        async with self._GetSession().request(
+            method, uri, data=body, headers=request_headers) as response:
+          content = await response.read()
+      except Exception as error:
+        if hooked:
+          hooks.Fire('after_response', duration=_clock() - start,
+                     error=error, **fields)
+        raise
+      resp = Response(dict((k.lower(), v) for k, v in response.headers.items()))
+      resp.status = response.status
+      resp.reason = response.reason
+      if hooked:
+        duration = _clock() - start
+        hooks.Fire('after_response', status=resp.status, duration=duration,
+                   bytes=len(content), **fields)
+        if operation == DOWNLOAD_OPERATION and resp.status == 200:
+          hooks.Fire('on_download_chunk', status=resp.status,
+                     duration=duration, bytes=len(content), **fields)
+      if resp.status == 401 and attempt == 0:
+        await _GetRunningLoop().run_in_executor(None, self._Refresh)
+        continue
+      break
+    if resp.status >= 300:
+      raise errors.HttpError(resp, content, uri=uri)
+    return resp, content
+
+  def _Refresh(self):
+    """Refreshes the access token once, however many requests got a 401."""
+    token = self.auth.credentials.access_token
+    with self.auth.refresh_lock:
+      if self.auth.credentials.access_token == token:
+        self.auth.RefreshCredentials(self.auth.Get_Unauthorized_Http_Object())
+
+  def _GetSession(self):
+    """Returns the aiohttp session, creating it on first use."""
+    import aiohttp
+
+    if self.session is None:
+      timeout = aiohttp.ClientTimeout(sock_connect=self.auth.http_timeout,
+                                      sock_read=self.auth.http_timeout)
+      self.session = aiohttp.ClientSession(
+          connector=aiohttp.TCPConnector(limit=self.connection_limit),
+          timeout=timeout)
+    return self.session
+
+
+class AsyncGoogleDriveFileList(ApiResourceList):
+  """Google Drive FileList instance for asyncio applications.
+
+  Mirrors pydrive.files.GoogleDriveFileList. Iterate over it with 'async for'
+  to get one page of files at a time.
+  """
+  drive = ApiAttribute('drive')
+  _ListRequest = GoogleDriveFileList._ListRequest
+
+  def __init__(self, drive, param=None):
+    """Create an instance of AsyncGoogleDriveFileList.
+
+    :param drive: the AsyncGoogleDrive instance to make API calls with.
+    :type drive: pydrive.aio.AsyncGoogleDrive
+    :param param: parameter to be sent to Files.List().
+    :type param: dict.
+    """
+    super(AsyncGoogleDriveFileList, self).__init__(auth=drive.auth,
+                                                   metadata=param)
+    self.drive = drive
+
+  def __iter__(self):
+    raise TypeError('Use "async for" to iterate over %s' % type(self).__name__)
+
+  def __aiter__(self):
+    return self
+
+  async def __anext__(self):
+    """Make API call to list files and return them.
+
+    :returns: list -- list of pydrive.aio.AsyncGoogleDriveFile.
+    :raises: StopAsyncIteration
+    """
+    if 'pageToken' in self and self['pageToken'] is None:
+      raise StopAsyncIteration
+    result = await self._GetList()
+    self['pageToken'] = self.metadata.get('nextPageToken')
+    return result
+
+  async def GetList(self):
+    """Get list of files.
+
+    If 'maxResults' is not specified, it will automatically iterate through
+    every file available. Otherwise, it will make API call once and update
+    'pageToken'.
+
+    :returns: list -- list of pydrive.aio.AsyncGoogleDriveFile.
+    """
+    if self.get('maxResults') is None:
+      self['maxResults'] = 1000
+      result = []
+      async for x in self:
+        result.extend(x)
+      del self['maxResults']
+      return result
+    else:
+      return await self.__anext__()
+
+  async def IterList(self):
+    """Yields the files of every page, parsing each page incrementally.
+
+    Mirrors pydrive.files.GoogleDriveFileList.IterList(), iterate over it
+    with 'async for'.
+
+    :returns: async generator -- pydrive.aio.AsyncGoogleDriveFile of the list.
+    :raises: ValueError
+    """
+    from .model import ListParser
+    from .model import RawContent
+
+    default_size = self.get('maxResults') is None
+    if default_size:
+      self['maxResults'] = 1000
+    try:
+      while not ('pageToken' in self and self['pageToken'] is None):
+        await self.drive.LoadAuth()
+        request = self._ListRequest()
+        request.postproc = RawContent
+        parser = ListParser()
+        drive = self.drive
+        whole = 'fields' not in self
+        for file_metadata in parser.Parse(await drive.Execute(request)):
+          yield AsyncGoogleDriveFile._FromResource(
+              file_metadata, whole, auth=drive.auth, drive=drive)
+        self.metadata = parser.envelope
+        self['pageToken'] = self.metadata.get('nextPageToken')
+    finally:
+      if default_size:
+        del self['maxResults']
+
+  async def _GetList(self):
+    """Makes the API call to list one page of files.
+
+    :returns: list -- list of pydrive.aio.AsyncGoogleDriveFile.
+    """
+    await self.drive.LoadAuth()
+    self.metadata = await self.drive.Execute(self._ListRequest())
+    items = self.metadata.pop('items', [])
+
+    drive = self.drive
+    whole = 'fields' not in self
+    return [AsyncGoogleDriveFile._FromResource(
+                file_metadata, whole, auth=drive.auth, drive=drive)
+            for file_metadata in items]
+
+
+class AsyncGoogleDriveFile(GoogleDriveFile):
+  """Google Drive File instance for asyncio applications.
+
+  Mirrors pydrive.files.GoogleDriveFile, with awaitable API calls. Metadata
+  is not fetched lazily on access, await FetchMetadata() first instead.
+  """
+  drive = ApiAttribute('drive')
+
+  def __init__(self, drive, metadata=None, uploaded=False):
+    """Create an instance of AsyncGoogleDriveFile.
+
+    :param drive: the AsyncGoogleDrive instance to make API calls with.
+    :type drive: pydrive.aio.AsyncGoogleDrive
+    :param metadata: file resource to initialize AsyncGoogleDriveFile with.
+    :type metadata: dict.
+    :param uploaded: True if this file is confirmed to be uploaded.
+    :type uploaded: bool.
+    """
+    super(AsyncGoogleDriveFile, self).__init__(
+        auth=drive.auth, metadata=metadata, uploaded=uploaded)
+    self.drive = drive
+
+  def __getitem__(self, key):
+    """Overwrites manner of accessing Files resource.
+
+    :param key: key of dictionary query.
+    :type key: str.
+    :returns: value of Files resource
+    :raises: KeyError, FileNotUploadedError
+    """
+    try:
+      return ApiResource.__getitem__(self, key)
+    except KeyError:
+      if self.uploaded or self.get('id'):
+        raise
+      raise FileNotUploadedError()
+
+  async def GetContentString(self, mimetype=None, encoding='utf-8',
+                             remove_bom=False):
+    """Get content of this file as a string.
+
+    :param mimetype: The mimetype of the content string.
+    :type mimetype: str
+    :param encoding: The encoding to use when decoding the byte string.
+    :type encoding: str
+    :param remove_bom: Whether to strip a known BOM.
+    :type remove_bom: bool
+    :returns: str -- utf-8 decoded content of the file
+    :raises: ApiRequestError, FileNotUploadedError, FileNotDownloadableError
+    """
+    if self.content is None or \
+                    type(self.content) is not io.BytesIO or \
+                    self.has_bom == remove_bom:
+      await self.FetchContent(mimetype, remove_bom)
+    return self.content.getvalue().decode(encoding)
+
+  async def GetContentFile(self, filename, mimetype=None, remove_bom=False):
+    """Save content of this file as a local file.
+
+    :param filename: name of the file to write to.
+    :type filename: str
+    :param mimetype: mimeType of the file.
+    :type mimetype: str
+    :param remove_bom: Whether to remove the byte order marking.
+    :type remove_bom: bool
+    :raises: ApiRequestError, FileNotUploadedError, FileNotDownloadableError
+    """
+    if self.content is None or \
+                    type(self.content) is not io.BytesIO or \
+                    self.has_bom == remove_bom:
+      await self.FetchContent(mimetype, remove_bom)
+    with open(filename, 'wb') as f:
+      f.write(self.content.getvalue())
+
+  async def FetchMetadata(self, fields=None, fetch_all=False):
+    """Download file's metadata from id using Files.get().
+
+    :param fields: The fields to include, as one string, each entry separated
+    by commas, e.g. 'fields,labels'.
+    :type fields: str
+    :param fetch_all: Whether to fetch all fields.
+    :type fetch_all: bool
+    :raises: ApiRequestError, FileNotUploadedError
+    """
+    file_id = self.metadata.get('id') or self.get('id')
+    if fetch_all:
+      fields = self._ALL_FIELDS
+    if not file_id:
+      raise FileNotUploadedError()
+    await self.drive.LoadAuth()
+    try:
+      metadata = await self._FilesGet(file_id, fields)
+    except _HttpError() as error:
+      raise ApiRequestError(error)
+    else:
+      self.uploaded = True
+      self.UpdateMetadata(metadata)
+      self._RecordFetch(None if fetch_all else fields)
+
+  async def _FetchFields(self, fields):
+    """Fetches fields with Files.get() and merges them into this file.
+
+    :param fields: names of top-level fields.
+    :type fields: list.
+    :raises: ApiRequestError, FileNotUploadedError
+    """
+    file_id = self.metadata.get('id') or self.get('id')
+    if not file_id:
+      raise FileNotUploadedError()
+    await self.drive.LoadAuth()
+    try:
+      metadata = await self._FilesGet(
+        file_id, ','.join(sorted(set(fields) | set(['id']))))
+    except _HttpError() as error:
+      raise ApiRequestError(error)
+    else:
+      self.uploaded = True
+      self._MergeFields(metadata, fields)
+
+  async def _FilesGet(self, file_id, fields):
+    """Gets the resource of a file using Files.get().
+
+    :param file_id: id of the file.
+    :type file_id: str.
+    :param fields: the fields to get, all basic ones if None.
+    :type fields: str.
+    :returns: dict -- the resource.
+    :raises: googleapiclient.errors.HttpError
+    """
+    request = self.auth.service.files().get(
+      fileId=file_id,
+      fields=fields,
+      # Teamdrive support
+      supportsTeamDrives=True
+    )
+    single_flight = self.drive.single_flight
+    if single_flight is None:
+      return await self.drive.Execute(request)
+    return await single_flight.DoAsync(
+        ('metadata', file_id, fields), self.drive.Execute, request)
+
+  async def FetchContent(self, mimetype=None, remove_bom=False):
+    """Download file's content from download_url.
+
+    :raises: ApiRequestError, FileNotUploadedError, FileNotDownloadableError
+    """
+    missing = self._MissingFields(CONTENT_FIELDS)
+    if missing:
+      await self._FetchFields(missing)
+    download_url = self.metadata.get('downloadUrl')
+    export_links = self.metadata.get('exportLinks')
+    if download_url:
+      url = download_url
+    elif export_links and export_links.get(mimetype):
+      url = export_links.get(mimetype)
+    else:
+      raise FileNotDownloadableError(
+        'No downloadLink/exportLinks for mimetype found in metadata')
+
+    await self.drive.LoadAuth()
+    file_id = self.metadata.get('id')
+    single_flight = self.drive.single_flight
+    try:
+      if single_flight is None:
+        content = await self.drive.Download(url, file_id=file_id)
+      else:
+        content = await single_flight.DoAsync(
+            ('content', file_id, url), self.drive.Download, url,
+            file_id=file_id)
+      self.content = io.BytesIO(content)
+    except _HttpError() as error:
+      raise ApiRequestError('Cannot download file: %s' % error.resp)
+    self.dirty['content'] = False
+
+    if mimetype == 'text/plain' and remove_bom:
+      self._RemovePrefix(self.content,
+                         MIME_TYPE_TO_BOM[self['mimeType']][mimetype])
+      self.has_bom = not remove_bom
+
+  async def Upload(self, param=None):
+    """Upload/update file by choosing the most efficient method.
+
+    :param param: additional parameter to upload file.
+    :type param: dict.
+    :raises: ApiRequestError
+    """
+    if self.uploaded or self.get('id') is not None:
+      if self.dirty['content']:
+        await self._FilesUpload('update', param)
+      else:
+        await self._FilesUpload('patch', param)
+    else:
+      await self._FilesUpload('insert', param)
+
+  async def Trash(self, param=None):
+    """Move a file to the trash.
+
+    :raises: ApiRequestError
+    """
+    await self._FilesCall('trash', param)
+    self._SetTrashed(True)
+
+  async def UnTrash(self, param=None):
+    """Move a file out of the trash.
+
+    :param param: Additional parameter to file.
+    :type param: dict.
+    :raises: ApiRequestError
+    """
+    await self._FilesCall('untrash', param)
+    self._SetTrashed(False)
+
+  async def Delete(self, param=None):
+    """Hard-delete a file.
+
+    :param param: additional parameter to file.
+    :type param: dict.
+    :raises: ApiRequestError
+    """
+    await self._FilesCall('delete', param)
+
+  async def _FilesUpload(self, method, param=None):
+    """Upload metadata and content using Files.insert/update/patch().
+
+    :param method: name of the Files method to call.
+    :type method: str.
+    :param param: additional parameter to upload file.
+    :type param: dict.
+    :raises: ApiRequestError, FileNotUploadedError
+    """
+    if method != 'insert' and not self.uploaded:
+      await self.FetchMetadata()
+    if param is None:
+      param = {}
+    param['body'] = self.GetChanges()
+    if method != 'insert':
+      param['fileId'] = self.metadata.get('id')
+    if method != 'patch' and self.dirty['content']:
+      param['media_body'] = self._BuildMediaBody()
+    metadata = await self._FilesCall(method, param)
+    self.uploaded = True
+    self.dirty['content'] = False
+    self.UpdateMetadata(metadata)
+    self._RecordFetch(param.get('fields'))
+
+  async def _FilesCall(self, method, param=None):
+    """Makes a call to a method of Files.
+
+    :param method: name of the Files method to call.
+    :type method: str.
+    :param param: parameter of the call, the file id is added if missing.
+    :type param: dict.
+    :returns: dict -- the deserialized response.
+    :raises: ApiRequestError
+    """
+    if param is None:
+      param = {}
+    if method != 'insert' and 'fileId' not in param:
+      param['fileId'] = self.metadata.get('id') or self['id']
+
+    # Teamdrive support
+    param['supportsTeamDrives'] = True
+
+    await self.drive.LoadAuth()
+    try:
+      return await self.drive.Execute(
+        getattr(self.auth.service.files(), method)(**param))
+    except _HttpError() as error:
+      raise ApiRequestError(error)
+
+  def _BuildMediaBody(self):
+    """Build MediaIoBaseUpload to upload the content in a single request.
+
+    Sets mimeType as 'application/octet-stream' if not specified.
+
+    :returns: MediaIoBaseUpload -- instance that will be used to upload content.
+    """
+    from apiclient.http import MediaIoBaseUpload
+
+    if self.get('mimeType') is None:
+      self['mimeType'] = 'application/octet-stream'
+    return MediaIoBaseUpload(self.content, self['mimeType'], resumable=False)
@@ -1,5 +1,15 @@
+import copy
+import threading
+
 from six import Iterator, iteritems
 
+# Changed keys of resources without changes, shared to save memory.
+_NO_CHANGES = frozenset()
+# Guards the changed keys of every resource, and the copies made on reads,
+# which a file shared between threads may get concurrently. A single lock
+# keeps resources small, and is only taken briefly.
+_TRACK_LOCK = threading.Lock()
+
 class ApiAttribute(object):
   """A data descriptor that sets and returns values."""
 
@@ -46,14 +56,22 @@ class ApiResource(dict):
   Inherits and behaves as a python dictionary to handle api resources.
   Save clean copy of metadata in self.metadata as a dictionary.
   Provides changed metadata elements to efficiently update api resources.
+
+  Keys set or deleted since the last UpdateMetadata() are tracked, so that
+  GetChanges() only compares those. Nested dicts and lists are shared with
+  self.metadata until they are accessed through item access or get(), which
+  replaces them with a copy first, so changing them in place shows up as a
+  change too. Reads, and GetChanges(), are safe from several threads.
   """
   auth = ApiAttribute('auth')
+  _changed = _NO_CHANGES
 
   def __init__(self, *args, **kwargs):
     """Create an instance of ApiResource."""
     super(ApiResource, self).__init__()
     self.update(*args, **kwargs)
     self.metadata = dict(self)
+    self._changed = _NO_CHANGES
 
   def __getitem__(self, key):
     """Overwritten method of dictionary.
@@ -62,7 +80,10 @@ class ApiResource(dict):
     :type key: str.
     :returns: value of the query.
     """
-    return dict.__getitem__(self, key)
+    value = dict.__getitem__(self, key)
+    if isinstance(value, (dict, list)) and key not in self._changed:
+      value = self._CopyOnWrite(key, value)
+    return value
 
   def __setitem__(self, key, val):
     """Overwritten method of dictionary.
@@ -72,6 +93,51 @@ class ApiResource(dict):
     :param val: value of the query.
     """
     dict.__setitem__(self, key, val)
+    self._Track(key)
+
+  def __delitem__(self, key):
+    """Overwritten method of dictionary.
+
+    :param key: key to delete.
+    :type key: str.
+    """
+    dict.__delitem__(self, key)
+    self._Track(key)
+
+  def get(self, key, default=None):
+    """Overwritten method of dictionary, see __getitem__()."""
+    if dict.__contains__(self, key):
+      return ApiResource.__getitem__(self, key)
+    return default
+
+  def pop(self, key, *default):
+    """Overwritten method of dictionary."""
+    self._Track(key)
+    return dict.pop(self, key, *default)
+
+  def popitem(self):
+    """Overwritten method of dictionary."""
+    key, value = dict.popitem(self)
+    self._Track(key)
+    return key, value
+
+  def clear(self):
+    """Overwritten method of dictionary."""
+    keys = list(dict.keys(self))
+    dict.clear(self)
+    for key in keys:
+      self._Track(key)
+
+  def __ior__(self, other):
+    """Overwritten method of dictionary, see update()."""
+    self.update(other)
+    return self
+
+  def setdefault(self, key, default=None):
+    """Overwritten method of dictionary."""
+    if not dict.__contains__(self, key):
+      self[key] = default
+    return ApiResource.__getitem__(self, key)
 
   def __repr__(self):
     """Overwritten method of dictionary."""
@@ -79,29 +145,93 @@ class ApiResource(dict):
     return '%s(%s)' % (type(self).__name__, dict_representation)
 
   def update(self, *args, **kwargs):
-    """Overwritten method of dictionary."""
-    for k, v in iteritems(dict(*args, **kwargs)):
-      self[k] = v
+    """Overwritten method of dictionary.
+
+    Calls __setitem__ for every key only if a subclass overrides it.
+    """
+    if len(args) == 1 and not kwargs and isinstance(args[0], dict):
+      other = args[0]
+    else:
+      other = dict(*args, **kwargs)
+    if type(self).__setitem__ is not ApiResource.__setitem__:
+      for k, v in iteritems(other):
+        self[k] = v
+      return
+    if other:
+      dict.update(self, other)
+      with _TRACK_LOCK:
+        if self._changed is _NO_CHANGES:
+          self._changed = set(other)
+        else:
+          self._changed.update(other)
 
   def UpdateMetadata(self, metadata=None):
-    """Update metadata and mark all of them to be clean."""
+    """Update metadata and mark all of them to be clean.
+
+    Only the keys changed since the last call are copied to self.metadata.
+    """
     if metadata:
       self.update(metadata)
-    self.metadata = dict(self)
+    with _TRACK_LOCK:
+      changed, self._changed = self._changed, _NO_CHANGES
+    snapshot = self.metadata
+    if snapshot is None or 2 * len(changed) > len(snapshot):
+      self.metadata = dict(self)  # Copying is faster than a loop over most.
+    else:
+      for key in changed:
+        if dict.__contains__(self, key):
+          snapshot[key] = dict.__getitem__(self, key)
+        else:
+          snapshot.pop(key, None)
 
   def GetChanges(self):
     """Returns changed metadata elements to update api resources efficiently.
 
+    Takes time proportional to the number of keys changed.
+
     :returns: dict -- changed metadata elements.
     """
     dirty = {}
-    for key in self:
-      if self.metadata.get(key) is None:
-        dirty[key] = self[key]
-      elif self.metadata[key] != self[key]:
-        dirty[key] = self[key]
+    with _TRACK_LOCK:
+      changed = list(self._changed)
+    for key in changed:
+      if not dict.__contains__(self, key):
+        continue
+      value = dict.__getitem__(self, key)
+      if self.metadata.get(key) is None or self.metadata[key] != value:
+        dirty[key] = value
     return dirty
 
+  def _CopyOnWrite(self, key, value):
+    """Replaces a nested value shared with self.metadata with a copy.
+
+    The key is then tracked as possibly changed, since the caller may change
+    the copy in place. Threads reading the same key concurrently get the
+    same copy.
+
+    :returns: the value now held by this resource.
+    """
+    with _TRACK_LOCK:
+      current = dict.get(self, key)
+      if current is not value:  # Another thread copied or removed it.
+        return value if current is None else current
+      if self.metadata is not None and self.metadata.get(key) is value:
+        value = copy.deepcopy(value)
+        dict.__setitem__(self, key, value)
+      self._TrackLocked(key)
+    return value
+
+  def _Track(self, key):
+    """Records that the value of key may have changed."""
+    with _TRACK_LOCK:
+      self._TrackLocked(key)
+
+  def _TrackLocked(self, key):
+    """Records that the value of key may have changed, holding the lock."""
+    if self._changed is _NO_CHANGES:
+      self._changed = set()
+    self._changed.add(key)
+
 
 class ApiResourceList(ApiAttributeMixin, ApiResource, Iterator):
   """Abstract class of all api list resources.
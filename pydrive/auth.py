@@ -1,28 +1,36 @@
+import datetime
+import json
 import socket
-import webbrowser
-import httplib2
-import oauth2client.clientsecrets as clientsecrets
+import threading
+import time
 from six.moves import input
 
-from apiclient.discovery import build
 from functools import wraps
-from oauth2client.service_account import ServiceAccountCredentials
-from oauth2client.client import FlowExchangeError
-from oauth2client.client import AccessTokenRefreshError
-from oauth2client.client import OAuth2WebServerFlow
-from oauth2client.client import OOB_CALLBACK_URN
-from oauth2client.file import Storage
-from oauth2client.tools import ClientRedirectHandler
-from oauth2client.tools import ClientRedirectServer
-from oauth2client._helpers import scopes_to_string
 from .apiattr import ApiAttribute
 from .apiattr import ApiAttributeMixin
+from .discovery import LoadDiscoveryDocument
+from .hooks import DOWNLOAD_OPERATION
+from .hooks import FileId
+from .hooks import HookedHttp
+from .hooks import Hooks
+from .hooks import OperationName
+from .hooks import REFRESH_OPERATION
+from .hooks import RetryEvents
+from .metrics import Metrics
+from .slowlog import SlowCallLog
+from .retry import RetryPolicy
 from .settings import LoadSettingsFile
 from .settings import ValidateSettings
 from .settings import SettingsError
 from .settings import InvalidConfigError
 
 
+_clock = getattr(time, 'perf_counter', time.time)
+# Headers asking the API for gzip compressed responses, which it only sends to
+# clients mentioning gzip in their user agent.
+GZIP_HEADERS = {'accept-encoding': 'gzip', 'user-agent': 'PyDrive (gzip)'}
+
+
 class AuthError(Exception):
   """Base error for authentication/authorization errors."""
 
@@ -43,38 +51,53 @@ class RefreshError(AuthError):
   """Access token refresh error."""
 
 def LoadAuth(decoratee):
-  """Decorator to check if the auth is valid and loads auth if not."""
+  """Decorator to check if the auth is valid and loads auth if not.
+
+  Calls are timed by the slow call log of the auth, if it has one.
+  """
   @wraps(decoratee)
   def _decorated(self, *args, **kwargs):
-    # Initialize auth if needed.
-    if self.auth is None:
-      self.auth = GoogleAuth()
-    # Re-create access token if it expired.
-    if self.auth.access_token_expired:
-      if getattr(self, 'auth_method', False) == 'service':
-        self.auth.ServiceAuth()
-      else:
-        self.auth.LocalWebserverAuth()
-
-    # Initialise service if not built yet.
-    if self.auth.service is None:
-      self.auth.Authorize()
-
-    # Ensure that a thread-safe HTTP object is provided.
-    if kwargs is not None and \
-            "param" in kwargs and \
-            kwargs["param"] is not None and \
-            "http" in kwargs["param"] and \
-            kwargs["param"]["http"] is not None:
-      self.http = kwargs["param"]["http"]
-      del kwargs["param"]["http"]
-
-    else:  # If HTTP object not specified, each call creates new HTTP object.
-      self.http = self.auth.Get_Http_Object()
-
+    if self.auth is not None and self.auth.slow_call_log is not None:
+      return self.auth.slow_call_log.Call(_LoadAuth, decoratee, self, args,
+                                          kwargs)
+    _LoadAuth(self, kwargs)
     return decoratee(self, *args, **kwargs)
   return _decorated
 
+def _LoadAuth(self, kwargs):
+  """Does the work of LoadAuth before calling the decorated method."""
+  # Initialize auth if needed.
+  if self.auth is None:
+    self.auth = GoogleAuth()
+  # Re-create access token if it expired. Only one thread re-creates it, the
+  # others wait for it and then use the new token.
+  if self.auth.access_token_expired:
+    with self.auth.refresh_lock:
+      if self.auth.access_token_expired:
+        if self.auth.auth_method == 'service':
+          self.auth.ServiceAuth()
+        else:
+          self.auth.LocalWebserverAuth()
+  # Refresh access token in the background if it is about to expire.
+  elif self.auth.access_token_expiring:
+    self.auth.StartBackgroundRefresh()
+
+  # Initialise service if not built yet.
+  if self.auth.service is None:
+    self.auth.Authorize()
+
+  # Ensure that a thread-safe HTTP object is provided.
+  if kwargs is not None and \
+          "param" in kwargs and \
+          kwargs["param"] is not None and \
+          "http" in kwargs["param"] and \
+          kwargs["param"]["http"] is not None:
+    self.http = kwargs["param"]["http"]
+    del kwargs["param"]["http"]
+
+  else:  # If HTTP object not specified, reuse the one owned by this thread.
+    self.http = self.auth.Get_Thread_Http_Object()
+
 def CheckServiceAuth(decoratee):
   """Decorator to authorize service account."""
   @wraps(decoratee)
@@ -152,6 +175,15 @@ class GoogleAuth(ApiAttributeMixin, object):
   http = ApiAttribute('http')
   service = ApiAttribute('service')
   auth_method = ApiAttribute('auth_method')
+  retry_policy = ApiAttribute('retry_policy')
+  rate_limiter = ApiAttribute('rate_limiter')
+  concurrency_limiter = ApiAttribute('concurrency_limiter')
+  http_factory = ApiAttribute('http_factory')
+  hooks = ApiAttribute('hooks')
+  metrics = ApiAttribute('metrics')
+  slow_call_log = ApiAttribute('slow_call_log')
+  json_decoder = ApiAttribute('json_decoder')
+  root_url = ApiAttribute('root_url')
 
   def __init__(self, settings_file='settings.yaml',http_timeout=None):
     """Create an instance of GoogleAuth.
@@ -164,6 +196,12 @@ class GoogleAuth(ApiAttributeMixin, object):
     """
     self.http_timeout=http_timeout
     ApiAttributeMixin.__init__(self)
+    self.thread_local = threading.local()
+    self.refresh_lock = threading.Lock()
+    self.retry_policy = RetryPolicy()
+    self.hooks = Hooks()
+    self.metrics = None
+    self.slow_call_log = None
     self.client_config = {}
     try:
       self.settings = LoadSettingsFile(settings_file)
@@ -174,6 +212,8 @@ class GoogleAuth(ApiAttributeMixin, object):
         self.settings = self.DEFAULT_SETTINGS
       else:
         ValidateSettings(self.settings)
+    self.json_decoder = self.settings.get('json_decoder')
+    self.root_url = None
 
   @property
   def access_token_expired(self):
@@ -185,6 +225,21 @@ class GoogleAuth(ApiAttributeMixin, object):
       return True
     return self.credentials.access_token_expired
 
+  @property
+  def access_token_expiring(self):
+    """Checks if access token expires within the 'token_refresh_margin'.
+
+    :returns: bool -- True if access token expires within the margin.
+    """
+    margin = self.settings.get('token_refresh_margin')
+    if not margin or self.credentials is None:
+      return False
+    expiry = self.credentials.token_expiry
+    if expiry is None:
+      return False
+    remaining = expiry - datetime.datetime.utcnow()
+    return remaining < datetime.timedelta(seconds=margin)
+
   @CheckAuth
   def LocalWebserverAuth(self, host_name='localhost',
                          port_numbers=None):
@@ -201,6 +256,10 @@ class GoogleAuth(ApiAttributeMixin, object):
     :returns: str -- code returned from local web server
     :raises: AuthenticationRejected, AuthenticationError
     """
+    import webbrowser
+    from oauth2client.tools import ClientRedirectHandler
+    from oauth2client.tools import ClientRedirectServer
+
     if port_numbers is None:
       port_numbers = [8080, 8090]  # Mutable objects should not be default
       # values, as each call's changes are global.
@@ -247,6 +306,8 @@ class GoogleAuth(ApiAttributeMixin, object):
 
     :returns: str -- code returned from commandline.
     """
+    from oauth2client.client import OOB_CALLBACK_URN
+
     self.flow.redirect_uri = OOB_CALLBACK_URN
     authorize_url = self.GetAuthUrl()
     print('Go to the following link in your browser:')
@@ -261,6 +322,9 @@ class GoogleAuth(ApiAttributeMixin, object):
     and client email for a Service account.
     :raises: AuthError, InvalidConfigError
     """
+    from oauth2client.service_account import ServiceAccountCredentials
+    from oauth2client._helpers import scopes_to_string
+
     if set(self.SERVICE_CONFIGS_LIST) - set(self.client_config):
       self.LoadServiceConfigSettings()
     scopes = scopes_to_string(self.settings['oauth_scope'])
@@ -299,6 +363,8 @@ class GoogleAuth(ApiAttributeMixin, object):
     :type credentials_file: str.
     :raises: InvalidConfigError, InvalidCredentialsError
     """
+    from oauth2client.file import Storage
+
     if credentials_file is None:
       credentials_file = self.settings.get('save_credentials_file')
       if credentials_file is None:
@@ -335,6 +401,8 @@ class GoogleAuth(ApiAttributeMixin, object):
     :type credentials_file: str.
     :raises: InvalidConfigError, InvalidCredentialsError
     """
+    from oauth2client.file import Storage
+
     if self.credentials is None:
       raise InvalidCredentialsError('No credentials to save')
     if credentials_file is None:
@@ -380,6 +448,8 @@ class GoogleAuth(ApiAttributeMixin, object):
     :type client_config_file: str.
     :raises: InvalidConfigError
     """
+    import oauth2client.clientsecrets as clientsecrets
+
     if client_config_file is None:
       client_config_file = self.settings['client_config_file']
     try:
@@ -438,6 +508,9 @@ class GoogleAuth(ApiAttributeMixin, object):
 
     :raises: InvalidConfigError
     """
+    from oauth2client.client import OAuth2WebServerFlow
+    from oauth2client._helpers import scopes_to_string
+
     if not all(config in self.client_config \
                for config in self.CLIENT_CONFIGS_LIST):
       self.LoadClientConfig()
@@ -464,15 +537,17 @@ class GoogleAuth(ApiAttributeMixin, object):
 
     :raises: RefreshError
     """
+    from oauth2client.client import AccessTokenRefreshError
+
     if self.credentials is None:
       raise RefreshError('No credential to refresh.')
     if self.credentials.refresh_token is None:
       raise RefreshError('No refresh_token found.'
                          'Please set access_type of OAuth to offline.')
     if self.http is None:
-      self.http = httplib2.Http(timeout=self.http_timeout)
+      self.http = self.Get_Unauthorized_Http_Object()
     try:
-      self.credentials.refresh(self.http)
+      self.RefreshCredentials(self.http)
     except AccessTokenRefreshError as error:
       raise RefreshError('Access token refresh failed: %s' % error)
 
@@ -502,6 +577,8 @@ class GoogleAuth(ApiAttributeMixin, object):
     :type code: str.
     :raises: AuthenticationError
     """
+    from oauth2client.client import FlowExchangeError
+
     if self.flow is None:
       self.GetFlow()
     try:
@@ -513,14 +590,155 @@ class GoogleAuth(ApiAttributeMixin, object):
   def Authorize(self):
     """Authorizes and builds service.
 
+    The service is built from a cached copy of the discovery document when
+    one is available, see pydrive.discovery.LoadDiscoveryDocument. If
+    'root_url' is set, e.g. to the url of a pydrive.fakedrive.FakeDrive
+    server, the service sends its requests there instead of to the root url
+    of the document.
+
     :raises: AuthenticationError
     """
     if self.http is None:
-      self.http = httplib2.Http(timeout=self.http_timeout)
+      self.http = self.Get_Unauthorized_Http_Object()
     if self.access_token_expired:
       raise AuthenticationError('No valid credentials provided to authorize')
     self.http = self.credentials.authorize(self.http)
-    self.service = build('drive', 'v2', http=self.http, cache_discovery=False)
+    document = LoadDiscoveryDocument(
+        self.http, cache_file=self.settings.get('discovery_cache_file'))
+    self.service = self._BuildService(document)
+
+  def _BuildService(self, document):
+    """Builds the service from a discovery document.
+
+    Responses of the service are decoded with the decoder set in
+    'json_decoder', see pydrive.model.LoadDecoder.
+
+    :param document: the discovery document.
+    :type document: str or dict.
+    :returns: the Drive API service.
+    """
+    from apiclient.discovery import build_from_document
+    from .model import DriveJsonModel
+
+    if self.root_url is not None:
+      if not isinstance(document, dict):
+        document = json.loads(document)
+      document = dict(document, rootUrl=self.root_url,
+                      baseUrl=self.root_url + document['servicePath'])
+    return build_from_document(document, http=self.http,
+                               model=DriveJsonModel(self.json_decoder))
+
+  def Execute(self, request, http=None):
+    """Executes an API request, retrying it according to the retry policy.
+
+    Every attempt waits for the rate limiter and the concurrency limiter
+    first, if they are set. Events are fired on the registered hooks.
+
+    Requests which are not idempotent, such as Files.insert(), are retried
+    only where that cannot apply them twice, see pydrive.retry.RetryPolicy.
+    Resumable uploads are retried like idempotent requests: executing them
+    again resumes the upload session instead of starting a new one.
+
+    :param request: the request to execute.
+    :type request: googleapiclient.http.HttpRequest
+    :param http: http object to execute the request with.
+    :type http: httplib2.Http
+    :returns: dict -- the deserialized response.
+    :raises: googleapiclient.errors.HttpError
+    """
+    method = request.method if request.resumable is None else None
+    if not self.hooks:
+      return self.retry_policy.CallRequest(method, request.uri, self._Execute,
+                                           request, http)
+    operation, file_id = OperationName(request), FileId(request.uri)
+    http = HookedHttp(http or request.http, self.hooks, operation, file_id)
+    if self.slow_call_log is not None:
+      request.postproc = self.slow_call_log.TimeParse(request.postproc)
+    start = _clock()
+    try:
+      return self.retry_policy.CallRequest(
+          method, request.uri,
+          RetryEvents(self._Execute, self.hooks, operation, file_id),
+          request, http)
+    finally:
+      if self.slow_call_log is not None:
+        self.slow_call_log.AddExecuteTime(_clock() - start)
+
+  def _Execute(self, request, http):
+    """Executes a single attempt of an API request."""
+    if self.rate_limiter is not None:
+      size = len(request.body or '')
+      if request.resumable is not None:
+        size += request.resumable.size() or 0
+      self.rate_limiter.AcquireRequest(request.method, size)
+    if self.concurrency_limiter is not None:
+      return self.concurrency_limiter.Call(request.execute, http=http)
+    return request.execute(http=http)
+
+  def Download(self, url, http=None, file_id=None):
+    """Downloads url, retrying it according to the retry policy.
+
+    Every attempt waits for the rate limiter and the concurrency limiter
+    first, if they are set. Events are fired on the registered hooks.
+
+    :param url: the url to download.
+    :type url: str.
+    :param http: http object to download with.
+    :type http: httplib2.Http
+    :param file_id: id of the downloaded file, reported to hooks.
+    :type file_id: str.
+    :returns: bytes -- the downloaded content.
+    :raises: googleapiclient.errors.HttpError
+    """
+    http = http or self.http
+    if not self.hooks:
+      return self.retry_policy.Call(self._Download, url, http)
+    file_id = file_id or FileId(url)
+    http = HookedHttp(http, self.hooks, DOWNLOAD_OPERATION, file_id)
+    start = _clock()
+    try:
+      return self.retry_policy.Call(
+          RetryEvents(self._Download, self.hooks, DOWNLOAD_OPERATION,
+                      file_id),
+          url, http)
+    finally:
+      if self.slow_call_log is not None:
+        self.slow_call_log.AddExecuteTime(_clock() - start)
+
+  def _Download(self, url, http):
+    """Makes a single attempt of a download."""
+    if self.rate_limiter is not None:
+      self.rate_limiter.AcquireRequest()
+    if self.concurrency_limiter is not None:
+      content = self.concurrency_limiter.Call(self._RequestContent, url, http)
+    else:
+      content = self._RequestContent(url, http)
+    if self.rate_limiter is not None:
+      self.rate_limiter.AcquireBytes(len(content))
+    return content
+
+  def _RequestContent(self, url, http):
+    """Requests url, failing on any non-200 response."""
+    from apiclient import errors
+
+    resp, content = http.request(url, headers=dict(GZIP_HEADERS))
+    if resp.status != 200:
+      raise errors.HttpError(resp, content, uri=url)
+    return content
+
+  def Get_Unauthorized_Http_Object(self):
+    """Create an http object of the configured transport.
+
+    Uses 'http_factory' if set, e.g. a pydrive.transport.Urllib3Transport,
+    and httplib2.Http otherwise.
+
+    :return: The http object, not authorized yet.
+    :rtype: httplib2.Http
+    """
+    if self.http_factory is not None:
+      return self.http_factory(timeout=self.http_timeout)
+    import httplib2
+    return httplib2.Http(timeout=self.http_timeout)
 
   def Get_Http_Object(self):
     """Create and authorize an httplib2.Http object. Necessary for
@@ -528,6 +746,113 @@ class GoogleAuth(ApiAttributeMixin, object):
     :return: The http object to be used in each call.
     :rtype: httplib2.Http
     """
-    http = httplib2.Http(timeout=self.http_timeout)
+    http = self.Get_Unauthorized_Http_Object()
     http = self.credentials.authorize(http)
     return http
+
+  def Get_Thread_Http_Object(self):
+    """Return the authorized httplib2.Http object of the calling thread.
+
+    The object is created on the first call from each thread and reused by
+    every later call from the same thread, which keeps its connections alive
+    between requests. It is rebuilt whenever the credentials are replaced.
+
+    :return: The http object to be used in each call of the current thread.
+    :rtype: httplib2.Http
+    """
+    local = self.thread_local
+    if getattr(local, 'credentials', None) is not self.credentials:
+      local.http = self.Get_Http_Object()
+      local.credentials = self.credentials
+    return local.http
+
+  def RefreshCredentials(self, http):
+    """Refreshes the access token of the credentials, firing on_refresh.
+
+    :param http: unauthorized http object to request the token with.
+    :type http: httplib2.Http
+    :raises: oauth2client.client.AccessTokenRefreshError
+    """
+    if not self.hooks:
+      self.credentials.refresh(http)
+      return
+    start = _clock()
+    try:
+      self.credentials.refresh(http)
+    except Exception as error:
+      self.hooks.Fire('on_refresh', operation=REFRESH_OPERATION,
+                      duration=_clock() - start, error=error)
+      raise
+    self.hooks.Fire('on_refresh', operation=REFRESH_OPERATION,
+                    duration=_clock() - start)
+
+  def EnableMetrics(self, metrics=None):
+    """Maintains metrics of the calls made with this instance.
+
+    :param metrics: the metrics to maintain, new ones if not given.
+    :type metrics: pydrive.metrics.Metrics
+    :returns: pydrive.metrics.Metrics -- the metrics maintained.
+    """
+    if self.metrics is not None:
+      self.metrics.Uninstall(self.hooks)
+    self.metrics = metrics or Metrics()
+    self.metrics.Install(self.hooks)
+    return self.metrics
+
+  def ExportMetrics(self):
+    """Returns a snapshot of the metrics in the Prometheus text format.
+
+    :returns: str -- the metrics, empty if EnableMetrics() was not called.
+    """
+    if self.metrics is None:
+      return ''
+    return self.metrics.Export()
+
+  def EnableSlowCallLog(self, threshold=1.0, logger=None,
+                        profile_operation=None, profile_every=100):
+    """Logs the operations made with this instance which are slow.
+
+    See pydrive.slowlog.SlowCallLog for the parameters.
+
+    :returns: pydrive.slowlog.SlowCallLog -- the slow call log.
+    """
+    if self.slow_call_log is not None:
+      self.slow_call_log.Uninstall(self.hooks)
+    self.slow_call_log = SlowCallLog(threshold, logger, profile_operation,
+                                     profile_every)
+    self.slow_call_log.Install(self.hooks)
+    return self.slow_call_log
+
+  def StartBackgroundRefresh(self):
+    """Refreshes the access token in a background thread.
+
+    Does nothing if the access token cannot be refreshed or if a refresh is
+    already in progress. Callers keep using the current access token meanwhile,
+    so no request has to wait for the refresh.
+
+    :returns: bool -- True if a refresh was started.
+    """
+    if self.credentials is None or (self.credentials.refresh_token is None and
+                                    self.auth_method != 'service'):
+      return False
+    if not self.refresh_lock.acquire(False):
+      return False
+    try:
+      thread = threading.Thread(target=self._BackgroundRefresh)
+      thread.daemon = True
+      thread.start()
+    except Exception:
+      self.refresh_lock.release()
+      raise
+    return True
+
+  def _BackgroundRefresh(self):
+    """Refreshes the access token and releases the refresh lock."""
+    try:
+      self.RefreshCredentials(self.Get_Unauthorized_Http_Object())
+      if self.settings.get('save_credentials'):
+        self.SaveCredentials()
+    except Exception:
+      pass  # The token is re-created by LoadAuth once it has expired.
+    finally:
+      self.refresh_lock.release()
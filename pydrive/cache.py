@@ -0,0 +1,146 @@
+import collections
+import threading
+import time
+
+_clock = getattr(time, 'monotonic', time.time)
+# Number of files a MetadataCache holds by default.
+DEFAULT_MAX_SIZE = 10000
+# Seconds the metadata of a cached file is served for by default.
+DEFAULT_TTL = 300
+
+
+class MetadataCache(object):
+  """Identity map and metadata cache of the files of a GoogleDrive, by id.
+
+  Holds one GoogleDriveFile per file id, so that CreateFile({'id': ...}) and
+  listings return the same object for the same file, and serve its metadata
+  from memory. List, get, insert, update and patch responses about a file
+  are merged into its cached object, keeping its changes not uploaded yet.
+  Files expire 'ttl' seconds after a response about them was last cached,
+  and the least recently used ones are evicted beyond 'max_size' files.
+
+  Cached objects are shared: threads using the same file must not change it
+  concurrently. Enable it with GoogleDrive.EnableMetadataCache().
+  """
+
+  def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+    """Create an instance of MetadataCache.
+
+    :param max_size: number of files to hold at most.
+    :type max_size: int.
+    :param ttl: seconds files are served for, None to keep them until
+      evicted.
+    :type ttl: float.
+    """
+    self.max_size = max_size
+    self.ttl = ttl
+    self._files = collections.OrderedDict()  # id: (file, cached at)
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    with self._lock:
+      return len(self._files)
+
+  def Get(self, file_id):
+    """Returns the cached file with file_id.
+
+    :param file_id: id of the file.
+    :type file_id: str.
+    :returns: pydrive.files.GoogleDriveFile -- the file, None if it is not
+      cached or expired.
+    """
+    with self._lock:
+      entry = self._Pop(file_id)
+      if entry is None:
+        return None
+      self._files[file_id] = entry  # Most recently used.
+      return entry[0]
+
+  def Add(self, file1):
+    """Caches file1 under its id, unless a file is cached for it already.
+
+    :param file1: the file, with an id.
+    :type file1: pydrive.files.GoogleDriveFile
+    :returns: pydrive.files.GoogleDriveFile -- the file cached for the id.
+    """
+    file_id = dict.get(file1, 'id')
+    with self._lock:
+      entry = self._Pop(file_id) or (file1, _clock())
+      self._Put(file_id, entry)
+      return entry[0]
+
+  def Update(self, file1, metadata, fields=None):
+    """Caches a response about file1.
+
+    If another object is cached for the file, the response is merged into
+    it, and file1 is cached otherwise.
+
+    :param file1: the file the response is about.
+    :type file1: pydrive.files.GoogleDriveFile
+    :param metadata: the file resource of the response.
+    :type metadata: dict.
+    :param fields: fields requested, None if metadata is the whole resource.
+    :type fields: list.
+    """
+    file_id = metadata.get('id') or dict.get(file1, 'id')
+    if not file_id:
+      return
+    with self._lock:
+      entry = self._Pop(file_id)
+      cached = entry[0] if entry is not None else file1
+      if cached is not file1:
+        cached._MergeFields(metadata, fields)
+        cached.uploaded = True
+      self._Put(file_id, (cached, _clock()))
+
+  def Resolve(self, metadata, create, whole=True, **attributes):
+    """Returns the cached file of a listed resource, updated with it.
+
+    :param metadata: the file resource, as listed.
+    :type metadata: dict.
+    :param create: called with metadata, whole, 'cache' and attributes to
+      build the file if none is cached, e.g. GoogleDriveFile._FromResource.
+    :type create: callable.
+    :param whole: False if the listing selected some fields only.
+    :type whole: bool.
+    :returns: pydrive.files.GoogleDriveFile -- the file.
+    """
+    file_id = metadata['id']
+    with self._lock:
+      entry = self._Pop(file_id)
+      if entry is None:
+        cached = create(metadata, whole, cache=self, **attributes)
+      else:
+        cached = entry[0]
+        cached._MergeFields(metadata, None if whole else list(metadata))
+        cached.uploaded = True
+      self._Put(file_id, (cached, _clock()))
+      return cached
+
+  def Discard(self, file_id):
+    """Removes the file with file_id, e.g. once it is deleted.
+
+    :param file_id: id of the file.
+    :type file_id: str.
+    """
+    with self._lock:
+      self._files.pop(file_id, None)
+
+  def Clear(self):
+    """Removes every file."""
+    with self._lock:
+      self._files.clear()
+
+  def _Pop(self, file_id):
+    """Removes and returns the entry of file_id, None if missing or expired."""
+    entry = self._files.pop(file_id, None)
+    if entry is not None and self.ttl is not None and \
+        _clock() - entry[1] >= self.ttl:
+      return None
+    return entry
+
+  def _Put(self, file_id, entry):
+    """Stores an entry as the most recently used, evicting beyond max_size."""
+    self._files[file_id] = entry
+    while len(self._files) > self.max_size:
+      self._files.popitem(last=False)
@@ -0,0 +1,307 @@
+import base64
+import gzip
+import json
+import threading
+import time
+
+from six.moves.urllib.parse import parse_qsl
+from six.moves.urllib.parse import urlencode
+from six.moves.urllib.parse import urlsplit
+from six.moves.urllib.parse import urlunsplit
+
+_clock = getattr(time, 'perf_counter', time.time)
+CASSETTE_VERSION = 1
+REDACTED = 'REDACTED'
+# Request headers, query parameters and form or JSON fields holding secrets.
+SECRET_HEADERS = ('authorization', 'proxy-authorization', 'cookie')
+SECRET_FIELDS = ('access_token', 'refresh_token', 'id_token', 'client_secret',
+                 'code', 'assertion', 'key', 'password')
+# Request bodies larger than this, e.g. uploaded media, are not stored.
+MAX_STORED_BODY = 64 * 1024
+
+
+class CassetteError(IOError):
+  """Error reading a cassette or replaying a request it does not hold."""
+
+
+class Recorder(object):
+  """http_factory recording the traffic of the http objects it creates.
+
+  Set an instance as GoogleAuth.http_factory, run the job and save the
+  cassette. Responses, including media, are stored as received, while the
+  secrets of requests and token responses are redacted:
+
+    recorder = Recorder()
+    gauth.http_factory = recorder
+    ...
+    recorder.Save('job.cassette')
+  """
+
+  def __init__(self, http_factory=None):
+    """Create an instance of Recorder.
+
+    :param http_factory: factory of the http objects sending the requests,
+      httplib2.Http if not given.
+    :type http_factory: callable.
+    """
+    self.http_factory = http_factory
+    self.interactions = []
+    self._lock = threading.Lock()
+    self._start = _clock()
+
+  def __call__(self, timeout=None):
+    """Returns a new http object recording its requests.
+
+    :param timeout: socket timeout of the http object.
+    :type timeout: float.
+    :returns: RecordingHttp -- the http object.
+    """
+    if self.http_factory is not None:
+      http = self.http_factory(timeout=timeout)
+    else:
+      import httplib2
+      http = httplib2.Http(timeout=timeout)
+    return RecordingHttp(http, self)
+
+  def Record(self, method, uri, body, headers, resp, content, start,
+             duration):
+    """Stores one request and its response, with secrets redacted.
+
+    :param start: clock time at which the request was sent.
+    :type start: float.
+    :param duration: seconds the request took.
+    :type duration: float.
+    """
+    interaction = {
+        'method': method,
+        'uri': _RedactUri(uri),
+        'request_headers': _RedactHeaders(headers),
+        'request_bytes': len(body or b''),
+        'status': resp.status,
+        'headers': dict((k, v) for k, v in resp.items() if k != 'status'),
+        'start': round(start - self._start, 6),
+        'duration': round(duration, 6),
+    }
+    if body and len(body) <= MAX_STORED_BODY:
+      _StoreBytes(interaction, 'body', _RedactBody(body, headers))
+    _StoreBytes(interaction, 'content', _RedactContent(content))
+    with self._lock:
+      self.interactions.append(interaction)
+
+  def Save(self, path):
+    """Writes the recorded interactions to a gzip compressed cassette file.
+
+    :param path: path of the cassette file.
+    :type path: str.
+    """
+    with self._lock:
+      interactions = list(self.interactions)
+    SaveCassette(path, interactions)
+
+
+class RecordingHttp(object):
+  """Wraps an http object to record its requests on a Recorder."""
+
+  def __init__(self, http, recorder):
+    self.http = http
+    self.recorder = recorder
+
+  def __getattr__(self, name):
+    return getattr(self.http, name)
+
+  def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+    """Sends a request, with the signature of httplib2.Http.request()."""
+    if hasattr(body, 'read'):
+      body = body.read()
+    start = _clock()
+    resp, content = self.http.request(uri, method=method, body=body,
+                                      headers=headers, **kwargs)
+    self.recorder.Record(method, uri, body, headers, resp, content, start,
+                         _clock() - start)
+    return resp, content
+
+
+class Player(object):
+  """http_factory answering requests with the responses of a cassette.
+
+  Requests are matched by method and uri, ignoring secrets and the order of
+  query parameters, and identical requests get the recorded responses in
+  order. Replays run at full speed, or with the timing of the recording if
+  'realtime' is set: no response comes before the time its request was sent
+  in the recording, relative to the first request, plus its duration, and
+  none takes less than its duration. Nothing is sent over the network.
+  """
+
+  def __init__(self, cassette, realtime=False):
+    """Create an instance of Player.
+
+    :param cassette: path of a cassette file, or its interactions.
+    :type cassette: str or list.
+    :param realtime: whether to pace responses as they were recorded.
+    :type realtime: bool.
+    """
+    if not isinstance(cassette, list):
+      cassette = LoadCassette(cassette)
+    self.realtime = realtime
+    self.responses = {}
+    # Recorded time of the first request, and clock time the replay of the
+    # recording starts at, set by the first request.
+    self._first = min([i['start'] for i in cassette] or [0])
+    self._start = None
+    for interaction in cassette:
+      key = (interaction['method'], _MatchKey(interaction['uri']))
+      self.responses.setdefault(key, []).append(interaction)
+    for responses in self.responses.values():
+      responses.reverse()  # Popped from the end.
+    self._lock = threading.Lock()
+
+  def __call__(self, timeout=None):
+    """Returns self, as the http object answering requests.
+
+    :param timeout: ignored, accepted for GoogleAuth.http_factory.
+    """
+    return self
+
+  def request(self, uri, method='GET', body=None, headers=None,
+              redirections=5, connection_type=None):
+    """Answers a request, with the signature of httplib2.Http.request().
+
+    :raises: CassetteError
+    """
+    import httplib2
+
+    with self._lock:
+      responses = self.responses.get((method, _MatchKey(_RedactUri(uri))))
+      if not responses:
+        raise CassetteError('No recorded response left for %s %s' % (
+            method, uri))
+      interaction = responses.pop()
+      now = _clock()
+      if self._start is None:
+        self._start = now - self._first
+    if self.realtime:
+      sent = max(now, self._start + interaction['start'])
+      time.sleep(max(0, sent + interaction['duration'] - _clock()))
+    resp = httplib2.Response(dict(interaction['headers']))
+    resp.status = interaction['status']
+    return resp, _LoadBytes(interaction, 'content')
+
+  def Remaining(self):
+    """Returns the number of recorded responses not replayed yet.
+
+    :returns: int -- the number of responses.
+    """
+    with self._lock:
+      return sum(len(responses) for responses in self.responses.values())
+
+
+def SaveCassette(path, interactions):
+  """Writes interactions to a cassette file, one JSON line each, gzipped.
+
+  :param path: path of the cassette file.
+  :type path: str.
+  :param interactions: the interactions, as recorded by a Recorder.
+  :type interactions: list.
+  """
+  with gzip.open(path, 'wb') as f:
+    f.write(_Line({'version': CASSETTE_VERSION}))
+    for interaction in interactions:
+      f.write(_Line(interaction))
+
+
+def LoadCassette(path):
+  """Reads the interactions of a cassette file.
+
+  :param path: path of the cassette file.
+  :type path: str.
+  :returns: list -- the interactions.
+  :raises: CassetteError
+  """
+  try:
+    with gzip.open(path, 'rb') as f:
+      lines = [json.loads(line.decode('utf-8')) for line in f if line.strip()]
+  except (IOError, ValueError) as error:
+    raise CassetteError('Cannot read cassette %s: %s' % (path, error))
+  if not lines or lines[0].get('version') != CASSETTE_VERSION:
+    raise CassetteError('Unsupported cassette %s' % path)
+  return lines[1:]
+
+
+def _Line(value):
+  return (json.dumps(value, sort_keys=True, separators=(',', ':')) +
+          '\n').encode('utf-8')
+
+
+def _StoreBytes(interaction, name, data):
+  """Stores data as text if it is UTF-8, in base64 otherwise."""
+  if not isinstance(data, bytes):
+    data = data.encode('utf-8')
+  try:
+    interaction[name] = data.decode('utf-8')
+  except UnicodeDecodeError:
+    interaction[name + '_base64'] = base64.b64encode(data).decode('ascii')
+
+
+def _LoadBytes(interaction, name):
+  if name in interaction:
+    return interaction[name].encode('utf-8')
+  if name + '_base64' in interaction:
+    return base64.b64decode(interaction[name + '_base64'])
+  return b''
+
+
+def _Str(value):
+  return value.decode('latin-1') if isinstance(value, bytes) else str(value)
+
+
+def _RedactHeaders(headers):
+  """Returns headers with lower case str names, secret values redacted."""
+  redacted = {}
+  for name, value in (headers or {}).items():
+    name = _Str(name).lower()
+    redacted[name] = REDACTED if name in SECRET_HEADERS else _Str(value)
+  return redacted
+
+
+def _RedactUri(uri):
+  """Returns uri with the values of secret query parameters redacted."""
+  parts = urlsplit(uri)
+  if not parts.query:
+    return uri
+  query = [(k, REDACTED if k in SECRET_FIELDS else v)
+           for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+  return urlunsplit(parts[:3] + (urlencode(query),) + parts[4:])
+
+
+def _MatchKey(uri):
+  """Returns uri with its query parameters sorted."""
+  parts = urlsplit(uri)
+  query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+  return urlunsplit(parts[:3] + (urlencode(query),) + parts[4:])
+
+
+def _RedactBody(body, headers):
+  """Returns a request body with the secrets of form bodies redacted."""
+  content_type = _RedactHeaders(headers).get('content-type', '')
+  if not content_type.startswith('application/x-www-form-urlencoded'):
+    return body
+  if isinstance(body, bytes):
+    body = body.decode('utf-8')
+  return urlencode([(k, REDACTED if k in SECRET_FIELDS else v)
+                    for k, v in parse_qsl(body, keep_blank_values=True)])
+
+
+def _RedactContent(content):
+  """Returns a response body with the tokens of token responses redacted."""
+  if not content or b'_token"' not in content[:4096]:
+    return content
+  try:
+    value = json.loads(content.decode('utf-8'))
+  except ValueError:
+    return content
+  if not isinstance(value, dict) or 'access_token' not in value:
+    return content
+  for field in SECRET_FIELDS:
+    if field in value:
+      value[field] = REDACTED
+  return json.dumps(value).encode('utf-8')
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from .retry import IsRetryableError
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class AdaptiveConcurrencyLimiter(object):
+  """Limits the number of requests in flight and adapts the limit (AIMD).
+
+  The limit grows additively, by one per 'limit' healthy requests, while
+  requests succeed within the latency threshold. It is cut multiplicatively
+  when a request fails with a rate limit, 5xx or network error. Requests
+  started before the last cut do not cut it again, as they were sent at the
+  old limit. The limiter is thread-safe; callers block while the limit is
+  reached.
+  """
+
+  def __init__(self, initial_limit=4, min_limit=1, max_limit=64,
+               backoff_ratio=0.5, latency_threshold=None):
+    """Create an instance of AdaptiveConcurrencyLimiter.
+
+    :param initial_limit: number of requests allowed in flight at first.
+    :type initial_limit: int.
+    :param min_limit: lower bound of the limit.
+    :type min_limit: int.
+    :param max_limit: upper bound of the limit.
+    :type max_limit: int.
+    :param backoff_ratio: factor the limit is multiplied with on overload.
+    :type backoff_ratio: float.
+    :param latency_threshold: latency in seconds above which a request does
+      not raise the limit, any latency is healthy if not given.
+    :type latency_threshold: float.
+    """
+    self.limit = float(initial_limit)
+    self.min_limit = min_limit
+    self.max_limit = max_limit
+    self.backoff_ratio = backoff_ratio
+    self.latency_threshold = latency_threshold
+    self.in_flight = 0
+    self._last_decrease = None
+    self._condition = threading.Condition()
+
+  def Acquire(self):
+    """Waits until a request may be sent.
+
+    :returns: float -- start time of the request, to be passed to Release().
+    """
+    with self._condition:
+      while self.in_flight >= int(self.limit):
+        self._condition.wait()
+      self.in_flight += 1
+      return _clock()
+
+  def Release(self, start, overloaded=False):
+    """Marks a request as finished and adapts the limit.
+
+    :param start: start time returned by Acquire().
+    :type start: float.
+    :param overloaded: True if the request failed because the API is
+      overloaded or rate limited.
+    :type overloaded: bool.
+    """
+    now = _clock()
+    with self._condition:
+      self.in_flight -= 1
+      if overloaded:
+        if self._last_decrease is None or start >= self._last_decrease:
+          self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+          self._last_decrease = now
+      elif self.latency_threshold is None or \
+              now - start <= self.latency_threshold:
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+      self._condition.notify_all()
+
+  def Call(self, function, *args, **kwargs):
+    """Calls function once a request may be sent and adapts the limit.
+
+    :param function: the function making the request.
+    :type function: callable.
+    :returns: the return value of function.
+    """
+    start = self.Acquire()
+    overloaded = False
+    try:
+      return function(*args, **kwargs)
+    except Exception as error:
+      overloaded = IsRetryableError(error)
+      raise
+    finally:
+      self.Release(start, overloaded)
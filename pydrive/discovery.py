@@ -0,0 +1,109 @@
+import os
+import threading
+
+DISCOVERY_URI = ('https://www.googleapis.com/discovery/v1/apis/'
+                 '%s/%s/rest')
+
+# Discovery documents already loaded by this process, keyed by (api, version).
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+class DiscoveryError(IOError):
+  """Error while loading an API discovery document."""
+
+
+def LoadDiscoveryDocument(http, api='drive', version='v2', cache_file=None):
+  """Returns the discovery document of an API as a JSON string.
+
+  The document is looked up, in order, in the documents already loaded by this
+  process, in the cache file, in the copy bundled with google-api-python-client
+  and finally on the network. Documents not read from the cache file are
+  written to it, so that later processes do not need the network. The cache
+  file records the api and version of its document, and a document of
+  another api or version is not read from it but replaced.
+
+  :param http: http object used when the document has to be downloaded.
+  :type http: httplib2.Http
+  :param api: name of the API.
+  :type api: str.
+  :param version: version of the API.
+  :type version: str.
+  :param cache_file: path of the file to cache the document in, if any.
+  :type cache_file: str.
+  :returns: str -- the discovery document.
+  :raises: DiscoveryError
+  """
+  key = (api, version)
+  document = _documents.get(key)
+  if document is not None:
+    return document
+  with _documents_lock:
+    document = _documents.get(key)
+    if document is None:
+      document = _ReadCacheFile(cache_file, key)
+      if document is None:
+        document = _GetStaticDocument(api, version)
+        if document is None:
+          document = _FetchDocument(http, api, version)
+        if cache_file is not None:
+          _WriteCacheFile(cache_file, key, document)
+      _documents[key] = document
+  return document
+
+
+def _CacheHeader(key):
+  """Returns the first line of a cache file holding the document of key."""
+  return '%s %s\n' % key
+
+
+def _ReadCacheFile(cache_file, key):
+  """Reads the cached discovery document of key, if there is one."""
+  if cache_file is None or not os.path.exists(cache_file):
+    return None
+  try:
+    with open(cache_file, 'r') as f:
+      if f.readline() != _CacheHeader(key):
+        return None  # Another api or version, or an old cache file.
+      return f.read() or None
+  except IOError:
+    return None
+
+
+def _WriteCacheFile(cache_file, key, document):
+  """Writes the discovery document of key to the cache file.
+
+  The document is written to a temporary file first and then moved into place,
+  so concurrent processes never read a partially written cache file.
+  """
+  tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+  try:
+    with open(tmp_file, 'w') as f:
+      f.write(_CacheHeader(key))
+      f.write(document)
+    getattr(os, 'replace', os.rename)(tmp_file, cache_file)
+  except (IOError, OSError):
+    pass  # The cache is an optimization only.
+
+
+def _GetStaticDocument(api, version):
+  """Returns the copy of the document bundled with google-api-python-client.
+
+  Only versions 2.0 and later of the client library bundle their documents.
+  """
+  try:
+    from googleapiclient.discovery_cache import get_static_doc
+  except ImportError:
+    return None
+  return get_static_doc(api, version)
+
+
+def _FetchDocument(http, api, version):
+  """Downloads the discovery document of an API."""
+  uri = DISCOVERY_URI % (api, version)
+  resp, content = http.request(uri)
+  if resp.status >= 400:
+    raise DiscoveryError('Cannot load discovery document %s: %s' % (uri, resp))
+  if isinstance(content, bytes):
+    content = content.decode('utf-8')
+  return content
@@ -1,31 +1,65 @@
+import threading
+
 from .apiattr import ApiAttributeMixin
+from .cache import DEFAULT_MAX_SIZE
+from .cache import DEFAULT_TTL
+from .cache import MetadataCache
+from .singleflight import SingleFlight
 from .files import GoogleDriveFile
 from .files import GoogleDriveFileList
 from .auth import LoadAuth
 
+# Number of worker threads of the executor of GoogleDrive by default.
+MAX_WORKERS = 8
+
 
 class GoogleDrive(ApiAttributeMixin, object):
   """Main Google Drive class."""
 
-  def __init__(self, auth=None):
+  def __init__(self, auth=None, max_workers=MAX_WORKERS):
     """Create an instance of GoogleDrive.
 
     :param auth: authorized GoogleAuth instance.
     :type auth: pydrive.auth.GoogleAuth.
+    :param max_workers: number of threads running submitted operations.
+    :type max_workers: int.
     """
     ApiAttributeMixin.__init__(self)
     self.auth = auth
+    self.max_workers = max_workers
+    self.executor = None
+    self.futures = set()
+    self.metadata_cache = None
+    self.single_flight = None
+    self._executor_lock = threading.Lock()
 
   def CreateFile(self, metadata=None):
     """Create an instance of GoogleDriveFile with auth of this instance.
 
     This method would not upload a file to GoogleDrive.
 
+    If the metadata cache is enabled, files created from an id alone are
+    the cached file with that id.
+
     :param metadata: file resource to initialize GoogleDriveFile with.
     :type metadata: dict.
     :returns: pydrive.files.GoogleDriveFile -- initialized with auth of this instance.
     """
-    return GoogleDriveFile(auth=self.auth, metadata=metadata)
+    cache = self.metadata_cache
+    by_id = cache is not None and metadata is not None and \
+        list(metadata) == ['id']
+    if by_id:
+      file1 = cache.Get(metadata['id'])
+      if self.auth is not None and self.auth.metrics is not None:
+        self.auth.metrics.RecordCacheLookup('metadata', file1 is not None)
+      if file1 is not None:
+        return file1
+    file1 = GoogleDriveFile(auth=self.auth, metadata=metadata)
+    if cache is not None:
+      file1.cache = cache
+    if self.single_flight is not None:
+      file1.single_flight = self.single_flight
+    return cache.Add(file1) if by_id else file1
 
   def ListFile(self, param=None):
     """Create an instance of GoogleDriveFileList with auth of this instance.
@@ -36,7 +70,39 @@ class GoogleDrive(ApiAttributeMixin, object):
     :type param: dict.
     :returns: pydrive.files.GoogleDriveFileList -- initialized with auth of this instance.
     """
-    return GoogleDriveFileList(auth=self.auth, param=param)
+    file_list = GoogleDriveFileList(auth=self.auth, param=param)
+    file_list.cache = self.metadata_cache
+    file_list.single_flight = self.single_flight
+    return file_list
+
+  def EnableMetadataCache(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+    """Caches the files of this instance by id, see pydrive.cache.
+
+    Files created from an id alone and listed files are then the same object
+    for the same file, and their metadata is served from memory for 'ttl'
+    seconds. Lookups are counted by the metrics of the auth, if enabled.
+
+    :param max_size: number of files to hold at most.
+    :type max_size: int.
+    :param ttl: seconds files are served for, None to keep them until
+      evicted.
+    :type ttl: float.
+    :returns: pydrive.cache.MetadataCache -- the cache.
+    """
+    self.metadata_cache = MetadataCache(max_size, ttl)
+    return self.metadata_cache
+
+  def EnableRequestCoalescing(self):
+    """Coalesces concurrent identical requests of files, see pydrive.singleflight.
+
+    Concurrent FetchMetadata() calls for the same fields of the same file,
+    and FetchContent() calls for the same file and mimetype, of files
+    created or listed afterwards then share one request and its result.
+
+    :returns: pydrive.singleflight.SingleFlight -- the coalescer.
+    """
+    self.single_flight = SingleFlight()
+    return self.single_flight
 
   @LoadAuth
   def GetAbout(self):
@@ -44,4 +110,115 @@ class GoogleDrive(ApiAttributeMixin, object):
 
     :returns: A dictionary of Google Drive information like user, usage, quota etc.
     """
-    return self.auth.service.about().get().execute(http=self.http)
+    return self.auth.Execute(self.auth.service.about().get(), http=self.http)
+
+  def RegisterHook(self, event, callback):
+    """Calls callback with a pydrive.hooks.Event on every event of a name.
+
+    Hooks are kept by the auth instance, so they apply to every GoogleDrive
+    and AsyncGoogleDrive sharing it.
+
+    :param event: name of the event, one of pydrive.hooks.EVENTS.
+    :type event: str.
+    :param callback: function called with the event.
+    :type callback: callable.
+    :raises: ValueError
+    """
+    self.auth.hooks.Register(event, callback)
+
+  def UnregisterHook(self, event, callback):
+    """Stops calling a callback registered with RegisterHook().
+
+    :param event: name of the event.
+    :type event: str.
+    :param callback: the registered callback.
+    :type callback: callable.
+    """
+    self.auth.hooks.Unregister(event, callback)
+
+  def Submit(self, function, *args, **kwargs):
+    """Schedule function to be run by a worker thread of this instance.
+
+    At most 'max_workers' functions run at the same time. Every worker thread
+    makes its calls with its own authorized http object.
+
+    :param function: the function to run.
+    :type function: callable.
+    :returns: concurrent.futures.Future -- the result of the function.
+    """
+    with self._executor_lock:
+      if self.executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+      future = self.executor.submit(function, *args, **kwargs)
+      self.futures.add(future)
+    future.add_done_callback(self.futures.discard)
+    return future
+
+  def SubmitUpload(self, drive_file, param=None):
+    """Schedule an upload of drive_file, see GoogleDriveFile.Upload().
+
+    :param drive_file: the file to upload.
+    :type drive_file: pydrive.files.GoogleDriveFile
+    :param param: additional parameter to upload file.
+    :type param: dict.
+    :returns: concurrent.futures.Future -- resolving to drive_file.
+    """
+    return self.Submit(_CallAndReturn, drive_file, drive_file.Upload,
+                       param=param)
+
+  def SubmitFetch(self, drive_file, fields=None, fetch_all=False):
+    """Schedule a fetch of drive_file's metadata, see
+    GoogleDriveFile.FetchMetadata().
+
+    :param drive_file: the file to fetch the metadata of.
+    :type drive_file: pydrive.files.GoogleDriveFile
+    :param fields: The fields to include, as one string, each entry separated
+    by commas, e.g. 'fields,labels'.
+    :type fields: str
+    :param fetch_all: Whether to fetch all fields.
+    :type fetch_all: bool
+    :returns: concurrent.futures.Future -- resolving to drive_file.
+    """
+    return self.Submit(_CallAndReturn, drive_file, drive_file.FetchMetadata,
+                       fields=fields, fetch_all=fetch_all)
+
+  def SubmitDownload(self, drive_file, filename, mimetype=None,
+                     remove_bom=False):
+    """Schedule a download of drive_file's content to a local file, see
+    GoogleDriveFile.GetContentFile().
+
+    :param drive_file: the file to download.
+    :type drive_file: pydrive.files.GoogleDriveFile
+    :param filename: name of the file to write to.
+    :type filename: str
+    :param mimetype: mimeType of the file.
+    :type mimetype: str
+    :param remove_bom: Whether to remove the byte order marking.
+    :type remove_bom: bool
+    :returns: concurrent.futures.Future -- resolving to drive_file.
+    """
+    return self.Submit(_CallAndReturn, drive_file, drive_file.GetContentFile,
+                       filename, mimetype=mimetype, remove_bom=remove_bom)
+
+  def Shutdown(self, wait=True, cancel_futures=False):
+    """Stop the worker threads of this instance.
+
+    :param wait: Whether to wait for running and scheduled functions.
+    :type wait: bool
+    :param cancel_futures: Whether to cancel functions which have not started.
+    :type cancel_futures: bool
+    """
+    with self._executor_lock:
+      executor, self.executor = self.executor, None
+      if cancel_futures:
+        for future in list(self.futures):
+          future.cancel()
+    if executor is not None:
+      executor.shutdown(wait=wait)
+
+
+def _CallAndReturn(drive_file, method, *args, **kwargs):
+  """Calls a method of drive_file and returns drive_file."""
+  method(*args, **kwargs)
+  return drive_file
@@ -0,0 +1,775 @@
+import datetime
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib.parse import parse_qsl
+from six.moves.urllib.parse import urlsplit
+
+from .transport import NormalizeHeaders
+
+ROOT_URL = 'https://www.googleapis.com/'
+# Seconds an access token issued by FakeDrive is valid for.
+TOKEN_LIFETIME = 3600
+# Default and maximum page size of Files.list(), as in the Drive API.
+DEFAULT_MAX_RESULTS = 100
+MAX_MAX_RESULTS = 1000
+# Statuses of errors injected at random by FakeDrive(error_rate=...).
+RANDOM_ERROR_STATUSES = (500, 503)
+GOOGLE_APPS_PREFIX = 'application/vnd.google-apps.'
+EXPORT_BOM = u'\ufeff'.encode('utf8')
+
+_clock = getattr(time, 'monotonic', time.time)
+_QUERY_CLAUSES = [
+    (re.compile(r"^'([^']*)' in parents$"),
+     lambda v: lambda f: v in [p['id'] for p in f.get('parents', [])]),
+    (re.compile(r'^trashed\s*=\s*(true|false)$'),
+     lambda v: lambda f: f['labels']['trashed'] == (v == 'true')),
+    (re.compile(r"^(title|mimeType)\s*=\s*'([^']*)'$"),
+     lambda k, v: lambda f: f.get(k) == v),
+    (re.compile(r"^(title|mimeType)\s*!=\s*'([^']*)'$"),
+     lambda k, v: lambda f: f.get(k) != v),
+    (re.compile(r"^(title)\s+contains\s+'([^']*)'$"),
+     lambda k, v: lambda f: v in f.get(k, '')),
+]
+
+
+class FakeDriveError(Exception):
+  """Error response of FakeDrive, turned into a Drive API error body."""
+
+  def __init__(self, status, reason, message=None):
+    super(FakeDriveError, self).__init__(message or reason)
+    self.status = status
+    self.reason = reason
+    self.message = message or reason
+
+  def Body(self):
+    """Returns the JSON error body the Drive API would send."""
+    return json.dumps({'error': {
+        'errors': [{'domain': 'global', 'reason': self.reason,
+                    'message': self.message}],
+        'code': self.status, 'message': self.message}}).encode('utf-8')
+
+
+class _Headers(dict):
+  """Headers of a response without a body."""
+
+
+class FakeDrive(object):
+  """In-process fake of the Drive v2 API, for tests and benchmarks.
+
+  Implements Files insert/get/patch/update/list/trash/untrash/delete, media
+  downloads and exports, simple, multipart and resumable uploads, Permissions
+  insert/list/get/delete, batch requests and the OAuth2 token endpoint.
+  Requests can be delayed by a fixed latency, rejected by a rate limit, and
+  failed by injected or random errors, all deterministically.
+
+  A FakeDrive is an http_factory, so requests never leave the process:
+
+    fake = FakeDrive(latency=0.01)
+    gauth = fake.Authorize(GoogleAuth())
+    drive = GoogleDrive(gauth)
+
+  Serve() makes it listen on a local port instead, e.g. for AsyncGoogleDrive.
+  """
+
+  def __init__(self, latency=0.0, error_rate=0.0, queries_per_second=None,
+               seed=0, clock=None):
+    """Create an instance of FakeDrive.
+
+    :param latency: seconds every request is delayed by.
+    :type latency: float.
+    :param error_rate: probability of a request failing with a 500 or 503.
+    :type error_rate: float.
+    :param queries_per_second: rate of requests allowed, requests above it get
+      a 403 userRateLimitExceeded error. Not limited if not given.
+    :type queries_per_second: float.
+    :param seed: seed of the random errors.
+    :type seed: int.
+    :param clock: function returning the time in seconds used by the rate
+      limit, a monotonic clock if not given.
+    :type clock: callable.
+    """
+    self.latency = latency
+    self.error_rate = error_rate
+    self.queries_per_second = queries_per_second
+    self.clock = clock or _clock
+    self.root_url = ROOT_URL
+    self.server = None
+    self.files = {}
+    self.contents = {}
+    self.uploads = {}
+    self.tokens = set()
+    self.requests = []
+    self._order = []
+    self._errors = []
+    self._random = random.Random(seed)
+    self._allowance = queries_per_second
+    self._checked = None
+    self._next_id = 0
+    self._lock = threading.RLock()
+
+  def __call__(self, timeout=None):
+    """Creates an http object sending requests to this fake.
+
+    :param timeout: ignored, accepted for GoogleAuth.http_factory.
+    :type timeout: float.
+    :returns: FakeHttp -- the http object.
+    """
+    return FakeHttp(self)
+
+  def Authorize(self, auth):
+    """Points auth at this fake with dummy credentials and builds its service.
+
+    :param auth: the GoogleAuth instance to authorize.
+    :type auth: pydrive.auth.GoogleAuth
+    :returns: pydrive.auth.GoogleAuth -- auth.
+    """
+    if self.server is None:
+      auth.http_factory = self
+      auth.root_url = None
+    else:
+      auth.root_url = self.root_url
+    auth.credentials = self.Credentials()
+    auth.http = None
+    auth.Authorize()
+    return auth
+
+  def Credentials(self, lifetime=TOKEN_LIFETIME):
+    """Returns refreshable OAuth2 credentials accepted by this fake.
+
+    :param lifetime: seconds until the access token expires.
+    :type lifetime: int.
+    :returns: oauth2client.client.OAuth2Credentials -- the credentials.
+    """
+    from oauth2client.client import OAuth2Credentials
+
+    expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=lifetime)
+    return OAuth2Credentials(
+        self._IssueToken(), 'fake-client-id', 'fake-client-secret',
+        'fake-refresh-token', expiry, self.root_url + 'token', None)
+
+  def RevokeTokens(self):
+    """Invalidates every access token issued so far."""
+    with self._lock:
+      self.tokens.clear()
+
+  def InjectError(self, status, reason=None, count=1, method=None, path=None,
+                  after=False):
+    """Fails the next matching requests with an error response.
+
+    :param status: HTTP status of the error.
+    :type status: int.
+    :param reason: reason of the error, e.g. 'rateLimitExceeded'.
+    :type reason: str.
+    :param count: number of requests to fail.
+    :type count: int.
+    :param method: HTTP method of the requests to fail, any if not given.
+    :type method: str.
+    :param path: substring of the path of the requests to fail.
+    :type path: str.
+    :param after: whether to fail the requests only after applying them, as
+      if their responses were lost.
+    :type after: bool.
+    """
+    with self._lock:
+      self._errors.append({'status': status, 'reason': reason or 'error',
+                           'count': count, 'method': method, 'path': path,
+                           'after': after})
+
+  def AddFile(self, metadata=None, content=None):
+    """Adds a file directly, without a request, e.g. to fill a large drive.
+
+    :param metadata: file resource to create the file from.
+    :type metadata: dict.
+    :param content: content of the file.
+    :type content: bytes.
+    :returns: dict -- the file resource.
+    """
+    with self._lock:
+      return self._CreateFile(metadata or {}, content)
+
+  def Serve(self, host='127.0.0.1', port=0):
+    """Serves this fake over HTTP on a local port, in a daemon thread.
+
+    :returns: str -- the root url of the server, e.g. 'http://127.0.0.1:5555/'.
+    """
+    fake = self
+
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+      protocol_version = 'HTTP/1.1'
+      disable_nagle_algorithm = True
+
+      def Handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        headers = dict((k.lower(), v) for k, v in self.headers.items())
+        status, response_headers, content = fake.Handle(
+            self.command, fake.root_url[:-1] + self.path, headers, body)
+        self.send_response(status)
+        for name, value in response_headers.items():
+          self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+      do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = Handle
+
+      def log_message(self, *args):
+        pass
+
+    class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+      daemon_threads = True
+
+    self.server = Server((host, port), Handler)
+    self.root_url = 'http://%s:%d/' % (host, self.server.server_address[1])
+    thread = threading.Thread(target=self.server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return self.root_url
+
+  def Shutdown(self):
+    """Stops the server started by Serve()."""
+    if self.server is not None:
+      self.server.shutdown()
+      self.server.server_close()
+      self.server = None
+      self.root_url = ROOT_URL
+
+  def Handle(self, method, uri, headers=None, body=None):
+    """Handles one HTTP request.
+
+    :param method: HTTP method of the request.
+    :type method: str.
+    :param uri: absolute uri of the request.
+    :type uri: str.
+    :param headers: headers of the request, with lower case names.
+    :type headers: dict.
+    :param body: body of the request.
+    :type body: bytes.
+    :returns: tuple -- status, response headers and body of the response.
+    """
+    if self.latency:
+      time.sleep(self.latency)
+    return self._Respond(method, uri, headers or {}, body)
+
+  def _Respond(self, method, uri, headers, body):
+    """Handles a request without delaying it, turning errors into responses."""
+    parts = urlsplit(uri)
+    path = parts.path
+    query = dict(parse_qsl(parts.query))
+    try:
+      with self._lock:
+        self.requests.append((method, path))
+        if path in ('/token', '/o/oauth2/token'):
+          return self._Token()
+        self._CheckAuthorization(headers)
+        self._CheckErrors(method, path)
+        if path.startswith('/batch'):
+          return self._Batch(headers, body)
+        if path.startswith('/discovery/'):
+          return self._Discovery()
+        status, content = self._Dispatch(method, path, query, headers, body)
+        self._CheckInjectedErrors(method, path, after=True)
+        if isinstance(content, _Headers):
+          return status, content, b''
+        if isinstance(content, bytes):
+          return status, {'content-type': 'application/octet-stream'}, content
+        content = json.dumps(_SelectFields(content, query.get('fields')))
+    except FakeDriveError as error:
+      return error.status, {'content-type': 'application/json'}, error.Body()
+    return status, {'content-type': 'application/json; charset=UTF-8'}, \
+        content.encode('utf-8')
+
+  def _Dispatch(self, method, path, query, headers, body):
+    """Routes an API request to the method implementing it.
+
+    :returns: tuple -- status and the resource, bytes or _Headers to respond
+      with.
+    """
+    upload = path.startswith('/upload/')
+    if upload:
+      path = path[len('/upload'):]
+    if not path.startswith('/drive/v2/'):
+      raise FakeDriveError(404, 'notFound', 'Not Found')
+    segments = path[len('/drive/v2/'):].strip('/').split('/')
+    if segments[0] != 'files':
+      raise FakeDriveError(404, 'notFound', 'Not Found')
+    if upload:
+      return self._Upload(method, segments[1:], query, headers, body)
+    if len(segments) == 1:
+      if method == 'GET':
+        return 200, self._ListFiles(query)
+      if method == 'POST':
+        return 200, self._CreateFile(_LoadJson(body), None)
+      raise FakeDriveError(405, 'methodNotAllowed', 'Method Not Allowed')
+    file_id = segments[1]
+    resource = self._GetFile(file_id)
+    action = segments[2] if len(segments) > 2 else None
+    if action is None:
+      if method == 'GET':
+        if query.get('alt') == 'media':
+          return 200, self.contents.get(file_id, b'')
+        return 200, resource
+      if method in ('PATCH', 'PUT'):
+        return 200, self._UpdateFile(resource, _LoadJson(body), None)
+      if method == 'DELETE':
+        self._DeleteFile(file_id)
+        return 204, b''
+    elif action in ('trash', 'untrash') and method == 'POST':
+      resource['labels']['trashed'] = action == 'trash'
+      return 200, self._Touch(resource)
+    elif action == 'export' and method == 'GET':
+      return 200, self._Export(resource, query.get('mimeType'))
+    elif action == 'permissions':
+      return self._Permissions(method, resource, segments[3:], body)
+    raise FakeDriveError(404, 'notFound', 'Not Found')
+
+  def _Token(self):
+    """Issues a new access token, as the OAuth2 token endpoint does."""
+    token = {'access_token': self._IssueToken(), 'token_type': 'Bearer',
+             'expires_in': TOKEN_LIFETIME}
+    return 200, {'content-type': 'application/json'}, \
+        json.dumps(token).encode('utf-8')
+
+  def _IssueToken(self):
+    with self._lock:
+      self._next_id += 1
+      token = 'fake-token-%d' % self._next_id
+      self.tokens.add(token)
+    return token
+
+  def _CheckAuthorization(self, headers):
+    authorization = headers.get('authorization', '')
+    if authorization.split(' ')[-1] not in self.tokens:
+      raise FakeDriveError(401, 'authError', 'Invalid Credentials')
+
+  def _CheckErrors(self, method, path):
+    """Raises an injected, random or rate limit error if one applies."""
+    self._CheckInjectedErrors(method, path, after=False)
+    if self.error_rate and self._random.random() < self.error_rate:
+      raise FakeDriveError(self._random.choice(RANDOM_ERROR_STATUSES),
+                           'backendError', 'Backend Error')
+    if self.queries_per_second is not None:
+      now = self.clock()
+      if self._checked is not None:
+        self._allowance = min(
+            self.queries_per_second,
+            self._allowance + (now - self._checked) * self.queries_per_second)
+      self._checked = now
+      if self._allowance < 1:
+        raise FakeDriveError(403, 'userRateLimitExceeded',
+                             'User Rate Limit Exceeded')
+      self._allowance -= 1
+
+  def _CheckInjectedErrors(self, method, path, after):
+    """Raises an error injected before or after applying requests, if any."""
+    for error in self._errors:
+      if error['after'] == after and \
+              (error['method'] is None or error['method'] == method) and \
+              (error['path'] is None or error['path'] in path):
+        error['count'] -= 1
+        if error['count'] <= 0:
+          self._errors.remove(error)
+        raise FakeDriveError(error['status'], error['reason'])
+
+  def _Discovery(self):
+    from googleapiclient.discovery_cache import get_static_doc
+
+    document = get_static_doc('drive', 'v2')
+    if document is None:
+      raise FakeDriveError(404, 'notFound', 'Not Found')
+    return 200, {'content-type': 'application/json'}, document.encode('utf-8')
+
+  def _GetFile(self, file_id):
+    resource = self.files.get(file_id)
+    if resource is None:
+      raise FakeDriveError(404, 'notFound', 'File not found: %s' % file_id)
+    return resource
+
+  def _CreateFile(self, metadata, content, mimetype=None):
+    """Creates a file resource with the defaults the Drive API fills in."""
+    self._next_id += 1
+    file_id = 'fake%024d' % self._next_id
+    now = _Now()
+    resource = {
+        'kind': 'drive#file',
+        'id': file_id,
+        'title': 'Untitled',
+        'mimeType': mimetype or 'application/octet-stream',
+        'labels': {'starred': False, 'hidden': False, 'trashed': False,
+                   'restricted': False, 'viewed': True},
+        'parents': [{'kind': 'drive#parentReference', 'id': 'root',
+                     'isRoot': True}],
+        'createdDate': now,
+        'version': '0',
+        'permissions': [{'kind': 'drive#permission', 'id': 'owner',
+                         'role': 'owner', 'type': 'user'}],
+        'userPermission': {'kind': 'drive#permission', 'id': 'me',
+                           'role': 'owner', 'type': 'user'},
+        'editable': True,
+        'shared': False,
+    }
+    resource['selfLink'] = self.root_url + 'drive/v2/files/' + file_id
+    self.files[file_id] = resource
+    self._order.append(file_id)
+    return self._UpdateFile(resource, metadata, content)
+
+  def _UpdateFile(self, resource, metadata, content):
+    """Applies new metadata and content to a file resource."""
+    for key, value in metadata.items():
+      if key == 'labels':
+        resource['labels'].update(value)
+      elif key == 'parents':
+        resource['parents'] = [dict(p, kind='drive#parentReference',
+                                    isRoot=p.get('id') == 'root')
+                               for p in value]
+      elif key not in ('id', 'kind', 'selfLink', 'createdDate'):
+        resource[key] = value
+    file_id = resource['id']
+    if content is not None:
+      self.contents[file_id] = content
+    mimetype = resource['mimeType']
+    if mimetype.startswith(GOOGLE_APPS_PREFIX):
+      resource.pop('downloadUrl', None)
+      resource['exportLinks'] = dict(
+          (export, '%sdrive/v2/files/%s/export?mimeType=%s' % (
+              self.root_url, file_id, export))
+          for export in ('text/plain', 'text/html'))
+    elif file_id in self.contents:
+      content = self.contents[file_id]
+      resource['downloadUrl'] = '%sdrive/v2/files/%s?alt=media' % (
+          self.root_url, file_id)
+      resource['fileSize'] = str(len(content))
+      resource['md5Checksum'] = hashlib.md5(content).hexdigest()
+    return self._Touch(resource)
+
+  def _Touch(self, resource):
+    """Marks a file resource as modified."""
+    resource['version'] = str(int(resource['version']) + 1)
+    resource['modifiedDate'] = _Now()
+    resource['etag'] = '"%s/%s"' % (resource['id'], resource['version'])
+    return resource
+
+  def _DeleteFile(self, file_id):
+    del self.files[file_id]
+    self.contents.pop(file_id, None)
+
+  def _Export(self, resource, mimetype):
+    if mimetype not in resource.get('exportLinks', {}):
+      raise FakeDriveError(400, 'badRequest', 'Cannot export file')
+    content = self.contents.get(resource['id'], b'')
+    if mimetype == 'text/plain':
+      return EXPORT_BOM + content
+    return content
+
+  def _ListFiles(self, query):
+    """Lists files matching query 'q', one page at a time.
+
+    Page tokens are positions in the order files were created in, so that
+    paging through a large drive takes linear time.
+    """
+    matches = _ParseQuery(query.get('q', ''))
+    max_results = min(int(query.get('maxResults', DEFAULT_MAX_RESULTS)),
+                      MAX_MAX_RESULTS)
+    position = int(query.get('pageToken') or 0)
+    items = []
+    while position < len(self._order) and len(items) < max_results:
+      resource = self.files.get(self._order[position])
+      if resource is not None and matches(resource):
+        items.append(resource)
+      position += 1
+    result = {'kind': 'drive#fileList', 'etag': '"list"', 'items': items}
+    if position < len(self._order):
+      result['nextPageToken'] = str(position)
+    return result
+
+  def _Permissions(self, method, resource, segments, body):
+    permissions = resource['permissions']
+    if not segments:
+      if method == 'GET':
+        return 200, {'kind': 'drive#permissionList', 'items': permissions}
+      if method == 'POST':
+        self._next_id += 1
+        permission = dict(_LoadJson(body), kind='drive#permission',
+                          id='permission%d' % self._next_id)
+        permissions.append(permission)
+        resource['shared'] = True
+        self._Touch(resource)
+        return 200, permission
+    else:
+      for permission in permissions:
+        if permission['id'] == segments[0]:
+          if method == 'GET':
+            return 200, permission
+          if method == 'DELETE':
+            permissions.remove(permission)
+            self._Touch(resource)
+            return 204, b''
+      raise FakeDriveError(404, 'notFound', 'Permission not found')
+    raise FakeDriveError(404, 'notFound', 'Not Found')
+
+  def _Upload(self, method, segments, query, headers, body):
+    """Handles simple, multipart and resumable uploads."""
+    upload_type = query.get('uploadType')
+    file_id = segments[0] if segments else None
+    if 'upload_id' in query:
+      return self._ResumeUpload(query['upload_id'], headers, body)
+    if upload_type == 'media':
+      metadata, content = {}, body or b''
+      mimetype = headers.get('content-type')
+    elif upload_type == 'multipart':
+      parts = _ParseMultipart(headers.get('content-type', ''), body or b'')
+      if len(parts) != 2:
+        raise FakeDriveError(400, 'badRequest', 'Invalid multipart request')
+      metadata, content = json.loads(parts[0][1].decode('utf-8')), parts[1][1]
+      mimetype = parts[1][0].get('content-type')
+    elif upload_type == 'resumable':
+      self._next_id += 1
+      upload_id = 'upload%d' % self._next_id
+      size = headers.get('x-upload-content-length')
+      self.uploads[upload_id] = {
+          'file_id': file_id, 'metadata': _LoadJson(body),
+          'mimetype': headers.get('x-upload-content-type'),
+          'size': int(size) if size is not None else None,
+          'data': bytearray()}
+      location = '%supload/drive/v2/files?uploadType=resumable&upload_id=%s' % (
+          self.root_url, upload_id)
+      return 200, _Headers(location=location)
+    else:
+      raise FakeDriveError(400, 'badRequest', 'Invalid uploadType')
+    return 200, self._FinishUpload(file_id, metadata, content, mimetype)
+
+  def _ResumeUpload(self, upload_id, headers, body):
+    """Receives one chunk of a resumable upload, or reports its progress."""
+    upload = self.uploads.get(upload_id)
+    if upload is None:
+      raise FakeDriveError(404, 'notFound', 'Upload not found')
+    if 'file_id' not in upload:  # Completed, answered with the file again.
+      return 200, self._GetFile(upload['id'])
+    data = upload['data']
+    content_range = headers.get('content-range', '')
+    match = re.match(r'bytes (\*|(\d+)-(\d+))/(\*|\d+)$', content_range)
+    if match is not None:
+      if match.group(4) != '*':
+        upload['size'] = int(match.group(4))
+      if match.group(2) is not None:
+        start = int(match.group(2))
+        if start > len(data):
+          raise FakeDriveError(400, 'badRequest', 'Missing bytes')
+        del data[start:]
+        data.extend(body or b'')
+    elif body:
+      data.extend(body)
+      upload['size'] = len(data)
+    if upload['size'] is None or len(data) < upload['size']:
+      if not data:
+        return 308, _Headers()
+      return 308, _Headers(range='bytes=0-%d' % (len(data) - 1))
+    resource = self._FinishUpload(upload['file_id'], upload['metadata'],
+                                  bytes(data), upload['mimetype'])
+    self.uploads[upload_id] = {'id': resource['id']}
+    return 200, resource
+
+  def _FinishUpload(self, file_id, metadata, content, mimetype):
+    if mimetype and 'mimeType' not in metadata:
+      metadata = dict(metadata, mimeType=mimetype)
+    if file_id is None:
+      return self._CreateFile(metadata, content)
+    return self._UpdateFile(self._GetFile(file_id), metadata, content)
+
+  def _Batch(self, headers, body):
+    """Handles a batch request, answering every part as a separate request."""
+    boundary = 'batch_fake'
+    parts = []
+    for part_headers, payload in _ParseMultipart(
+            headers.get('content-type', ''), body or b''):
+      method, uri, inner_headers, inner_body = _ParseHttpRequest(payload)
+      inner_headers.setdefault('authorization', headers.get('authorization'))
+      status, response_headers, content = self._Respond(
+          method, self.root_url[:-1] + uri, inner_headers, inner_body)
+      reason = BaseHTTPServer.BaseHTTPRequestHandler.responses.get(
+          status, ('',))[0]
+      lines = ['--' + boundary, 'Content-Type: application/http',
+               'Content-ID: <response-%s>' % part_headers.get(
+                   'content-id', '').strip('<>'),
+               '', 'HTTP/1.1 %d %s' % (status, reason)]
+      lines.extend('%s: %s' % item for item in response_headers.items())
+      lines.extend(['', ''])
+      parts.append('\r\n'.join(lines).encode('utf-8') + content)
+    parts.append(('--%s--' % boundary).encode('ascii'))
+    return 200, {'content-type': 'multipart/mixed; boundary=' + boundary}, \
+        b'\r\n'.join(parts)
+
+
+class FakeHttp(object):
+  """httplib2.Http compatible object sending requests to a FakeDrive."""
+
+  def __init__(self, fake):
+    """Create an instance of FakeHttp.
+
+    :param fake: the fake to send requests to.
+    :type fake: FakeDrive
+    """
+    self.fake = fake
+
+  def request(self, uri, method='GET', body=None, headers=None,
+              redirections=5, connection_type=None):
+    """Sends a request, with the signature of httplib2.Http.request().
+
+    :returns: tuple -- httplib2.Response and content of the response.
+    """
+    import httplib2
+
+    if hasattr(body, 'read'):
+      body = body.read()
+    if body is not None and not isinstance(body, bytes):
+      body = body.encode('utf-8')
+    headers = NormalizeHeaders(headers)
+    status, response_headers, content = self.fake.Handle(
+        method, uri, headers, body)
+    info = dict(response_headers)
+    info['status'] = str(status)
+    info['content-length'] = str(len(content))
+    return httplib2.Response(info), content
+
+
+def _Now():
+  """Returns the current time in the RFC 3339 format of the Drive API."""
+  return datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _LoadJson(body):
+  if not body:
+    return {}
+  try:
+    return json.loads(body.decode('utf-8'))
+  except ValueError:
+    raise FakeDriveError(400, 'parseError', 'Parse Error')
+
+
+def _ParseQuery(q):
+  """Compiles a Files.list() query into a predicate on file resources.
+
+  Supports clauses on parents, trashed, title and mimeType joined by 'and'.
+
+  :raises: FakeDriveError
+  """
+  predicates = []
+  for clause in re.split(r'\s+and\s+', q.strip(), flags=re.IGNORECASE):
+    if not clause:
+      continue
+    clause = clause.strip('() ')
+    for pattern, factory in _QUERY_CLAUSES:
+      match = pattern.match(clause)
+      if match is not None:
+        predicates.append(factory(*match.groups()))
+        break
+    else:
+      raise FakeDriveError(400, 'invalid', 'Invalid Value: %s' % clause)
+  return lambda resource: all(p(resource) for p in predicates)
+
+
+def _SelectFields(resource, fields):
+  """Returns the parts of resource selected by a 'fields' parameter.
+
+  Supports lists of fields, sub-selections like 'items(id,title)' and paths
+  like 'labels/trashed'.
+  """
+  if not fields or not isinstance(resource, dict):
+    return resource
+  selected = {}
+  for field in _SplitFields(fields):
+    sub_fields = None
+    if field.endswith(')') and '(' in field:
+      field, sub_fields = field[:-1].split('(', 1)
+    if '/' in field:
+      field, rest = field.split('/', 1)
+      sub_fields = rest if sub_fields is None else '%s(%s)' % (rest, sub_fields)
+    if field not in resource:
+      continue
+    value = resource[field]
+    if sub_fields is not None:
+      if isinstance(value, list):
+        value = [_SelectFields(item, sub_fields) for item in value]
+      else:
+        value = _SelectFields(value, sub_fields)
+      if isinstance(selected.get(field), dict):
+        selected[field].update(value)
+        continue
+    selected[field] = value
+  return selected
+
+
+def _SplitFields(fields):
+  """Splits a 'fields' parameter on the commas outside of parentheses."""
+  depth = 0
+  start = 0
+  for i, char in enumerate(fields):
+    if char == '(':
+      depth += 1
+    elif char == ')':
+      depth -= 1
+    elif char == ',' and depth == 0:
+      yield fields[start:i].strip()
+      start = i + 1
+  yield fields[start:].strip()
+
+
+def _ParseMultipart(content_type, body):
+  """Splits a multipart body into its parts.
+
+  :returns: list -- (headers, payload) of every part.
+  :raises: FakeDriveError
+  """
+  match = re.search(r'boundary="?([^";]+)"?', content_type)
+  if match is None:
+    raise FakeDriveError(400, 'badRequest', 'Missing multipart boundary')
+  delimiter = b'--' + match.group(1).encode('ascii')
+  parts = []
+  for chunk in body.split(delimiter)[1:]:
+    if chunk.startswith(b'--'):
+      break
+    headers, payload = _SplitHead(chunk[2:] if chunk.startswith(b'\r\n')
+                                  else chunk[1:])
+    if payload.endswith(b'\r\n'):
+      payload = payload[:-2]
+    elif payload.endswith(b'\n'):
+      payload = payload[:-1]
+    parts.append((headers, payload))
+  return parts
+
+
+def _ParseHttpRequest(payload):
+  """Parses an HTTP request serialized in a batch part.
+
+  :returns: tuple -- method, uri, headers and body of the request.
+  """
+  request_line, _, rest = payload.partition(b'\n')
+  method, uri = request_line.decode('utf-8').split()[:2]
+  headers, body = _SplitHead(rest)
+  return method, uri, headers, body or None
+
+
+def _SplitHead(data):
+  """Splits header lines from the body following them after a blank line.
+
+  :returns: tuple -- headers, with lower case names, and the body.
+  """
+  match = re.search(b'\r?\n\r?\n', data)
+  if data.startswith(b'\r\n') or data.startswith(b'\n'):
+    head, body = b'', data.lstrip(b'\r')[1:]
+  elif match is None:
+    head, body = data, b''
+  else:
+    head, body = data[:match.start()], data[match.end():]
+  headers = {}
+  for line in head.decode('utf-8').splitlines():
+    name, _, value = line.partition(':')
+    headers[name.strip().lower()] = value.strip()
+  return headers, body
@@ -1,10 +1,13 @@
 import io
 import mimetypes
+import time
 
-from apiclient import errors
-from apiclient.http import MediaIoBaseUpload
+from functools import partial
 from functools import wraps
 
+from six import iteritems
+from six import string_types
+
 from .apiattr import ApiAttribute
 from .apiattr import ApiAttributeMixin
 from .apiattr import ApiResource
@@ -12,6 +15,9 @@ from .apiattr import ApiResourceList
 from .auth import LoadAuth
 
 BLOCK_SIZE = 1024
+# Fields FetchContent() reads, fetched first if they are missing.
+CONTENT_FIELDS = ('downloadUrl', 'exportLinks', 'mimeType')
+_clock = getattr(time, 'monotonic', time.time)
 # Usage: MIME_TYPE_TO_BOM['<Google Drive mime type>']['<download mimetype>'].
 MIME_TYPE_TO_BOM = {
   'application/vnd.google-apps.document': {
@@ -19,6 +25,16 @@ MIME_TYPE_TO_BOM = {
   }
 }
 
+def _HttpError():
+  """Returns the HttpError class of googleapiclient, imported on first use.
+
+  Use it as 'except _HttpError()': the expression is evaluated only once an
+  exception is raised, so importing pydrive does not import googleapiclient.
+  """
+  from apiclient.errors import HttpError
+  return HttpError
+
+
 class FileNotUploadedError(RuntimeError):
   """Error trying to access metadata of file that is not uploaded."""
 
@@ -31,14 +47,22 @@ class FileNotDownloadableError(RuntimeError):
   """Error trying to download file that is not downloadable."""
 
 
-def LoadMetadata(decoratee):
+def LoadMetadata(decoratee=None, fields=None):
   """Decorator to check if the file has metadata and fetches it if not.
 
+  Used as @LoadMetadata(fields=(...)), fetches only those of the fields which
+  are missing, see GoogleDriveFile.GetFields().
+
   :raises: ApiRequestError, FileNotUploadedError
   """
+  if decoratee is None:
+    return partial(LoadMetadata, fields=fields)
+
   @wraps(decoratee)
   def _decorated(self, *args, **kwargs):
-    if not self.uploaded:
+    if fields is not None:
+      self.GetFields(fields)
+    elif not self.uploaded:
       self.FetchMetadata()
     return decoratee(self, *args, **kwargs)
   return _decorated
@@ -49,33 +73,99 @@ class GoogleDriveFileList(ApiResourceList):
 
   Equivalent to Files.list() in Drive APIs.
   """
+  cache = ApiAttribute('cache')
+  single_flight = ApiAttribute('single_flight')
 
   def __init__(self, auth=None, param=None):
     """Create an instance of GoogleDriveFileList."""
     super(GoogleDriveFileList, self).__init__(auth=auth, metadata=param)
 
+  def IterList(self):
+    """Yields the files of every page, parsing each page incrementally.
+
+    Unlike GetList(), files are built as soon as their resource is parsed
+    from the response, without decoding the whole page first, so that the
+    first files come sooner and memory holds only the raw page and the files
+    not consumed yet. Pages have 1000 files unless 'maxResults' is specified,
+    and 'pageToken' is updated after each page. Unlike GetList(), every page
+    is listed even when 'maxResults' is specified, which only sets the page
+    size.
+
+    :returns: generator -- pydrive.files.GoogleDriveFile of the list.
+    :raises: ValueError
+    """
+    from .model import ListParser
+
+    default_size = self.get('maxResults') is None
+    if default_size:
+      self['maxResults'] = 1000
+    try:
+      while not ('pageToken' in self and self['pageToken'] is None):
+        parser = ListParser()
+        for file1 in self._Files(parser.Parse(self._GetListContent())):
+          yield file1
+        self.metadata = parser.envelope
+        self['pageToken'] = self.metadata.get('nextPageToken')
+    finally:
+      if default_size:
+        del self['maxResults']
+
   @LoadAuth
   def _GetList(self):
     """Overwritten method which actually makes API call to list files.
 
     :returns: list -- list of pydrive.files.GoogleDriveFile.
     """
+    self.metadata = self.auth.Execute(self._ListRequest(), http=self.http)
+    # The files own the listed resources as their snapshots, so the list keeps
+    # the rest of the response only, as IterList() does.
+    items = self.metadata.pop('items', [])
+
+    if self.cache is not None or self.single_flight is not None:
+      return list(self._Files(items))
+    auth = self.auth
+    whole = 'fields' not in self
+    return [GoogleDriveFile._FromResource(file_metadata, whole, auth=auth)
+            for file_metadata in items]
+
+  def _Files(self, resources):
+    """Yields the files of listed resources, from the cache if there is one.
+
+    :param resources: file resources decoded from the response.
+    :type resources: iterable.
+    """
+    cache = self.cache
+    attributes = {'auth': self.auth}
+    if self.single_flight is not None:
+      attributes['single_flight'] = self.single_flight
+    whole = 'fields' not in self
+    for file_metadata in resources:
+      if cache is None or 'id' not in file_metadata:
+        yield GoogleDriveFile._FromResource(file_metadata, whole, **attributes)
+      else:
+        yield cache.Resolve(file_metadata, GoogleDriveFile._FromResource,
+                            whole=whole, **attributes)
+
+  @LoadAuth
+  def _GetListContent(self):
+    """Makes the API call to list one page of files, without decoding it.
+
+    :returns: bytes -- the response.
+    """
+    from .model import RawContent
+
+    request = self._ListRequest()
+    request.postproc = RawContent
+    return self.auth.Execute(request, http=self.http)
+
+  def _ListRequest(self):
+    """Returns the Files.list() request of the next page."""
     # Teamdrive support
     self['corpus'] = 'DEFAULT'
     self['supportsTeamDrives'] = True
     self['includeTeamDriveItems'] = True
 
-    self.metadata = self.auth.service.files().list(**dict(self)).execute(
-      http=self.http)
-
-    result = []
-    for file_metadata in self.metadata['items']:
-      tmp_file = GoogleDriveFile(
-          auth=self.auth,
-          metadata=file_metadata,
-          uploaded=True)
-      result.append(tmp_file)
-    return result
+    return self.auth.service.files().list(**dict(self))
 
 
 class GoogleDriveFile(ApiAttributeMixin, ApiResource):
@@ -87,6 +177,28 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
   content = ApiAttribute('content')
   uploaded = ApiAttribute('uploaded')
   metadata = ApiAttribute('metadata')
+  cache = ApiAttribute('cache')
+  single_flight = ApiAttribute('single_flight')
+  _ALL_FIELDS = 'alternateLink,appDataContents,' \
+                'canComment,canReadRevisions,' \
+                'copyable,createdDate,defaultOpenWithLink,description,' \
+                'downloadUrl,editable,embedLink,etag,explicitlyTrashed,' \
+                'exportLinks,fileExtension,fileSize,folderColorRgb,' \
+                'fullFileExtension,headRevisionId,iconLink,id,' \
+                'imageMediaMetadata,indexableText,isAppAuthorized,kind,' \
+                'labels,lastModifyingUser,lastModifyingUserName,' \
+                'lastViewedByMeDate,markedViewedByMeDate,md5Checksum,' \
+                'mimeType,modifiedByMeDate,modifiedDate,openWithLinks,' \
+                'originalFilename,ownedByMe,ownerNames,owners,parents,' \
+                'permissions,properties,quotaBytesUsed,selfLink,shareable,' \
+                'shared,sharedWithMeDate,sharingUser,spaces,thumbnail,' \
+                'thumbnailLink,title,userPermission,version,' \
+                'videoMediaMetadata,webContentLink,webViewLink,writersCanShare'
+  has_bom = True
+  # When the whole resource was last loaded and when fields were loaded one
+  # by one, in _clock() seconds, see _MissingFields().
+  _loaded_at = None
+  _fetched = None
 
   def __init__(self, auth=None, metadata=None, uploaded=False):
     """Create an instance of GoogleDriveFile.
@@ -106,30 +218,45 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     self.uploaded = uploaded
     if uploaded:
       self.UpdateMetadata(metadata)
+      self._loaded_at = _clock()
     elif metadata:
       self.update(metadata)
-    self._ALL_FIELDS = 'alternateLink,appDataContents,' \
-                      'canComment,canReadRevisions,' \
-                 'copyable,createdDate,defaultOpenWithLink,description,' \
-                 'downloadUrl,editable,embedLink,etag,explicitlyTrashed,' \
-                 'exportLinks,fileExtension,fileSize,folderColorRgb,' \
-                 'fullFileExtension,headRevisionId,iconLink,id,' \
-                 'imageMediaMetadata,indexableText,isAppAuthorized,kind,' \
-                 'labels,lastModifyingUser,lastModifyingUserName,' \
-                 'lastViewedByMeDate,markedViewedByMeDate,md5Checksum,' \
-                 'mimeType,modifiedByMeDate,modifiedDate,openWithLinks,' \
-                 'originalFilename,ownedByMe,ownerNames,owners,parents,' \
-                 'permissions,properties,quotaBytesUsed,selfLink,shareable,' \
-                 'shared,sharedWithMeDate,sharingUser,spaces,thumbnail,' \
-                 'thumbnailLink,title,userPermission,version,' \
-                 'videoMediaMetadata,webContentLink,webViewLink,writersCanShare'
-    self.has_bom = True
+
+  @classmethod
+  def _FromResource(cls, resource, whole=True, **attributes):
+    """Builds an uploaded file from a resource of an API response, quickly.
+
+    Skips __init__ and copies resource only once, into the file itself:
+    resource becomes the clean copy in self.metadata, so the caller must not
+    modify it afterwards.
+
+    :param resource: file resource decoded from an API response.
+    :type resource: dict.
+    :param whole: False if the request selected some fields only, so that
+      the fields resource lacks are fetched when read.
+    :type whole: bool.
+    :param attributes: values of the ApiAttributes of the file, e.g. auth.
+    :returns: GoogleDriveFile -- the file.
+    """
+    file1 = cls.__new__(cls)
+    dict.update(file1, resource)
+    attributes['uploaded'] = True
+    attributes['metadata'] = resource
+    file1.attr = attributes
+    file1.dirty = {'content': False}
+    file1.http = None
+    if whole:
+      file1._loaded_at = _clock()
+    else:
+      file1._RecordFetch(list(resource))
+    return file1
 
   def __getitem__(self, key):
     """Overwrites manner of accessing Files resource.
 
-    If this file instance is not uploaded and id is specified,
-    it will try to look for metadata with Files.get().
+    If the key is missing and id is specified, it will try to fetch this
+    field alone with Files.get(), unless it is known to be absent, see
+    GetFields().
 
     :param key: key of dictionary query.
     :type key: str.
@@ -137,15 +264,37 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     :raises: KeyError, FileNotUploadedError
     """
     try:
-      return dict.__getitem__(self, key)
+      return ApiResource.__getitem__(self, key)
     except KeyError as e:
-      if self.uploaded:
-        raise KeyError(e)
-      if self.get('id'):
-        self.FetchMetadata()
-        return dict.__getitem__(self, key)
-      else:
+      if not self.uploaded and not self.get('id'):
         raise FileNotUploadedError()
+      if self._MissingFields((key,)):
+        self._FetchFields((key,))
+        if dict.__contains__(self, key):
+          return ApiResource.__getitem__(self, key)
+      raise KeyError(e)
+
+  def GetFields(self, fields):
+    """Returns the values of fields, fetching the missing ones in one request.
+
+    Fields are known to be absent, and not fetched again, once the whole
+    resource or the field itself was loaded without them, for
+    'metadata_freshness' seconds if the setting is given, else for the life
+    of this instance. Changes not uploaded yet are kept.
+
+    :param fields: names of top-level fields, e.g. ['title', 'fileSize'] or
+      'title,fileSize'.
+    :type fields: list or str.
+    :returns: dict -- values of the fields this file has.
+    :raises: ApiRequestError, FileNotUploadedError
+    """
+    if isinstance(fields, string_types):
+      fields = fields.split(',')
+    missing = self._MissingFields(fields)
+    if missing:
+      self._FetchFields(missing)
+    return dict((field, ApiResource.__getitem__(self, field))
+                for field in fields if dict.__contains__(self, field))
 
   def SetContentString(self, content, encoding='utf-8'):
     """Set content of this file to be a string.
@@ -238,21 +387,132 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
 
     if file_id:
       try:
-        metadata = self.auth.service.files().get(
-          fileId=file_id,
-          fields=fields,
-          # Teamdrive support
-          supportsTeamDrives=True
-        ).execute(http=self.http)
-      except errors.HttpError as error:
+        metadata = self._FilesGet(file_id, fields)
+      except _HttpError() as error:
         raise ApiRequestError(error)
       else:
         self.uploaded = True
         self.UpdateMetadata(metadata)
+        self._RecordFetch(None if fetch_all else fields)
+        self._UpdateCache(metadata, None if fetch_all else fields)
     else:
       raise FileNotUploadedError()
 
-  @LoadMetadata
+  @LoadAuth
+  def _FetchFields(self, fields):
+    """Fetches fields with Files.get() and merges them into this file.
+
+    :param fields: names of top-level fields.
+    :type fields: list.
+    :raises: ApiRequestError, FileNotUploadedError
+    """
+    file_id = self.metadata.get('id') or self.get('id')
+    if not file_id:
+      raise FileNotUploadedError()
+    try:
+      metadata = self._FilesGet(
+        file_id, ','.join(sorted(set(fields) | set(['id']))))
+    except _HttpError() as error:
+      raise ApiRequestError(error)
+    else:
+      self.uploaded = True
+      self._MergeFields(metadata, fields)
+      self._UpdateCache(metadata, fields)
+
+  def _FilesGet(self, file_id, fields):
+    """Gets the resource of a file using Files.get().
+
+    Concurrent calls for the same fields of the same file share one request
+    if request coalescing is enabled, see pydrive.singleflight.
+
+    :param file_id: id of the file.
+    :type file_id: str.
+    :param fields: the fields to get, all basic ones if None.
+    :type fields: str.
+    :returns: dict -- the resource.
+    :raises: googleapiclient.errors.HttpError
+    """
+    def Get():
+      return self.auth.Execute(self.auth.service.files().get(
+        fileId=file_id,
+        fields=fields,
+        # Teamdrive support
+        supportsTeamDrives=True
+      ), http=self.http)
+
+    if self.single_flight is None:
+      return Get()
+    return self.single_flight.Do(('metadata', file_id, fields), Get)
+
+  def _MissingFields(self, fields):
+    """Returns the fields this file lacks which are not known to be absent.
+
+    :param fields: names of top-level fields.
+    :type fields: list.
+    :returns: list -- the fields to fetch.
+    """
+    freshness = None
+    if self.auth is not None:
+      freshness = self.auth.settings.get('metadata_freshness')
+    now = _clock()
+    fetched = self._fetched or {}
+    missing = []
+    for field in fields:
+      if dict.__contains__(self, field):
+        continue
+      loaded = max(fetched.get(field, 0), self._loaded_at or 0)
+      if not loaded or (freshness is not None and now - loaded >= freshness):
+        missing.append(field)
+    return missing
+
+  def _MergeFields(self, metadata, fields):
+    """Merges fetched fields into this file, keeping local changes.
+
+    :param metadata: the resource fetched.
+    :type metadata: dict.
+    :param fields: names of the fields requested, None if metadata is the
+      whole resource, which then replaces the fields this file has.
+    :type fields: list.
+    """
+    snapshot = self.metadata
+    if fields is None:
+      for key in [key for key in snapshot if key not in metadata]:
+        del snapshot[key]
+        if key not in self._changed:
+          dict.pop(self, key, None)
+    for key, value in iteritems(metadata):
+      snapshot[key] = value
+      if key not in self._changed:
+        dict.__setitem__(self, key, value)  # Copied on write if nested.
+    self._RecordFetch(fields)
+
+  def _UpdateCache(self, metadata, fields=None):
+    """Caches a response about this file, see pydrive.cache.MetadataCache.
+
+    :param metadata: the file resource of the response.
+    :type metadata: dict.
+    :param fields: fields requested, None if metadata is the whole resource.
+    :type fields: list or str.
+    """
+    if self.cache is not None:
+      if isinstance(fields, string_types):
+        fields = fields.split(',')
+      self.cache.Update(self, metadata, fields)
+
+  def _RecordFetch(self, fields):
+    """Records when fields, or the whole resource if None, were loaded."""
+    now = _clock()
+    if fields is None:
+      self._loaded_at = now
+      return
+    if isinstance(fields, string_types):
+      fields = fields.split(',')
+    if self._fetched is None:
+      self._fetched = {}
+    for field in fields:
+      self._fetched[field.split('/')[0].split('(')[0].strip()] = now
+
+  @LoadMetadata(fields=CONTENT_FIELDS)
   def FetchContent(self, mimetype=None, remove_bom=False):
     """Download file's content from download_url.
 
@@ -330,9 +590,9 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     """
     file_id = self.metadata.get('id') or self['id']
     try:
-      permission = self.auth.service.permissions().insert(
-        fileId=file_id, body=new_permission).execute(http=self.http)
-    except errors.HttpError as error:
+      permission = self.auth.Execute(self.auth.service.permissions().insert(
+        fileId=file_id, body=new_permission), http=self.http)
+    except _HttpError() as error:
       raise ApiRequestError(error)
     else:
       self.GetPermissions()  # Update permissions field.
@@ -378,14 +638,16 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     try:
       if self.dirty['content']:
         param['media_body'] = self._BuildMediaBody()
-      metadata = self.auth.service.files().insert(**param).execute(
-        http=self.http)
-    except errors.HttpError as error:
+      metadata = self.auth.Execute(
+        self.auth.service.files().insert(**param), http=self.http)
+    except _HttpError() as error:
       raise ApiRequestError(error)
     else:
       self.uploaded = True
       self.dirty['content'] = False
       self.UpdateMetadata(metadata)
+      self._RecordFetch(param.get('fields'))
+      self._UpdateCache(metadata, param.get('fields'))
 
   @LoadAuth
   def _FilesUnTrash(self, param=None):
@@ -402,13 +664,12 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     param['supportsTeamDrives'] = True
 
     try:
-      self.auth.service.files().untrash(**param).execute(
-        http=self.http)
-    except errors.HttpError as error:
+      self.auth.Execute(
+        self.auth.service.files().untrash(**param), http=self.http)
+    except _HttpError() as error:
       raise ApiRequestError(error)
     else:
-      if self.metadata:
-        self.metadata[u'labels'][u'trashed'] = False
+      self._SetTrashed(False)
       return True
 
   @LoadAuth
@@ -427,15 +688,29 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     param['supportsTeamDrives'] = True
 
     try:
-      self.auth.service.files().trash(**param).execute(
-        http=self.http)
-    except errors.HttpError as error:
+      self.auth.Execute(
+        self.auth.service.files().trash(**param), http=self.http)
+    except _HttpError() as error:
       raise ApiRequestError(error)
     else:
-      if self.metadata:
-        self.metadata[u'labels'][u'trashed'] = True
+      self._SetTrashed(True)
       return True
 
+  def _SetTrashed(self, trashed):
+    """Marks the file as trashed or not, in the metadata and its copy.
+
+    The labels of the metadata are replaced rather than changed in place, as
+    they may be shared with a response other files were built from.
+    """
+    if self.metadata:
+      shared = self.metadata[u'labels']
+      self.metadata[u'labels'] = dict(shared, trashed=trashed)
+      labels = dict.get(self, u'labels')
+      if labels is shared:
+        dict.__setitem__(self, u'labels', self.metadata[u'labels'])
+      elif labels is not None:  # A copy if labels were accessed.
+        labels[u'trashed'] = trashed
+
   @LoadAuth
   def _FilesDelete(self, param=None):
     """Delete a file using Files.Delete()
@@ -453,10 +728,13 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     param['supportsTeamDrives'] = True
 
     try:
-      self.auth.service.files().delete(**param).execute(http=self.http)
-    except errors.HttpError as error:
+      self.auth.Execute(
+        self.auth.service.files().delete(**param), http=self.http)
+    except _HttpError() as error:
       raise ApiRequestError(error)
     else:
+      if self.cache is not None:
+        self.cache.Discard(param['fileId'])
       return True
 
   @LoadAuth
@@ -479,14 +757,16 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     try:
       if self.dirty['content']:
         param['media_body'] = self._BuildMediaBody()
-      metadata = self.auth.service.files().update(**param).execute(
-        http=self.http)
-    except errors.HttpError as error:
+      metadata = self.auth.Execute(
+        self.auth.service.files().update(**param), http=self.http)
+    except _HttpError() as error:
       raise ApiRequestError(error)
     else:
       self.uploaded = True
       self.dirty['content'] = False
       self.UpdateMetadata(metadata)
+      self._RecordFetch(param.get('fields'))
+      self._UpdateCache(metadata, param.get('fields'))
 
   @LoadAuth
   @LoadMetadata
@@ -506,12 +786,14 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     param['supportsTeamDrives'] = True
 
     try:
-      metadata = self.auth.service.files().patch(**param).execute(
-        http=self.http)
-    except errors.HttpError as error:
+      metadata = self.auth.Execute(
+        self.auth.service.files().patch(**param), http=self.http)
+    except _HttpError() as error:
       raise ApiRequestError(error)
     else:
       self.UpdateMetadata(metadata)
+      self._RecordFetch(param.get('fields'))
+      self._UpdateCache(metadata, param.get('fields'))
 
   def _BuildMediaBody(self):
     """Build MediaIoBaseUpload to get prepared to upload content of the file.
@@ -520,6 +802,8 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
 
     :returns: MediaIoBaseUpload -- instance that will be used to upload content.
     """
+    from apiclient.http import MediaIoBaseUpload
+
     if self.get('mimeType') is None:
       self['mimeType'] = 'application/octet-stream'
     return MediaIoBaseUpload(self.content, self['mimeType'], resumable=True)
@@ -533,10 +817,15 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     :returns: str -- content of downloaded file in string.
     :raises: ApiRequestError
     """
-    resp, content = self.http.request(url)
-    if resp.status != 200:
-      raise ApiRequestError('Cannot download file: %s' % resp)
-    return content
+    file_id = self.metadata.get('id')
+    try:
+      if self.single_flight is None:
+        return self.auth.Download(url, http=self.http, file_id=file_id)
+      return self.single_flight.Do(
+          ('content', file_id, url), self.auth.Download, url, http=self.http,
+          file_id=file_id)
+    except _HttpError() as error:
+      raise ApiRequestError('Cannot download file: %s' % error.resp)
 
   @LoadAuth
   def _DeletePermission(self, permission_id):
@@ -550,9 +839,9 @@ class GoogleDriveFile(ApiAttributeMixin, ApiResource):
     """
     file_id = self.metadata.get('id') or self['id']
     try:
-      self.auth.service.permissions().delete(
-        fileId=file_id, permissionId=permission_id).execute()
-    except errors.HttpError as error:
+      self.auth.Execute(self.auth.service.permissions().delete(
+        fileId=file_id, permissionId=permission_id), http=self.http)
+    except _HttpError() as error:
       raise ApiRequestError(error)
     else:
       if 'permissions' in self and 'permissions' in self.metadata:
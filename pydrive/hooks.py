@@ -0,0 +1,259 @@
+import re
+import threading
+import time
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+# Events hooks can be registered for.
+EVENTS = ('before_request', 'after_response', 'on_retry', 'on_refresh',
+          'on_download_chunk', 'on_upload_chunk')
+# Operation name of media downloads, which are not API methods.
+DOWNLOAD_OPERATION = 'media.download'
+# Operation name of access token refreshes.
+REFRESH_OPERATION = 'oauth2.refresh'
+_FILE_ID_PATTERN = re.compile(r'/files/([^/?]+)')
+
+
+class Event(object):
+  """Data passed to hooks. Fields which do not apply to an event are None.
+
+  - name: name of the event, one of EVENTS.
+  - operation: API method, e.g. 'files.list', or DOWNLOAD_OPERATION.
+  - file_id: id of the file the operation is about.
+  - method: HTTP method of the request.
+  - status: HTTP status of the response.
+  - duration: seconds the request or refresh took, or seconds waited before a
+    retry.
+  - bytes: bytes sent by a request or received in a response.
+  - attempt: number of the attempt, 1 for the first one.
+  - error: the error a request or refresh failed with.
+  """
+  __slots__ = ('name', 'operation', 'file_id', 'method', 'status', 'duration',
+               'bytes', 'attempt', 'error')
+
+  def __init__(self, name, operation=None, file_id=None, method=None,
+               status=None, duration=None, bytes=None, attempt=None,
+               error=None):
+    self.name = name
+    self.operation = operation
+    self.file_id = file_id
+    self.method = method
+    self.status = status
+    self.duration = duration
+    self.bytes = bytes
+    self.attempt = attempt
+    self.error = error
+
+  def __repr__(self):
+    fields = ', '.join('%s=%r' % (name, getattr(self, name))
+                       for name in self.__slots__[1:]
+                       if getattr(self, name) is not None)
+    return 'Event(%s: %s)' % (self.name, fields)
+
+
+class Hooks(object):
+  """Thread-safe registry of the callbacks called on events.
+
+  Callbacks are called with an Event in the thread making the request, so
+  they should return quickly. Errors they raise propagate to the caller.
+  An empty registry is false, which lets callers skip all instrumentation.
+  """
+
+  def __init__(self):
+    self._callbacks = {}
+    self._lock = threading.Lock()
+
+  def __bool__(self):
+    return bool(self._callbacks)
+
+  __nonzero__ = __bool__
+
+  def Register(self, event, callback):
+    """Calls callback on every event of the given name.
+
+    :param event: name of the event, one of EVENTS.
+    :type event: str.
+    :param callback: function called with an Event.
+    :type callback: callable.
+    :raises: ValueError
+    """
+    if event not in EVENTS:
+      raise ValueError('Unknown event %r, expected one of %s' % (
+          event, ', '.join(EVENTS)))
+    with self._lock:
+      callbacks = dict(self._callbacks)
+      callbacks[event] = callbacks.get(event, ()) + (callback,)
+      self._callbacks = callbacks
+
+  def Unregister(self, event, callback):
+    """Stops calling a callback registered with Register().
+
+    :param event: name of the event.
+    :type event: str.
+    :param callback: the registered callback.
+    :type callback: callable.
+    """
+    with self._lock:
+      callbacks = dict(self._callbacks)
+      remaining = tuple(c for c in callbacks.get(event, ()) if c != callback)
+      if remaining:
+        callbacks[event] = remaining
+      else:
+        callbacks.pop(event, None)
+      self._callbacks = callbacks
+
+  def Fire(self, event, **fields):
+    """Calls the callbacks registered for an event.
+
+    :param event: name of the event.
+    :type event: str.
+    :param fields: fields of the Event passed to the callbacks.
+    """
+    callbacks = self._callbacks.get(event)
+    if callbacks:
+      data = Event(event, **fields)
+      for callback in callbacks:
+        callback(data)
+
+
+class HookedHttp(object):
+  """Wraps an http object to fire events for every request made through it.
+
+  Fires before_request and after_response for every request, including each
+  chunk of a resumable upload, as well as on_upload_chunk for the chunks and
+  on_download_chunk for the bodies of media downloads.
+  """
+
+  def __init__(self, http, hooks, operation, file_id=None):
+    """Create an instance of HookedHttp.
+
+    :param http: the http object to send requests with.
+    :type http: httplib2.Http
+    :param hooks: the hooks to fire events on.
+    :type hooks: Hooks
+    :param operation: name of the operation making the requests.
+    :type operation: str.
+    :param file_id: id of the file the operation is about.
+    :type file_id: str.
+    """
+    self.http = http
+    self.hooks = hooks
+    self.operation = operation
+    self.file_id = file_id
+
+  def __getattr__(self, name):
+    return getattr(self.http, name)
+
+  def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+    """Sends a request, with the signature of httplib2.Http.request()."""
+    fields = {'operation': self.operation, 'file_id': self.file_id,
+              'method': method}
+    sent = _BodySize(body, headers)
+    self.hooks.Fire('before_request', bytes=sent, **fields)
+    start = _clock()
+    try:
+      resp, content = self.http.request(uri, method=method, body=body,
+                                        headers=headers, **kwargs)
+    except Exception as error:
+      self.hooks.Fire('after_response', duration=_clock() - start,
+                      error=error, **fields)
+      raise
+    duration = _clock() - start
+    received = len(content or b'')
+    self.hooks.Fire('after_response', status=resp.status, duration=duration,
+                    bytes=received, **fields)
+    content_range = _GetHeader(headers, 'content-range')
+    if content_range is not None and method == 'PUT' and sent:
+      self.hooks.Fire('on_upload_chunk', status=resp.status,
+                      duration=duration, bytes=sent, **fields)
+    elif self.operation == DOWNLOAD_OPERATION and resp.status == 200:
+      self.hooks.Fire('on_download_chunk', status=resp.status,
+                      duration=duration, bytes=received, **fields)
+    return resp, content
+
+
+class RetryEvents(object):
+  """Wraps a function called by a RetryPolicy to fire on_retry events.
+
+  on_retry is fired before every attempt but the first, with the error the
+  previous attempt failed with and the seconds waited since.
+  """
+
+  def __init__(self, function, hooks, operation, file_id=None):
+    """Create an instance of RetryEvents.
+
+    :param function: the function making one attempt.
+    :type function: callable.
+    :param hooks: the hooks to fire events on.
+    :type hooks: Hooks
+    :param operation: name of the operation retried.
+    :type operation: str.
+    :param file_id: id of the file the operation is about.
+    :type file_id: str.
+    """
+    self.function = function
+    self.hooks = hooks
+    self.operation = operation
+    self.file_id = file_id
+    self.attempt = 0
+    self.error = None
+    self.failed = None
+
+  def __call__(self, *args, **kwargs):
+    if self.error is not None:
+      resp = getattr(self.error, 'resp', None)
+      self.hooks.Fire('on_retry', operation=self.operation,
+                      file_id=self.file_id, attempt=self.attempt + 1,
+                      status=getattr(resp, 'status', None),
+                      duration=_clock() - self.failed, error=self.error)
+    self.attempt += 1
+    try:
+      return self.function(*args, **kwargs)
+    except Exception as error:
+      self.error = error
+      self.failed = _clock()
+      raise
+
+
+def OperationName(request):
+  """Returns the name of the API method of request, e.g. 'files.list'.
+
+  :param request: the API request.
+  :type request: googleapiclient.http.HttpRequest
+  :returns: str -- name of the method.
+  """
+  method_id = getattr(request, 'methodId', None) or ''
+  return method_id.split('.', 1)[-1] or None
+
+
+def FileId(uri):
+  """Returns the id of the file uri refers to, if any.
+
+  :param uri: uri of an API request or a download.
+  :type uri: str.
+  :returns: str -- id of the file, None if not found.
+  """
+  match = _FILE_ID_PATTERN.search(uri or '')
+  return match.group(1) if match is not None else None
+
+
+def _GetHeader(headers, name):
+  """Returns a header of a request, whatever the case or type of its name."""
+  for key, value in (headers or {}).items():
+    if isinstance(key, bytes):
+      key = key.decode('latin-1')
+    if key.lower() == name:
+      return value
+  return None
+
+
+def _BodySize(body, headers):
+  """Returns the size of a request body, which may be a stream."""
+  if body is None:
+    return 0
+  length = _GetHeader(headers, 'content-length')
+  if length is not None:
+    return int(length)
+  if hasattr(body, 'read'):
+    return None
+  return len(body)
@@ -0,0 +1,213 @@
+import threading
+
+# Upper bounds, in seconds, of the buckets of latency histograms by default.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+# Content type of the Prometheus text exposition format Export() returns.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Metric(object):
+  """Base of metrics, holding one value per combination of label values."""
+  kind = None
+
+  def __init__(self, name, documentation, label_names=()):
+    self.name = name
+    self.documentation = documentation
+    self.label_names = tuple(label_names)
+    self.values = {}
+
+  def Samples(self):
+    """Yields (name, labels, value) of every sample of the metric."""
+    for labels, value in sorted(self.values.items()):
+      yield self.name, zip(self.label_names, labels), value
+
+
+class Counter(_Metric):
+  """Total that only goes up, e.g. the number of requests sent."""
+  kind = 'counter'
+
+  def Inc(self, labels=(), amount=1):
+    self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+  """Value that goes up and down, e.g. the number of requests in flight."""
+  kind = 'gauge'
+
+  def Inc(self, labels=(), amount=1):
+    self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Histogram(_Metric):
+  """Distribution of observed values, e.g. latencies, counted in buckets."""
+  kind = 'histogram'
+
+  def __init__(self, name, documentation, label_names=(),
+               buckets=DEFAULT_BUCKETS):
+    _Metric.__init__(self, name, documentation, label_names)
+    self.buckets = tuple(sorted(buckets))
+
+  def Observe(self, value, labels=()):
+    counts = self.values.get(labels)
+    if counts is None:
+      # A count per bucket, then the count and the sum of all observations.
+      counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+    for i, bound in enumerate(self.buckets):
+      if value <= bound:
+        counts[i] += 1
+        break
+    counts[-2] += 1
+    counts[-1] += value
+
+  def Samples(self):
+    for labels, counts in sorted(self.values.items()):
+      labels = list(zip(self.label_names, labels))
+      cumulative = 0
+      for bound, count in zip(self.buckets, counts):
+        cumulative += count
+        yield (self.name + '_bucket', labels + [('le', _FormatValue(bound))],
+               cumulative)
+      yield self.name + '_bucket', labels + [('le', '+Inf')], counts[-2]
+      yield self.name + '_count', labels, counts[-2]
+      yield self.name + '_sum', labels, counts[-1]
+
+
+class Metrics(object):
+  """Counters and histograms of the API calls made by PyDrive.
+
+  Maintained from the events of pydrive.hooks once installed on a Hooks
+  registry, see GoogleAuth.EnableMetrics(). All updates and Export() are
+  thread-safe.
+  """
+
+  def __init__(self, buckets=DEFAULT_BUCKETS):
+    """Create an instance of Metrics.
+
+    :param buckets: upper bounds, in seconds, of the latency buckets.
+    :type buckets: tuple.
+    """
+    self._lock = threading.Lock()
+    self.requests = Counter(
+        'pydrive_requests_total',
+        'HTTP requests completed, by API operation, method and status.',
+        ('operation', 'method', 'status'))
+    self.latency = Histogram(
+        'pydrive_request_duration_seconds',
+        'Latency of HTTP requests, by API operation.', ('operation',),
+        buckets)
+    self.sent_bytes = Counter(
+        'pydrive_sent_bytes_total',
+        'Bytes of request bodies sent, by API operation.', ('operation',))
+    self.received_bytes = Counter(
+        'pydrive_received_bytes_total',
+        'Bytes of response bodies received, by API operation.',
+        ('operation',))
+    self.retries = Counter(
+        'pydrive_retries_total',
+        'Retries of failed requests, by API operation and status.',
+        ('operation', 'status'))
+    self.refreshes = Counter(
+        'pydrive_token_refreshes_total',
+        'Access token refreshes, by result.', ('result',))
+    self.cache_lookups = Counter(
+        'pydrive_cache_lookups_total',
+        'Cache lookups, by cache and result.', ('cache', 'result'))
+    self.in_flight = Gauge(
+        'pydrive_requests_in_flight', 'HTTP requests sent and not completed.')
+    self.in_flight.values[()] = 0
+
+  def Install(self, hooks):
+    """Registers the callbacks maintaining the metrics on hooks.
+
+    :param hooks: the hooks of the calls to measure.
+    :type hooks: pydrive.hooks.Hooks
+    """
+    hooks.Register('before_request', self._BeforeRequest)
+    hooks.Register('after_response', self._AfterResponse)
+    hooks.Register('on_retry', self._OnRetry)
+    hooks.Register('on_refresh', self._OnRefresh)
+
+  def Uninstall(self, hooks):
+    """Unregisters the callbacks registered by Install().
+
+    :param hooks: the hooks metrics were installed on.
+    :type hooks: pydrive.hooks.Hooks
+    """
+    hooks.Unregister('before_request', self._BeforeRequest)
+    hooks.Unregister('after_response', self._AfterResponse)
+    hooks.Unregister('on_retry', self._OnRetry)
+    hooks.Unregister('on_refresh', self._OnRefresh)
+
+  def RecordCacheLookup(self, cache, hit):
+    """Counts a lookup in a cache, for the cache hit rate.
+
+    :param cache: name of the cache.
+    :type cache: str.
+    :param hit: whether the lookup found the value.
+    :type hit: bool.
+    """
+    with self._lock:
+      self.cache_lookups.Inc((cache, 'hit' if hit else 'miss'))
+
+  def Export(self):
+    """Returns a snapshot of the metrics in the Prometheus text format.
+
+    :returns: str -- the metrics, to be served with CONTENT_TYPE.
+    """
+    lines = []
+    with self._lock:
+      for metric in (self.requests, self.latency, self.sent_bytes,
+                     self.received_bytes, self.retries, self.refreshes,
+                     self.cache_lookups, self.in_flight):
+        lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+        lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+        for name, labels, value in metric.Samples():
+          labels = ','.join('%s="%s"' % (label, _EscapeLabel(label_value))
+                            for label, label_value in labels)
+          lines.append('%s%s %s' % (name, '{%s}' % labels if labels else '',
+                                    _FormatValue(value)))
+    return '\n'.join(lines) + '\n'
+
+  def _BeforeRequest(self, event):
+    with self._lock:
+      self.in_flight.Inc()
+      if event.bytes:
+        self.sent_bytes.Inc((_Label(event.operation),), event.bytes)
+
+  def _AfterResponse(self, event):
+    operation = _Label(event.operation)
+    status = 'error' if event.status is None else str(event.status)
+    with self._lock:
+      self.in_flight.Inc(amount=-1)
+      self.requests.Inc((operation, event.method or '', status))
+      self.latency.Observe(event.duration, (operation,))
+      if event.bytes:
+        self.received_bytes.Inc((operation,), event.bytes)
+
+  def _OnRetry(self, event):
+    status = 'error' if event.status is None else str(event.status)
+    with self._lock:
+      self.retries.Inc((_Label(event.operation), status))
+
+  def _OnRefresh(self, event):
+    with self._lock:
+      self.refreshes.Inc(('error' if event.error is not None else 'success',))
+
+
+def _Label(operation):
+  """Returns the operation label of requests made outside of API methods."""
+  return operation or 'other'
+
+
+def _EscapeLabel(value):
+  """Escapes a label value as the Prometheus text format requires."""
+  return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+      '\n', '\\n')
+
+
+def _FormatValue(value):
+  """Formats a sample value, integral values without a fraction."""
+  if isinstance(value, float) and not value.is_integer():
+    return repr(value)
+  return str(int(value))
@@ -0,0 +1,219 @@
+import codecs
+import json
+import re
+
+from apiclient.model import JsonModel
+
+# Decoders tried, in order, when none is configured.
+AUTO_DECODERS = ('orjson', 'ujson', 'json')
+# Size of the blocks ListParser.Parse() feeds a response in.
+PARSE_BLOCK_SIZE = 64 * 1024
+# States of ListParser, between two tokens of the response.
+_START, _KEY, _COLON, _VALUE, _NEXT, _ITEM, _NEXT_ITEM, _DONE = range(8)
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Characters a number starts with, and may be followed by once complete.
+_NUMBER_STARTS = '-0123456789'
+_NUMBER_ENDS = ',]} \t\n\r'
+
+
+def LoadDecoder(decoder=None):
+  """Returns a function decoding JSON documents, given as bytes or str.
+
+  :param decoder: 'json', 'orjson' or 'ujson', a function to use as is, or
+    None for the fastest one installed.
+  :type decoder: str or callable.
+  :returns: callable -- the decoding function.
+  :raises: ValueError, ImportError
+  """
+  if callable(decoder):
+    return decoder
+  if decoder in (None, 'auto'):
+    for name in AUTO_DECODERS:
+      try:
+        return LoadDecoder(name)
+      except ImportError:
+        pass
+  if decoder == 'json':
+    return json.loads
+  if decoder == 'orjson':
+    import orjson
+    return orjson.loads
+  if decoder == 'ujson':
+    import ujson
+    return ujson.loads
+  raise ValueError('Unknown JSON decoder %r, expected one of %s' % (
+      decoder, ', '.join(AUTO_DECODERS)))
+
+
+def RawContent(resp, content):
+  """Postproc of requests whose response is returned undecoded.
+
+  Set it as the 'postproc' of a googleapiclient.http.HttpRequest to parse the
+  response with ListParser instead.
+  """
+  return content
+
+
+class DriveJsonModel(JsonModel):
+  """JsonModel decoding responses with a configurable decoder.
+
+  Requests are still encoded with the json module.
+  """
+
+  def __init__(self, decoder=None, data_wrapper=False):
+    """Create an instance of DriveJsonModel.
+
+    :param decoder: the decoder, see LoadDecoder().
+    :type decoder: str or callable.
+    :param data_wrapper: whether bodies are wrapped in a 'data' member.
+    :type data_wrapper: bool.
+    """
+    JsonModel.__init__(self, data_wrapper)
+    self.decoder = LoadDecoder(decoder)
+
+  def deserialize(self, content):
+    try:
+      body = self.decoder(content)
+    except ValueError:  # Decoders raise subclasses of ValueError.
+      if isinstance(content, bytes):
+        content = content.decode('utf-8')
+      return content
+    if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+      body = body['data']
+    return body
+
+
+class ListParser(object):
+  """Incremental parser of list responses, decoding their items one by one.
+
+  Feed() it a response in blocks of any size: it returns the items of the
+  'items' array completed by each block, so that neither the whole decoded
+  response nor all of its items have to be in memory at once. The other
+  members of the response, e.g. 'nextPageToken', are kept in 'envelope'.
+  Items are decoded with the json module, which finds where they end.
+  """
+
+  def __init__(self, array='items'):
+    """Create an instance of ListParser.
+
+    :param array: name of the member holding the items.
+    :type array: str.
+    """
+    self.array = array
+    self.envelope = {}
+    self._text = codecs.getincrementaldecoder('utf-8')()
+    self._scan = json.JSONDecoder().raw_decode
+    self._buffer = u''
+    self._state = _START
+    self._key = None
+    self._closed = False
+
+  def Parse(self, content, block_size=PARSE_BLOCK_SIZE):
+    """Yields the items of a whole response, parsing it block by block.
+
+    :param content: the response.
+    :type content: bytes.
+    :param block_size: number of bytes parsed at a time.
+    :type block_size: int.
+    :raises: ValueError
+    """
+    view = memoryview(content)
+    for start in range(0, len(view), block_size):
+      for item in self.Feed(view[start:start + block_size]):
+        yield item
+    for item in self.Close():
+      yield item
+
+  def Feed(self, data):
+    """Parses the next block of the response.
+
+    :param data: the block, UTF-8 encoded.
+    :type data: bytes.
+    :returns: list -- the items completed by the block.
+    :raises: ValueError
+    """
+    self._buffer += self._text.decode(data)
+    return self._Parse()
+
+  def Close(self):
+    """Parses the end of the response, which must be complete.
+
+    :returns: list -- the last items.
+    :raises: ValueError
+    """
+    self._buffer += self._text.decode(b'', True)
+    self._closed = True
+    items = self._Parse()
+    if self._state != _DONE:
+      raise ValueError('Incomplete list response')
+    return items
+
+  def _Parse(self):
+    """Parses the buffer up to its last complete token."""
+    items = []
+    buffer = self._buffer
+    pos, end = 0, len(buffer)
+    while True:
+      pos = _WHITESPACE.match(buffer, pos).end()
+      if pos == end:
+        break
+      state, char = self._state, buffer[pos]
+      if state == _START:
+        self._Expect(char, '{', pos)
+        self._state, pos = _KEY, pos + 1
+      elif state in (_KEY, _ITEM) and char == '}]'[state == _ITEM]:
+        self._state = _DONE if state == _KEY else _NEXT
+        pos += 1
+      elif state in (_KEY, _VALUE, _ITEM):
+        if state == _KEY:
+          self._Expect(char, '"', pos)
+        elif state == _VALUE and char == '[' and self._key == self.array:
+          self._state, pos = _ITEM, pos + 1
+          continue
+        value, after = self._Value(buffer, pos)
+        if after is None:
+          break
+        if state == _KEY:
+          self._key, self._state = value, _COLON
+        elif state == _VALUE:
+          self.envelope[self._key] = value
+          self._state = _NEXT
+        else:
+          items.append(value)
+          self._state = _NEXT_ITEM
+        pos = after
+      elif state == _COLON:
+        self._Expect(char, ':', pos)
+        self._state, pos = _VALUE, pos + 1
+      elif state in (_NEXT, _NEXT_ITEM):
+        if char == ',':
+          self._state = _KEY if state == _NEXT else _ITEM
+        else:
+          self._Expect(char, '}]'[state == _NEXT_ITEM], pos)
+          self._state = _DONE if state == _NEXT else _NEXT
+        pos += 1
+      else:
+        raise ValueError('Extra data at %d: %r' % (pos, char))
+    self._buffer = buffer[pos:]
+    return items
+
+  def _Value(self, buffer, pos):
+    """Decodes the value at pos, returns it and where it ends.
+
+    Returns (None, None) if the value may not be complete yet.
+    """
+    try:
+      value, after = self._scan(buffer, pos)
+    except ValueError:
+      if self._closed:
+        raise
+      return None, None
+    if buffer[pos] in _NUMBER_STARTS and not self._closed and (
+        after == len(buffer) or buffer[after] not in _NUMBER_ENDS):
+      return None, None  # The number could go on in the next block.
+    return value, after
+
+  @staticmethod
+  def _Expect(char, expected, pos):
+    if char != expected:
+      raise ValueError('Expecting %r at %d, got %r' % (expected, pos, char))
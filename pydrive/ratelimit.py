@@ -0,0 +1,159 @@
+import threading
+import time
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class TokenBucket(object):
+  """Thread-safe token bucket.
+
+  Tokens are added at 'rate' per second, up to 'capacity'. Consume() never
+  refuses tokens: it takes them, driving the bucket into debt if needed, and
+  then sleeps until the debt is paid off. This allows charging for amounts
+  only known after the fact, such as the size of a download.
+  """
+
+  def __init__(self, rate, capacity=None):
+    """Create an instance of TokenBucket.
+
+    :param rate: number of tokens added per second.
+    :type rate: float.
+    :param capacity: maximum number of tokens, 'rate' if not given.
+    :type capacity: float.
+    """
+    self.rate = float(rate)
+    self.capacity = float(capacity if capacity is not None else rate)
+    self.tokens = self.capacity
+    self.updated = _clock()
+    self._lock = threading.Lock()
+
+  def Consume(self, tokens=1):
+    """Takes tokens out of the bucket, waiting for them if necessary.
+
+    :param tokens: number of tokens to take.
+    :type tokens: float.
+    """
+    with self._lock:
+      wait = self._Take(tokens, _clock())
+    if wait > 0:
+      time.sleep(wait)
+
+  def _Take(self, tokens, now):
+    """Refills the bucket up to now and takes tokens out of it.
+
+    :returns: float -- seconds to wait until the bucket is out of debt.
+    """
+    elapsed = max(0.0, now - self.updated)
+    self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+    self.updated = now
+    self.tokens -= tokens
+    return max(0.0, -self.tokens / self.rate)
+
+
+class FileTokenBucket(TokenBucket):
+  """Token bucket whose state is kept in a local file.
+
+  All processes on a host using the same file share one bucket, so a fleet of
+  workers can stay under a common quota. Requires fcntl, i.e. a POSIX system.
+  """
+
+  def __init__(self, path, rate, capacity=None):
+    """Create an instance of FileTokenBucket.
+
+    :param path: path of the file holding the state of the bucket.
+    :type path: str.
+    :param rate: number of tokens added per second.
+    :type rate: float.
+    :param capacity: maximum number of tokens, 'rate' if not given.
+    :type capacity: float.
+    """
+    super(FileTokenBucket, self).__init__(rate, capacity)
+    self.path = path
+
+  def Consume(self, tokens=1):
+    """Takes tokens out of the shared bucket, waiting for them if necessary.
+
+    :param tokens: number of tokens to take.
+    :type tokens: float.
+    """
+    import fcntl
+
+    with self._lock:
+      with open(self.path, 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+          f.seek(0)
+          state = f.read().split()
+          now = time.time()  # Shared between processes, so no monotonic clock.
+          if len(state) == 2:
+            self.tokens, self.updated = float(state[0]), float(state[1])
+          else:
+            self.tokens, self.updated = self.capacity, now
+          wait = self._Take(tokens, now)
+          f.seek(0)
+          f.truncate()
+          f.write('%r %r' % (self.tokens, self.updated))
+          f.flush()
+        finally:
+          fcntl.flock(f, fcntl.LOCK_UN)
+    if wait > 0:
+      time.sleep(wait)
+
+
+class RateLimiter(object):
+  """Client-side rate limiter for API requests.
+
+  Keeps separate budgets for queries (every request), writes (every request
+  which is not a GET) and bytes transferred. Budgets which are not given are
+  not limited.
+  """
+
+  def __init__(self, queries_per_second=None, writes_per_second=None,
+               bytes_per_second=None, shared_file=None):
+    """Create an instance of RateLimiter.
+
+    :param queries_per_second: number of requests allowed per second.
+    :type queries_per_second: float.
+    :param writes_per_second: number of writing requests allowed per second.
+    :type writes_per_second: float.
+    :param bytes_per_second: number of bytes allowed to transfer per second.
+    :type bytes_per_second: float.
+    :param shared_file: path prefix of files to share the budgets through with
+      other processes, budgets are kept in memory if not given.
+    :type shared_file: str.
+    """
+    self.queries = self._Bucket(queries_per_second, shared_file, 'queries')
+    self.writes = self._Bucket(writes_per_second, shared_file, 'writes')
+    self.bytes = self._Bucket(bytes_per_second, shared_file, 'bytes')
+
+  @staticmethod
+  def _Bucket(rate, shared_file, name):
+    if rate is None:
+      return None
+    if shared_file is None:
+      return TokenBucket(rate)
+    return FileTokenBucket('%s.%s' % (shared_file, name), rate)
+
+  def AcquireRequest(self, method='GET', size=0):
+    """Waits until a request may be sent.
+
+    :param method: HTTP method of the request.
+    :type method: str.
+    :param size: number of bytes the request uploads.
+    :type size: int.
+    """
+    if self.queries is not None:
+      self.queries.Consume()
+    if self.writes is not None and method != 'GET':
+      self.writes.Consume()
+    if size:
+      self.AcquireBytes(size)
+
+  def AcquireBytes(self, size):
+    """Charges transferred bytes, waiting if the byte budget is exhausted.
+
+    :param size: number of bytes transferred.
+    :type size: int.
+    """
+    if self.bytes is not None:
+      self.bytes.Consume(size)
@@ -0,0 +1,265 @@
+import errno
+import json
+import random
+import socket
+import threading
+import time
+
+try:
+  from urllib.parse import urlsplit
+except ImportError:  # Python 2
+  from urlparse import urlsplit
+
+# HTTP status codes of responses worth retrying.
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Reasons of 403 responses which only mean that a rate limit was hit.
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+# errno values of network errors raised before a request was sent.
+CONNECT_ERRNOS = (errno.ECONNREFUSED, errno.EHOSTUNREACH, errno.ENETUNREACH)
+# HTTP methods of requests which may take effect twice if they are repeated,
+# e.g. Files.insert() creating a second file.
+NON_IDEMPOTENT_METHODS = ('POST',)
+# Endings of the paths of POST requests which are idempotent nevertheless.
+IDEMPOTENT_POST_PATHS = ('/trash', '/untrash', '/touch')
+try:
+  TRANSIENT_ERRORS = (socket.timeout, ConnectionError)
+except NameError:  # Python 2 has no ConnectionError.
+  TRANSIENT_ERRORS = (socket.timeout, socket.error)
+
+
+class RetryBudget(object):
+  """Limits the number of retries across all calls sharing this budget.
+
+  Every retry withdraws one token and every successful call deposits
+  'token_ratio' tokens, up to 'max_tokens'. When the API is failing for good,
+  the budget runs dry and calls fail fast instead of retrying in a storm.
+  A budget is thread-safe and can be shared by several RetryPolicy instances.
+  """
+
+  def __init__(self, max_tokens=100, token_ratio=0.1):
+    """Create an instance of RetryBudget.
+
+    :param max_tokens: maximum number of retries which can be saved up.
+    :type max_tokens: float.
+    :param token_ratio: number of retries each successful call earns.
+    :type token_ratio: float.
+    """
+    self.max_tokens = max_tokens
+    self.token_ratio = token_ratio
+    self.tokens = max_tokens
+    self._lock = threading.Lock()
+
+  def Withdraw(self):
+    """Takes one retry out of the budget.
+
+    :returns: bool -- True if the budget allows one more retry.
+    """
+    with self._lock:
+      if self.tokens < 1:
+        return False
+      self.tokens -= 1
+      return True
+
+  def Deposit(self):
+    """Credits the budget for a successful call."""
+    with self._lock:
+      self.tokens = min(self.max_tokens, self.tokens + self.token_ratio)
+
+
+class RetryPolicy(object):
+  """Retries failed requests with exponential backoff and full jitter.
+
+  Requests are retried if they failed with a 429 or 5xx response, a 403
+  response caused by a rate limit, or a transient network error. Requests
+  which are not idempotent, such as Files.insert(), are only retried if the
+  error shows that they were not applied: a rate limit response or a failure
+  to connect. A 5xx response or a timeout may come after the server applied
+  the request, and repeating it would then create a second file. Responses
+  asking to wait longer than 'max_delay' with Retry-After are not retried.
+  """
+
+  def __init__(self, max_retries=5, initial_delay=1.0, max_delay=32.0,
+               budget=None):
+    """Create an instance of RetryPolicy.
+
+    :param max_retries: maximum number of retries of a single call.
+    :type max_retries: int.
+    :param initial_delay: upper bound of the delay before the first retry, in
+      seconds. The bound doubles with every further retry.
+    :type initial_delay: float.
+    :param max_delay: cap of the delay between two attempts, in seconds.
+    :type max_delay: float.
+    :param budget: retry budget shared by all calls, a new one if not given.
+    :type budget: RetryBudget.
+    """
+    self.max_retries = max_retries
+    self.initial_delay = initial_delay
+    self.max_delay = max_delay
+    self.budget = budget if budget is not None else RetryBudget()
+
+  def Call(self, function, *args, **kwargs):
+    """Calls function and retries it until it succeeds or may not be retried.
+
+    The request function makes is assumed to be idempotent, see
+    CallRequest() otherwise.
+
+    :param function: the function making the request.
+    :type function: callable.
+    :returns: the return value of function.
+    :raises: the last error raised by function.
+    """
+    return self.CallRequest(None, None, function, *args, **kwargs)
+
+  def CallRequest(self, method, uri, function, *args, **kwargs):
+    """Calls function making a request, retrying it while that is safe.
+
+    :param method: HTTP method of the request, e.g. 'POST'.
+    :type method: str.
+    :param uri: uri of the request.
+    :type uri: str.
+    :param function: the function making the request.
+    :type function: callable.
+    :returns: the return value of function.
+    :raises: the last error raised by function.
+    """
+    retry_number = 0
+    while True:
+      try:
+        result = function(*args, **kwargs)
+      except Exception as error:
+        if retry_number >= self.max_retries or \
+                not self.IsRetryable(error, method, uri) or \
+                not self.budget.Withdraw():
+          raise
+        time.sleep(self.GetDelay(retry_number, error))
+        retry_number += 1
+      else:
+        self.budget.Deposit()
+        return result
+
+  def GetDelay(self, retry_number, error=None):
+    """Returns the number of seconds to wait before a retry.
+
+    The delay is drawn uniformly between zero and the exponential backoff bound
+    ("full jitter"), so clients failing together do not retry together. A
+    Retry-After header of the failed response is respected, up to
+    'max_delay'.
+
+    :param retry_number: number of retries made so far.
+    :type retry_number: int.
+    :param error: the error that caused the retry.
+    :type error: Exception.
+    :returns: float -- the delay in seconds.
+    """
+    bound = min(self.max_delay, self.initial_delay * 2 ** retry_number)
+    delay = random.uniform(0, bound)
+    retry_after = GetRetryAfter(error)
+    if retry_after is not None:
+      delay = max(delay, min(retry_after, self.max_delay))
+    return delay
+
+  def IsRetryable(self, error, method=None, uri=None):
+    """Checks if a request that failed with error may be retried.
+
+    :param error: the error raised by the request.
+    :type error: Exception.
+    :param method: HTTP method of the request, idempotent if not given.
+    :type method: str.
+    :param uri: uri of the request.
+    :type uri: str.
+    :returns: bool -- True if the request may be retried.
+    """
+    retry_after = GetRetryAfter(error)
+    if retry_after is not None and retry_after > self.max_delay:
+      return False
+    if not IsIdempotent(method, uri):
+      return IsRejectedError(error)
+    return IsRetryableError(error)
+
+
+def GetRetryAfter(error):
+  """Returns the delay the Retry-After header of an error response asks for.
+
+  :param error: the error raised by a request.
+  :type error: Exception.
+  :returns: float -- the delay in seconds, None if there is no valid header.
+  """
+  resp = getattr(error, 'resp', None)
+  if resp is None or resp.get('retry-after') is None:
+    return None
+  try:
+    retry_after = float(resp['retry-after'])
+  except ValueError:
+    return None  # Retry-After given as a date, or broken.
+  if not 0 <= retry_after < float('inf'):
+    return None  # Negative, infinite or NaN.
+  return retry_after
+
+
+def IsIdempotent(method, uri=None):
+  """Checks if making a request twice has the same effect as making it once.
+
+  :param method: HTTP method of the request, idempotent if None.
+  :type method: str.
+  :param uri: uri of the request.
+  :type uri: str.
+  :returns: bool -- True if the request may be repeated.
+  """
+  if method not in NON_IDEMPOTENT_METHODS:
+    return True
+  return bool(uri) and urlsplit(uri).path.endswith(IDEMPOTENT_POST_PATHS)
+
+
+def IsRetryableError(error):
+  """Checks if error is an error response or network error worth retrying.
+
+  :param error: the error raised by a request.
+  :type error: Exception.
+  :returns: bool -- True if the request may be retried.
+  """
+  from apiclient import errors
+
+  if isinstance(error, errors.HttpError):
+    return IsRetryableResponse(error.resp, error.content)
+  return isinstance(error, TRANSIENT_ERRORS)
+
+
+def IsRejectedError(error):
+  """Checks if error shows that a request was not applied, so may be retried.
+
+  This is the case for rate limit responses and failures to connect, which
+  come before the server could apply the request.
+
+  :param error: the error raised by a request.
+  :type error: Exception.
+  :returns: bool -- True if the request may be retried, even if it is not
+    idempotent.
+  """
+  from apiclient import errors
+
+  if isinstance(error, errors.HttpError):
+    return error.resp.status in (403, 429) and \
+        IsRetryableResponse(error.resp, error.content)
+  return getattr(error, 'errno', None) in CONNECT_ERRNOS
+
+
+def IsRetryableResponse(resp, content):
+  """Checks if a request that got an error response may be retried.
+
+  :param resp: the response.
+  :type resp: httplib2.Response
+  :param content: the body of the response.
+  :type content: bytes.
+  :returns: bool -- True if the request may be retried.
+  """
+  if resp.status in RETRYABLE_STATUSES:
+    return True
+  if resp.status != 403:
+    return False
+  try:
+    if isinstance(content, bytes):
+      content = content.decode('utf-8')
+    reasons = [e.get('reason') for e in json.loads(content)['error']['errors']]
+  except (ValueError, KeyError, TypeError, AttributeError):
+    return False
+  return any(reason in RATE_LIMIT_REASONS for reason in reasons)
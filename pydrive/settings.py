@@ -1,10 +1,3 @@
-from yaml import load
-from yaml import YAMLError
-try:
-  from yaml import CLoader as Loader
-except ImportError:
-  from yaml import Loader
-
 SETTINGS_FILE = 'settings.yaml'
 SETTINGS_STRUCT = {
     'client_config_backend': {
@@ -119,6 +112,22 @@ SETTINGS_STRUCT = {
     'save_credentials_file': {
         'type': str,
         'required': False,
+    },
+    'discovery_cache_file': {
+        'type': str,
+        'required': False,
+    },
+    'token_refresh_margin': {
+        'type': int,
+        'required': False,
+    },
+    'json_decoder': {
+        'type': str,
+        'required': False,
+    },
+    'metadata_freshness': {
+        'type': int,
+        'required': False,
     }
 }
 
@@ -138,6 +147,13 @@ def LoadSettingsFile(filename=SETTINGS_FILE):
   :type filename: str.
   :raises: SettingsError
   """
+  from yaml import load
+  from yaml import YAMLError
+  try:
+    from yaml import CLoader as Loader
+  except ImportError:
+    from yaml import Loader
+
   try:
     stream = open(filename, 'r')
     data = load(stream, Loader=Loader)
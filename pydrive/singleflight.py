@@ -0,0 +1,90 @@
+import threading
+
+
+class _Call(object):
+  """A call in flight and, once done, its result or error."""
+  __slots__ = ('done', 'result', 'error')
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.result = None
+    self.error = None
+
+
+class SingleFlight(object):
+  """Coalesces concurrent identical calls into one.
+
+  While a call with a key runs, other calls with the same key wait for it
+  and share its result, or its error, instead of running. A call made once
+  it is done runs again. Do() coalesces calls of threads and DoAsync() calls
+  of coroutines of one event loop.
+
+  Enable it with GoogleDrive.EnableRequestCoalescing() to coalesce the
+  requests of FetchMetadata() and FetchContent().
+  """
+
+  def __init__(self):
+    self.shared = 0  # Calls which got the result of another one.
+    self._calls = {}
+    self._tasks = {}
+    self._lock = threading.Lock()
+
+  def Do(self, key, function, *args, **kwargs):
+    """Calls function, unless a call with key is in flight in another thread.
+
+    :param key: identifies identical calls, e.g. a file id and fields.
+    :type key: hashable.
+    :param function: the call to make.
+    :type function: callable.
+    :returns: the return value of function, maybe from another thread.
+    """
+    with self._lock:
+      call = self._calls.get(key)
+      leader = call is None
+      if leader:
+        call = self._calls[key] = _Call()
+      else:
+        self.shared += 1
+    if not leader:
+      call.done.wait()
+      if call.error is not None:
+        raise call.error
+      return call.result
+    try:
+      call.result = function(*args, **kwargs)
+      return call.result
+    except BaseException as error:  # Waiting threads must not get None.
+      call.error = error
+      raise
+    finally:
+      with self._lock:
+        del self._calls[key]
+      call.done.set()
+
+  def DoAsync(self, key, function, *args, **kwargs):
+    """Awaitable of function, unless a call with key is in flight already.
+
+    :param key: identifies identical calls, e.g. a file id and fields.
+    :type key: hashable.
+    :param function: coroutine function making the call.
+    :type function: callable.
+    :returns: awaitable -- the result of the call, cancelling it cancels
+      waiting only.
+    """
+    import asyncio
+
+    task = self._tasks.get(key)
+    if task is not None:
+      self.shared += 1
+    else:
+      task = asyncio.ensure_future(function(*args, **kwargs))
+      self._tasks[key] = task
+      task.add_done_callback(lambda _: self._tasks.pop(key, None))
+      task.add_done_callback(_Retrieve)
+    return asyncio.shield(task)
+
+
+def _Retrieve(task):
+  """Retrieves the error of a task, which all its callers may have left."""
+  if not task.cancelled():
+    task.exception()
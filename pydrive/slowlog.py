@@ -0,0 +1,254 @@
+import collections
+import logging
+import threading
+import time
+
+from six import string_types
+
+from .apiattr import ApiResourceList
+
+_clock = getattr(time, 'perf_counter', time.time)
+# Seconds a call takes at least to be logged by default.
+DEFAULT_THRESHOLD = 1.0
+# Number of profiles a SlowCallLog keeps.
+MAX_PROFILES = 10
+# Number of functions of a profile logged, by cumulative time.
+PROFILE_LINES = 25
+# Request parameters never logged, and the length logged values are cut to.
+SECRET_PARAMS = ('access_token', 'key', 'pageToken')
+MAX_PARAM_LENGTH = 100
+# Only one profiler may run in a process at a time.
+_profiler_lock = threading.Lock()
+
+
+class CallRecord(object):
+  """Timings of one operation decorated with pydrive.auth.LoadAuth.
+
+  Stored fields:
+
+  - operation: class and method name, e.g. 'GoogleDriveFileList._GetList'.
+  - file_id: id of the file the operation is about.
+  - params: sanitized request parameters.
+  - auth: seconds spent checking and loading the auth.
+  - request: seconds spent waiting for HTTP responses.
+  - parse: seconds spent decoding responses into resources.
+  - execute: seconds spent executing API requests, including request, parse
+    and the waits in between.
+  - total: seconds the operation took.
+  - bytes: bytes of the responses received.
+  - error: the exception the operation raised, None if it succeeded.
+
+  Properties computed from them:
+
+  - wait: execute less request and parse, i.e. seconds spent in retry
+    backoff and waiting for the rate and concurrency limiters.
+  - construction: total less auth and execute, i.e. seconds spent in the
+    operation itself, e.g. building GoogleDriveFile objects.
+  """
+  __slots__ = ('operation', 'file_id', 'params', 'auth', 'request', 'parse',
+               'execute', 'total', 'bytes', 'error')
+
+  def __init__(self, operation, file_id=None, params=None):
+    self.operation = operation
+    self.file_id = file_id
+    self.params = params
+    self.auth = 0.0
+    self.request = 0.0
+    self.parse = 0.0
+    self.execute = 0.0
+    self.total = 0.0
+    self.bytes = 0
+    self.error = None
+
+  @property
+  def wait(self):
+    """Seconds spent executing API requests but not in request or parse."""
+    return max(0.0, self.execute - self.request - self.parse)
+
+  @property
+  def construction(self):
+    """Seconds of the operation spent outside of auth and execute."""
+    return max(0.0, self.total - self.auth - self.execute)
+
+  def __str__(self):
+    return ('%s file_id=%s %.3fs (auth %.3fs, request %.3fs, parse %.3fs, '
+            'wait %.3fs, construction %.3fs) %d bytes params=%r%s' % (
+                self.operation, self.file_id, self.total, self.auth,
+                self.request, self.parse, self.wait, self.construction,
+                self.bytes, self.params,
+                ' error=%r' % self.error if self.error else ''))
+
+
+class SlowCallLog(object):
+  """Logs the operations of PyDrive which take longer than a threshold.
+
+  Every operation decorated with pydrive.auth.LoadAuth is timed, split into
+  auth check, HTTP requests, response decoding, retry and limiter waits and
+  the work of the operation itself, see CallRecord. Operations taking
+  'threshold' seconds or more are logged as warnings. 1 in 'profile_every'
+  calls of 'profile_operation' also run under cProfile, and their statistics
+  are logged and kept in 'profiles'.
+
+  Enable it with GoogleAuth.EnableSlowCallLog().
+  """
+
+  def __init__(self, threshold=DEFAULT_THRESHOLD, logger=None,
+               profile_operation=None, profile_every=100):
+    """Create an instance of SlowCallLog.
+
+    :param threshold: seconds a call takes at least to be logged.
+    :type threshold: float.
+    :param logger: logger to log to, the 'pydrive.slowlog' logger if not given.
+    :type logger: logging.Logger
+    :param profile_operation: name of the operation to profile, with or
+      without its class, e.g. '_GetList'.
+    :type profile_operation: str.
+    :param profile_every: profile 1 in this many calls of the operation.
+    :type profile_every: int.
+    """
+    self.threshold = threshold
+    self.logger = logger or logging.getLogger(__name__)
+    self.profile_operation = profile_operation
+    self.profile_every = profile_every
+    self.profiles = collections.deque(maxlen=MAX_PROFILES)
+    self._profile_count = 0
+    self._lock = threading.Lock()
+    self._local = threading.local()
+
+  def Install(self, hooks):
+    """Registers the callback timing HTTP requests on hooks.
+
+    :param hooks: the hooks of the auth instance making the calls.
+    :type hooks: pydrive.hooks.Hooks
+    """
+    hooks.Register('after_response', self._AfterResponse)
+
+  def Uninstall(self, hooks):
+    """Unregisters the callback registered by Install().
+
+    :param hooks: the hooks the log was installed on.
+    :type hooks: pydrive.hooks.Hooks
+    """
+    hooks.Unregister('after_response', self._AfterResponse)
+
+  def Call(self, load_auth, function, obj, args, kwargs):
+    """Loads the auth of obj and calls one of its methods, timing both.
+
+    Calls made while another call is timed in the same thread count towards
+    the outer call.
+
+    :param load_auth: function loading the auth of obj, called with obj and
+      kwargs.
+    :type load_auth: callable.
+    :param function: the method called.
+    :type function: callable.
+    :param obj: the object the method is called on.
+    :returns: the return value of the method.
+    """
+    if getattr(self._local, 'call', None) is not None:
+      load_auth(obj, kwargs)
+      return function(obj, *args, **kwargs)
+    params = kwargs.get('param')
+    if isinstance(obj, ApiResourceList):
+      params = obj  # A file list keeps its parameters as items.
+    file_id = dict.get(obj, 'id') if isinstance(obj, dict) else None
+    call = CallRecord('%s.%s' % (type(obj).__name__, function.__name__),
+                      file_id, params)  # Sanitized once filled in.
+    profiler = None
+    self._local.call = call
+    start = _clock()
+    try:
+      load_auth(obj, kwargs)
+      call.auth = _clock() - start
+      profiler = self._StartProfile(function.__name__, call.operation)
+      if profiler is None:
+        return function(obj, *args, **kwargs)
+      return profiler.runcall(function, obj, *args, **kwargs)
+    except Exception as error:
+      call.error = error
+      raise
+    finally:
+      call.total = _clock() - start
+      self._local.call = None
+      slow = call.total >= self.threshold
+      if slow or profiler is not None:
+        call.params = _SanitizeParams(call.params)
+      if profiler is not None:
+        _profiler_lock.release()
+        self._AddProfile(call, profiler)
+      if slow:
+        self.logger.warning('Slow call %s', call)
+
+  def AddExecuteTime(self, duration):
+    """Counts the time an API request took towards the current call.
+
+    :param duration: seconds spent executing the request, including retries
+      and decoding the response.
+    :type duration: float.
+    """
+    call = getattr(self._local, 'call', None)
+    if call is not None:
+      call.execute += duration
+
+  def TimeParse(self, postproc):
+    """Returns postproc of a request, timing it towards the current call.
+
+    :param postproc: function decoding the response of the request.
+    :type postproc: callable.
+    :returns: callable -- postproc, timed.
+    """
+    def Parse(resp, content):
+      start = _clock()
+      try:
+        return postproc(resp, content)
+      finally:
+        call = getattr(self._local, 'call', None)
+        if call is not None:
+          call.parse += _clock() - start
+    return Parse
+
+  def _AfterResponse(self, event):
+    call = getattr(self._local, 'call', None)
+    if call is not None:
+      call.request += event.duration or 0.0
+      call.bytes += event.bytes or 0
+
+  def _StartProfile(self, name, operation):
+    """Returns a profiler for 1 in profile_every calls of the operation."""
+    if self.profile_operation not in (name, operation):
+      return None
+    with self._lock:
+      self._profile_count += 1
+      if self._profile_count % self.profile_every:
+        return None
+    if not _profiler_lock.acquire(False):
+      return None  # Another thread is profiling.
+    import cProfile
+    return cProfile.Profile()
+
+  def _AddProfile(self, call, profiler):
+    import pstats
+    from six import StringIO
+
+    output = StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    self.profiles.append((call.operation, stats))
+    stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+    self.logger.info('Profile of %s\n%s', call, output.getvalue())
+
+
+def _SanitizeParams(params):
+  """Returns params with objects summarized, secrets and long values cut."""
+  sanitized = {}
+  for key, value in (params or {}).items():
+    if key == 'http':
+      continue
+    if key in SECRET_PARAMS:
+      value = '<redacted>'
+    elif isinstance(value, string_types):
+      if len(value) > MAX_PARAM_LENGTH:
+        value = value[:MAX_PARAM_LENGTH] + '...'
+    elif not isinstance(value, (bool, int, float, type(None))):
+      value = '<%s>' % type(value).__name__
+    sanitized[key] = value
+  return sanitized
@@ -0,0 +1,7 @@
+import sys
+
+# Modules using async syntax, which interpreters before Python 3.6 cannot
+# even compile, let alone run.
+ASYNC_TEST_MODULES = ['test_aio.py', 'test_singleflight_aio.py']
+
+collect_ignore = ASYNC_TEST_MODULES if sys.version_info < (3, 6) else []
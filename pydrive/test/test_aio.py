@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+
+from pydrive.aio import AsyncGoogleDrive
+from pydrive.auth import GoogleAuth
+from pydrive.test import test_util
+
+
+def RunUntilComplete(coroutine):
+  """Runs coroutine in a new event loop, as asyncio.run() of Python 3.7."""
+  loop = asyncio.new_event_loop()
+  try:
+    return loop.run_until_complete(coroutine)
+  finally:
+    loop.close()
+
+
+class AsyncGoogleDriveTest(unittest.TestCase):
+  """Tests file operations of aio.AsyncGoogleDrive and its files."""
+
+  ga = GoogleAuth('settings/test1.yaml')
+  ga.LocalWebserverAuth()
+
+  def test_01_Files_Insert_Fetch_Delete(self):
+    async def Run():
+      async with AsyncGoogleDrive(self.ga) as drive:
+        file1 = drive.CreateFile({'title': test_util.CreateRandomFileName()})
+        file1.SetContentString(u'안녕 세상아!')
+        await file1.Upload()  # Files.insert
+
+        file2 = drive.CreateFile({'id': file1['id']})
+        await file2.FetchMetadata()
+        self.assertEqual(file2['title'], file1['title'])
+        self.assertEqual(await file2.GetContentString(), u'안녕 세상아!')
+
+        await file1.Delete()
+    RunUntilComplete(Run())
+
+  def test_02_Files_List_Concurrent_Fetch(self):
+    async def Run():
+      async with AsyncGoogleDrive(self.ga) as drive:
+        title = test_util.CreateRandomFileName()
+        files = [drive.CreateFile({'title': title}) for _ in range(5)]
+        await asyncio.gather(*[file1.Upload() for file1 in files])
+
+        flist = drive.ListFile({'q': "title = '%s' and trashed = false"
+                                     % title, 'maxResults': 2})
+        listed = []
+        async for page in flist:
+          self.assertTrue(len(page) <= 2)
+          listed.extend(page)
+        self.assertEqual(sorted(f['id'] for f in listed),
+                         sorted(f['id'] for f in files))
+
+        fetched = [drive.CreateFile({'id': f['id']}) for f in files]
+        await asyncio.gather(*[f.FetchMetadata() for f in fetched])
+        self.assertEqual([f['title'] for f in fetched], [title] * 5)
+
+        await asyncio.gather(*[file1.Delete() for file1 in files])
+    RunUntilComplete(Run())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from pydrive import cache
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+
+
+class MetadataCacheTest(unittest.TestCase):
+  """Tests cache.MetadataCache of a GoogleDrive, against FakeDrive."""
+
+  def setUp(self):
+    self.fake = FakeDrive()
+    self.ids = [self.fake.AddFile({'title': 'file%d' % i})['id']
+                for i in range(5)]
+    self.gauth = self.fake.Authorize(GoogleAuth())
+    self.drive = GoogleDrive(self.gauth)
+    self.clock = cache._clock
+
+  def tearDown(self):
+    cache._clock = self.clock
+
+  def Requests(self):
+    return len([r for r in self.fake.requests if r[1] != '/token'])
+
+  def test_01_Identity(self):
+    self.drive.EnableMetadataCache()
+    files = self.drive.ListFile().GetList()
+    file1 = self.drive.CreateFile({'id': self.ids[0]})
+    self.assertIs(file1, files[0])
+    requests = self.Requests()
+    self.assertEqual(file1['title'], 'file0')
+    self.assertIs(self.drive.ListFile().GetList()[0], file1)
+    self.assertEqual(self.Requests(), requests + 1)
+    self.assertIsNot(self.drive.CreateFile({'id': self.ids[0], 'title': 'x'}),
+                     file1)
+
+  def test_02_Updated_From_Responses(self):
+    self.drive.EnableMetadataCache()
+    file1 = self.drive.CreateFile({'id': self.ids[0]})
+    file1['description'] = 'not uploaded'
+    other = self.drive.CreateFile({'id': self.ids[0], 'title': 'x'})
+    other.FetchMetadata()
+    other['title'] = 'renamed'
+    other.Upload()
+    self.assertEqual(file1['title'], 'renamed')
+    self.assertEqual(file1.GetChanges(), {'description': 'not uploaded'})
+    self.fake.files[self.ids[0]]['title'] = 'changed remotely'
+    list(self.drive.ListFile().IterList())
+    self.assertEqual(file1['title'], 'changed remotely')
+    other.Delete()
+    self.assertIsNot(self.drive.CreateFile({'id': self.ids[0]}), file1)
+
+  def test_03_Ttl_And_Size(self):
+    now = [1000.0]
+    cache._clock = lambda: now[0]
+    metadata_cache = self.drive.EnableMetadataCache(max_size=3, ttl=60)
+    files = self.drive.ListFile().GetList()
+    self.assertEqual(len(metadata_cache), 3)
+    self.assertIsNot(self.drive.CreateFile({'id': self.ids[0]}), files[0])
+    self.assertIs(self.drive.CreateFile({'id': self.ids[4]}), files[4])
+    now[0] += 60
+    self.assertIsNot(self.drive.CreateFile({'id': self.ids[4]}), files[4])
+
+  def test_04_Lookups_Counted(self):
+    metrics = self.gauth.EnableMetrics()
+    self.drive.EnableMetadataCache()
+    self.drive.CreateFile({'id': self.ids[0]})
+    self.drive.CreateFile({'id': self.ids[0]})
+    self.assertEqual(metrics.cache_lookups.values,
+                     {('metadata', 'hit'): 1, ('metadata', 'miss'): 1})
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,104 @@
+import gzip
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pydrive.auth import GoogleAuth
+from pydrive.cassette import CassetteError
+from pydrive.cassette import LoadCassette
+from pydrive.cassette import Player
+from pydrive.cassette import REDACTED
+from pydrive.cassette import Recorder
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+
+
+class CassetteTest(unittest.TestCase):
+  """Tests recording traffic with FakeDrive and replaying it offline."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'job.cassette')
+    self.fake = FakeDrive()
+    self.credentials = self.fake.Credentials()
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def Drive(self, http_factory):
+    gauth = GoogleAuth()
+    gauth.http_factory = http_factory
+    gauth.credentials = self.credentials
+    gauth.Authorize()
+    return GoogleDrive(gauth)
+
+  def Job(self, drive):
+    """Uploads, fetches, lists and downloads files, returns what it saw."""
+    for i in range(3):
+      file1 = drive.CreateFile({'title': 'file%d' % i})
+      file1.SetContentString(u'content %d é' % i)
+      file1.Upload()
+    drive.auth.Refresh()
+    file2 = drive.CreateFile({'id': file1['id']})
+    return (file2['title'], file2.GetContentString(),
+            sorted(f['title'] for f in drive.ListFile().GetList()))
+
+  def test_01_Record_And_Replay(self):
+    recorder = Recorder(http_factory=self.fake)
+    recorded = self.Job(self.Drive(recorder))
+    recorder.Save(self.path)
+
+    player = Player(self.path)
+    self.assertEqual(self.Job(self.Drive(player)), recorded)
+    self.assertEqual(player.Remaining(), 0)
+    self.assertRaises(CassetteError, player.request,
+                      self.fake.root_url + 'drive/v2/files')
+
+  def test_02_Secrets_Redacted(self):
+    recorder = Recorder(http_factory=self.fake)
+    self.Job(self.Drive(recorder))
+    recorder.Save(self.path)
+    with gzip.open(self.path, 'rb') as f:
+      raw = f.read()
+    self.assertNotIn(self.credentials.access_token.encode('utf-8'), raw)
+    self.assertNotIn(b'fake-refresh-token', raw)
+    self.assertNotIn(b'fake-client-secret', raw)
+    interactions = LoadCassette(self.path)
+    self.assertEqual(interactions[0]['request_headers']['authorization'],
+                     REDACTED)
+    self.assertIn(REDACTED, [i.get('content') for i in interactions
+                             if i['uri'].endswith('/token')][0])
+
+  def test_03_Realtime(self):
+    recorder = Recorder(http_factory=self.fake)
+    self.Job(self.Drive(recorder))
+    for interaction in recorder.interactions:
+      interaction['duration'] = 0.01
+    player = Player(recorder.interactions, realtime=True)
+    start = time.time()
+    self.Job(self.Drive(player))
+    self.assertGreaterEqual(time.time() - start,
+                            0.01 * len(recorder.interactions))
+
+  def test_04_Realtime_Keeps_Gaps(self):
+    recorder = Recorder(http_factory=self.fake)
+    self.Job(self.Drive(recorder))
+    for i, interaction in enumerate(recorder.interactions):
+      interaction['start'] = 1 + 0.05 * i
+      interaction['duration'] = 0.01
+    player = Player(recorder.interactions, realtime=True)
+    start = time.time()
+    self.Job(self.Drive(player))
+    self.assertGreaterEqual(time.time() - start,
+                            0.05 * (len(recorder.interactions) - 1) + 0.01)
+
+  def test_05_Bad_Cassette(self):
+    with open(self.path, 'wb') as f:
+      f.write(b'not a cassette')
+    self.assertRaises(CassetteError, Player, self.path)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import time
+import unittest
+
+from apiclient.errors import HttpError
+from httplib2 import Response
+
+from pydrive.concurrency import AdaptiveConcurrencyLimiter
+
+
+def RateLimited():
+  raise HttpError(Response({'status': 429}), b'')
+
+
+class AdaptiveConcurrencyLimiterTest(unittest.TestCase):
+  """Tests concurrency.AdaptiveConcurrencyLimiter."""
+
+  def test_01_Additive_Increase(self):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=3)
+    limiter.Call(lambda: None)
+    limiter.Call(lambda: None)
+    self.assertAlmostEqual(limiter.limit, 2.9)  # 2 + 1/2 + 1/2.5
+    for _ in range(10):
+      limiter.Call(lambda: None)
+    self.assertEqual(limiter.limit, 3)
+
+  def test_02_Multiplicative_Decrease_Once_Per_Window(self):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+    starts = [limiter.Acquire() for _ in range(4)]
+    for start in starts:
+      limiter.Release(start, overloaded=True)
+    self.assertEqual(limiter.limit, 4)
+    self.assertRaises(HttpError, limiter.Call, RateLimited)
+    self.assertEqual(limiter.limit, 2)
+    self.assertEqual(limiter.in_flight, 0)
+
+  def test_03_Slow_Requests_Do_Not_Increase(self):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2,
+                                         latency_threshold=0.01)
+    limiter.Call(time.sleep, 0.02)
+    self.assertEqual(limiter.limit, 2)
+
+  def test_04_Limits_Requests_In_Flight(self):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    lock = threading.Lock()
+    in_flight = [0, 0]  # Current, maximum.
+
+    def Request():
+      with lock:
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+      time.sleep(0.01)
+      with lock:
+        in_flight[0] -= 1
+
+    threads = [threading.Thread(target=limiter.Call, args=(Request,))
+               for _ in range(10)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(in_flight[1], 2)
+
+
+if __name__ == '__main__':
+  unittest.main()
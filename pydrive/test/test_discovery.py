@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pydrive import discovery
+from pydrive.discovery import DiscoveryError
+from pydrive.discovery import LoadDiscoveryDocument
+
+
+class FakeResponse(dict):
+
+  def __init__(self, status):
+    super(FakeResponse, self).__init__()
+    self.status = status
+
+
+class FakeHttp(object):
+  """Http object answering every request with a canned response."""
+
+  def __init__(self, status=200, content=b'{"kind": "discovery#restDescription"}'):
+    self.status = status
+    self.content = content
+    self.uris = []
+
+  def request(self, uri, *args, **kwargs):
+    self.uris.append(uri)
+    return FakeResponse(self.status), self.content
+
+
+class DiscoveryTest(unittest.TestCase):
+  """Tests loading and caching of API discovery documents."""
+
+  def setUp(self):
+    discovery._documents.clear()
+    self.tmp_dir = tempfile.mkdtemp()
+    self.cache_file = os.path.join(self.tmp_dir, 'drive.json')
+
+  def tearDown(self):
+    discovery._documents.clear()
+    shutil.rmtree(self.tmp_dir)
+
+  def test_01_Document_Cached_In_Process(self):
+    http = FakeHttp()
+    first = LoadDiscoveryDocument(http, 'fakeapi', 'v1')
+    second = LoadDiscoveryDocument(http, 'fakeapi', 'v1')
+    self.assertEqual(first, second)
+    self.assertEqual(len(http.uris), 1)
+
+  def test_02_Document_Written_To_And_Read_From_Cache_File(self):
+    http = FakeHttp()
+    document = LoadDiscoveryDocument(http, 'fakeapi', 'v1',
+                                     cache_file=self.cache_file)
+    with open(self.cache_file) as f:
+      self.assertEqual(f.read(), 'fakeapi v1\n' + document)
+
+    discovery._documents.clear()
+    http = FakeHttp(status=500)
+    self.assertEqual(LoadDiscoveryDocument(http, 'fakeapi', 'v1',
+                                           cache_file=self.cache_file),
+                     document)
+    self.assertEqual(http.uris, [])
+
+  def test_03_Cache_File_Of_Another_Api_Not_Read(self):
+    LoadDiscoveryDocument(FakeHttp(), 'fakeapi', 'v1',
+                          cache_file=self.cache_file)
+    http = FakeHttp(content=b'{"name": "otherapi"}')
+    self.assertEqual(LoadDiscoveryDocument(http, 'otherapi', 'v1',
+                                           cache_file=self.cache_file),
+                     '{"name": "otherapi"}')
+    self.assertEqual(len(http.uris), 1)
+    discovery._documents.clear()
+    http = FakeHttp(status=500)
+    self.assertEqual(LoadDiscoveryDocument(http, 'otherapi', 'v1',
+                                           cache_file=self.cache_file),
+                     '{"name": "otherapi"}')
+
+  def test_04_Failed_Download(self):
+    self.assertRaises(DiscoveryError, LoadDiscoveryDocument,
+                      FakeHttp(status=404), 'fakeapi', 'v1')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
+import os
 import unittest
 
+from concurrent.futures import as_completed
+
 from pydrive.auth import GoogleAuth
 from pydrive.drive import GoogleDrive
+from pydrive.test import test_util
 
 
 class GoogleDriveTest(unittest.TestCase):
@@ -18,6 +22,32 @@ class GoogleDriveTest(unittest.TestCase):
         about_object = drive.GetAbout()
         self.assertTrue(about_object is not None, "About object not loading.")
 
+    def test_02_Submit_Upload_Fetch_Download(self):
+        drive = GoogleDrive(self.ga, max_workers=4)
+        title = test_util.CreateRandomFileName()
+        files = []
+        for i in range(8):
+            file1 = drive.CreateFile({'title': title})
+            file1.SetContentString('content %d' % i)
+            files.append(file1)
+        uploaded = [f.result() for f in
+                    as_completed(drive.SubmitUpload(f) for f in files)]
+        self.assertEqual(len(uploaded), 8)
+
+        fetched = [drive.SubmitFetch(drive.CreateFile({'id': f['id']}))
+                   for f in files]
+        self.assertEqual([f.result()['title'] for f in fetched], [title] * 8)
+
+        filename = title + '.txt'
+        drive.SubmitDownload(files[0], filename).result()
+        with open(filename) as f:
+            self.assertEqual(f.read(), 'content 0')
+        os.remove(filename)
+
+        for f in as_completed(drive.Submit(f.Delete) for f in files):
+            f.result()
+        drive.Shutdown()
+
 
 if __name__ == '__main__':
     unittest.main()
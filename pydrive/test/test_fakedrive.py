@@ -0,0 +1,174 @@
+import io
+import unittest
+
+from apiclient.http import MediaIoBaseUpload
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.files import ApiRequestError
+
+
+class FakeDriveTest(unittest.TestCase):
+  """Tests fakedrive.FakeDrive through GoogleDrive, without network access."""
+
+  def setUp(self):
+    self.fake = FakeDrive()
+    self.gauth = self.fake.Authorize(GoogleAuth())
+    self.gauth.retry_policy.initial_delay = 0
+    self.drive = GoogleDrive(self.gauth)
+
+  def test_01_Upload_Fetch_Download(self):
+    file1 = self.drive.CreateFile({'title': 'a.txt'})
+    file1.SetContentString('hello')
+    file1.Upload()
+    self.assertEqual(file1['fileSize'], '5')
+    file1['title'] = 'b.txt'
+    file1.Upload()  # Files.patch()
+    file1.SetContentString('hello world')
+    file1.Upload()  # Files.update()
+
+    file2 = self.drive.CreateFile({'id': file1['id']})
+    self.assertEqual(file2['title'], 'b.txt')
+    self.assertEqual(file2.GetContentString(), 'hello world')
+
+  def test_02_List_Trash_Delete(self):
+    files = [self.drive.CreateFile({'title': str(i),
+                                    'parents': [{'id': 'folder'}]})
+             for i in range(5)]
+    for file1 in files:
+      file1.Upload()
+    files[0].Trash()
+    query = "'folder' in parents and trashed = false"
+    self.assertEqual(len(self.drive.ListFile({'q': query}).GetList()), 4)
+    pages = list(self.drive.ListFile({'q': query, 'maxResults': 3}))
+    self.assertEqual([len(page) for page in pages], [3, 1])
+    files[0].UnTrash()
+    files[1].Delete()
+    self.assertEqual(len(self.drive.ListFile({'q': query}).GetList()), 4)
+    deleted = self.drive.CreateFile({'id': files[1]['id']})
+    self.assertRaises(ApiRequestError, deleted.FetchMetadata)
+
+  def test_03_Permissions(self):
+    file1 = self.drive.CreateFile()
+    file1.Upload()
+    permission = file1.InsertPermission({'type': 'anyone', 'role': 'reader'})
+    self.assertEqual(len(file1.GetPermissions()), 2)
+    file1.DeletePermission(permission['id'])
+    self.assertEqual(len(file1.GetPermissions()), 1)
+
+  def test_04_Export_With_Bom(self):
+    doc = self.drive.CreateFile(
+        {'mimeType': 'application/vnd.google-apps.document'})
+    doc.Upload()
+    self.fake.contents[doc['id']] = b'text'
+    self.assertEqual(doc.GetContentString(mimetype='text/plain'),
+                     u'\ufefftext')
+    self.assertEqual(doc.GetContentString(mimetype='text/plain',
+                                          remove_bom=True), u'text')
+
+  def test_05_Resumable_Upload_Retried(self):
+    content = b'x' * (2 * 256 * 1024 + 1)
+    self.fake.InjectError(503, method='PUT', path='/upload/')
+    media = MediaIoBaseUpload(io.BytesIO(content), 'text/plain',
+                              chunksize=256 * 1024, resumable=True)
+    metadata = self.gauth.Execute(
+        self.gauth.service.files().insert(body={}, media_body=media),
+        http=self.gauth.Get_Thread_Http_Object())
+    self.assertEqual(self.fake.contents[metadata['id']], content)
+    self.assertEqual(metadata['mimeType'], 'text/plain')
+
+  def test_06_Batch(self):
+    file1 = self.drive.CreateFile({'title': 'batched'})
+    file1.Upload()
+    results = {}
+
+    def Callback(request_id, response, exception):
+      results[request_id] = response or exception.resp.status
+
+    service = self.gauth.service
+    batch = service.new_batch_http_request(callback=Callback)
+    batch.add(service.files().get(fileId=file1['id']), request_id='found')
+    batch.add(service.files().get(fileId='missing'), request_id='missing')
+    batch.execute(http=self.gauth.Get_Thread_Http_Object())
+    self.assertEqual(results['found']['title'], 'batched')
+    self.assertEqual(results['missing'], 404)
+
+  def test_07_Token_Refreshed_After_401(self):
+    file1 = self.drive.CreateFile()
+    file1.Upload()
+    self.fake.RevokeTokens()
+    self.drive.CreateFile({'id': file1['id']}).FetchMetadata()
+    self.assertIn(('POST', '/token'), self.fake.requests)
+
+  def test_08_Rate_Limit(self):
+    now = [0.0]
+    fake = FakeDrive(queries_per_second=2, clock=lambda: now[0])
+    gauth = fake.Authorize(GoogleAuth())
+    gauth.retry_policy.max_retries = 0
+    drive = GoogleDrive(gauth)
+    drive.CreateFile().Upload()
+    drive.CreateFile().Upload()
+    self.assertRaises(ApiRequestError, drive.CreateFile().Upload)
+    now[0] += 0.5
+    drive.CreateFile().Upload()
+
+  def test_09_Random_Errors_Are_Deterministic(self):
+    statuses = []
+    for _ in range(2):
+      fake = FakeDrive(error_rate=0.5, seed=1)
+      token = fake.Credentials().access_token
+      statuses.append([
+          fake.Handle('GET', fake.root_url + 'drive/v2/files',
+                      {'authorization': 'Bearer ' + token})[0]
+          for _ in range(20)])
+    self.assertEqual(statuses[0], statuses[1])
+    self.assertIn(200, statuses[0])
+    self.assertTrue(set(statuses[0]) - set([200]))
+
+  def test_10_Served(self):
+    fake = FakeDrive()
+    fake.Serve()
+    try:
+      drive = GoogleDrive(fake.Authorize(GoogleAuth()))
+      file1 = drive.CreateFile()
+      file1.SetContentString('served')
+      file1.Upload()
+      self.assertTrue(file1['downloadUrl'].startswith(fake.root_url))
+      drive.auth.service = None  # Rebuilt by the next call, still served.
+      file2 = drive.CreateFile({'id': file1['id']})
+      self.assertEqual(file2.GetContentString(), 'served')
+    finally:
+      fake.Shutdown()
+
+  def test_11_Insert_Not_Repeated_After_Lost_Response(self):
+    self.fake.InjectError(503, method='POST', path='/files', after=True)
+    self.assertRaises(ApiRequestError,
+                      self.drive.CreateFile({'title': 'once'}).Upload)
+    self.assertEqual(len(self.fake.files), 1)
+    self.fake.InjectError(403, 'userRateLimitExceeded', method='POST')
+    self.drive.CreateFile({'title': 'twice'}).Upload()
+    self.assertEqual(len(self.fake.files), 2)
+
+  def test_12_Resumable_Upload_Resumed_After_Lost_Response(self):
+    self.fake.InjectError(503, method='PUT', path='/upload/', after=True)
+    file1 = self.drive.CreateFile({'title': 'once'})
+    file1.SetContentString('hello')
+    file1.Upload()
+    self.assertEqual(len(self.fake.files), 1)
+    self.assertEqual(self.fake.contents[file1['id']], b'hello')
+
+  def test_13_Listed_Files_Own_Their_Metadata(self):
+    self.drive.CreateFile({'title': 'a.txt'}).Upload()
+    file_list = self.drive.ListFile()
+    file1, = file_list.GetList()
+    self.assertNotIn('items', file_list.metadata)
+    file1.Trash()
+    file1['title'] = 'b.txt'
+    file1.UpdateMetadata()
+    self.assertEqual(file1.metadata['title'], 'b.txt')
+    self.assertTrue(file1.metadata['labels']['trashed'])
+
+
+if __name__ == '__main__':
+  unittest.main()
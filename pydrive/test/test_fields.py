@@ -0,0 +1,101 @@
+import unittest
+
+from pydrive import files
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.files import FileNotUploadedError
+
+
+class FieldsTest(unittest.TestCase):
+  """Tests loading the metadata of files field by field, against FakeDrive."""
+
+  def setUp(self):
+    self.fake = FakeDrive()
+    self.gauth = self.fake.Authorize(GoogleAuth())
+    self.drive = GoogleDrive(self.gauth)
+    self.resource = self.fake.AddFile(
+        {'title': 'a.txt', 'mimeType': 'text/plain'}, b'hello')
+    self.clock = files._clock
+
+  def tearDown(self):
+    files._clock = self.clock
+
+  def Gets(self):
+    return sum(1 for method, path in self.fake.requests
+               if method == 'GET' and path.startswith('/drive/v2/files/'))
+
+  def test_01_Missing_Field_Fetched_Alone(self):
+    file1 = self.drive.CreateFile({'id': self.resource['id']})
+    self.assertEqual(file1['title'], 'a.txt')
+    self.assertNotIn('mimeType', dict(file1))
+    self.assertEqual(file1['mimeType'], 'text/plain')
+    self.assertEqual(self.Gets(), 2)
+    self.assertEqual(file1.GetChanges(), {})
+
+  def test_02_Fields_Batched(self):
+    file1 = self.drive.CreateFile({'id': self.resource['id']})
+    fields = file1.GetFields('title,fileSize,description')
+    self.assertEqual(fields, {'title': 'a.txt', 'fileSize': '5'})
+    self.assertEqual(self.Gets(), 1)
+
+  def test_03_Absent_Field_Not_Refetched(self):
+    file1 = self.drive.CreateFile({'id': self.resource['id']})
+    for _ in range(3):
+      self.assertRaises(KeyError, lambda: file1['description'])
+    self.assertEqual(self.Gets(), 1)
+    listed = self.drive.ListFile().GetList()[0]
+    self.assertRaises(KeyError, lambda: listed['description'])
+    self.assertEqual(self.Gets(), 1)
+
+  def test_04_Freshness(self):
+    now = [1000.0]
+    files._clock = lambda: now[0]
+    self.gauth.settings = dict(self.gauth.settings, metadata_freshness=60)
+    file1 = self.drive.ListFile().GetList()[0]
+    self.assertRaises(KeyError, lambda: file1['description'])
+    self.assertEqual(self.Gets(), 0)
+    now[0] += 60
+    self.assertRaises(KeyError, lambda: file1['description'])
+    self.assertRaises(KeyError, lambda: file1['description'])
+    self.assertEqual(self.Gets(), 1)
+
+  def test_05_Local_Changes_Kept(self):
+    file1 = self.drive.CreateFile({'id': self.resource['id']})
+    file1['title'] = 'b.txt'
+    self.assertEqual(file1['mimeType'], 'text/plain')
+    self.assertEqual(file1['title'], 'b.txt')
+    file1.Upload()
+    self.assertEqual(self.fake.files[self.resource['id']]['title'], 'b.txt')
+
+  def test_06_Content_Fields(self):
+    file1 = self.drive.CreateFile({'id': self.resource['id']})
+    self.assertEqual(file1.GetContentString(), 'hello')
+    self.assertNotIn('title', dict(file1))
+    self.assertRaises(FileNotUploadedError,
+                      self.drive.CreateFile().GetContentString)
+
+  def test_07_Uploaded_Resource_Loaded(self):
+    file1 = self.drive.CreateFile({'title': 'new.txt'})
+    file1.SetContentString('new')
+    file1.Upload()
+    self.assertRaises(KeyError, lambda: file1['description'])
+    file1['title'] = 'renamed.txt'
+    file1.Upload()
+    self.assertRaises(KeyError, lambda: file1['description'])
+    self.assertEqual(self.Gets(), 0)
+
+  def test_08_Listed_Projection(self):
+    for cached in (False, True):
+      if cached:
+        self.drive.EnableMetadataCache()
+      file_list = self.drive.ListFile({'fields': 'items(id,title)'})
+      file1, = file_list.GetList()
+      self.assertNotIn('mimeType', dict(file1))
+      self.assertEqual(file1['mimeType'], 'text/plain')
+      self.assertEqual(file1.GetContentString(), 'hello')
+      self.assertRaises(KeyError, lambda: file1['description'])
+
+
+if __name__ == '__main__':
+  unittest.main()
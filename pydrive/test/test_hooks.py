@@ -0,0 +1,96 @@
+import io
+import unittest
+
+from apiclient.http import MediaIoBaseUpload
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.hooks import DOWNLOAD_OPERATION
+from pydrive.hooks import EVENTS
+from pydrive.hooks import Hooks
+from pydrive.hooks import REFRESH_OPERATION
+
+
+class HooksTest(unittest.TestCase):
+  """Tests the events fired on hooks, against fakedrive.FakeDrive."""
+
+  def setUp(self):
+    self.fake = FakeDrive()
+    self.gauth = self.fake.Authorize(GoogleAuth())
+    self.gauth.retry_policy.initial_delay = 0
+    self.drive = GoogleDrive(self.gauth)
+    self.events = []
+    for event in EVENTS:
+      self.drive.RegisterHook(event, self.events.append)
+
+  def Events(self, name):
+    return [event for event in self.events if event.name == name]
+
+  def test_01_Empty_Hooks_Are_False(self):
+    hooks = Hooks()
+    self.assertFalse(hooks)
+    hooks.Register('on_retry', len)
+    self.assertTrue(hooks)
+    hooks.Unregister('on_retry', len)
+    self.assertFalse(hooks)
+    self.assertRaises(ValueError, hooks.Register, 'on_nothing', len)
+
+  def test_02_Request_And_Response(self):
+    file1 = self.drive.CreateFile({'title': 'a.txt'})
+    file1.Upload()
+    self.drive.CreateFile({'id': file1['id']}).FetchMetadata()
+    self.drive.ListFile().GetList()
+    operations = [event.operation for event in self.Events('after_response')]
+    self.assertEqual(operations, ['files.insert', 'files.get', 'files.list'])
+    get = self.Events('after_response')[1]
+    self.assertEqual(get.file_id, file1['id'])
+    self.assertEqual(get.method, 'GET')
+    self.assertEqual(get.status, 200)
+    self.assertGreater(get.bytes, 0)
+    self.assertGreaterEqual(get.duration, 0)
+    self.assertEqual(len(self.Events('before_request')), 3)
+
+  def test_03_Download_Chunk(self):
+    file1 = self.drive.CreateFile()
+    file1.SetContentString('hello')
+    file1.Upload()
+    del self.events[:]
+    self.drive.CreateFile({'id': file1['id']}).GetContentString()
+    chunk, = self.Events('on_download_chunk')
+    self.assertEqual(chunk.operation, DOWNLOAD_OPERATION)
+    self.assertEqual(chunk.file_id, file1['id'])
+    self.assertEqual(chunk.bytes, 5)
+
+  def test_04_Upload_Chunks_And_Retry(self):
+    size = 256 * 1024
+    self.fake.InjectError(503, method='PUT', path='/upload/')
+    media = MediaIoBaseUpload(io.BytesIO(b'x' * (2 * size + 1)), 'text/plain',
+                              chunksize=size, resumable=True)
+    self.gauth.Execute(
+        self.gauth.service.files().insert(body={}, media_body=media),
+        http=self.gauth.Get_Thread_Http_Object())
+    chunks = [event.bytes for event in self.Events('on_upload_chunk')]
+    self.assertEqual(chunks, [size, size, size, 1])
+    retry, = self.Events('on_retry')
+    self.assertEqual(retry.operation, 'files.insert')
+    self.assertEqual(retry.status, 503)
+    self.assertEqual(retry.attempt, 2)
+
+  def test_05_Refresh(self):
+    self.gauth.Refresh()
+    refresh, = self.Events('on_refresh')
+    self.assertEqual(refresh.operation, REFRESH_OPERATION)
+    self.assertIsNone(refresh.error)
+    self.assertGreaterEqual(refresh.duration, 0)
+
+  def test_06_Unregister(self):
+    for event in EVENTS:
+      self.drive.UnregisterHook(event, self.events.append)
+    self.assertFalse(self.gauth.hooks)
+    self.drive.CreateFile().Upload()
+    self.assertEqual(self.events, [])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Modules which must only be imported once they are actually needed.
+HEAVY_MODULES = ['apiclient', 'googleapiclient', 'httplib2', 'oauth2client',
+                 'webbrowser', 'yaml']
+# Upper bound for the time importing pydrive.drive may add to interpreter
+# startup, in seconds. Importing the heavy modules eagerly takes several times
+# as long.
+IMPORT_TIME_BUDGET = 0.1
+RUNS = 5
+
+
+def RunPython(code):
+  """Runs code in a fresh interpreter which finds the same pydrive package."""
+  env = dict(os.environ)
+  env['PYTHONPATH'] = os.pathsep.join(sys.path)
+  return subprocess.check_output([sys.executable, '-c', code],
+                                 env=env).decode('utf-8')
+
+
+def MeasureImportTime(statement):
+  """Returns the best wall time of running the statement in a fresh process."""
+  code = ('import time\n'
+          'start = time.time()\n'
+          '%s\n'
+          'print(time.time() - start)' % statement)
+  return min(float(RunPython(code)) for _ in range(RUNS))
+
+
+class ImportTimeTest(unittest.TestCase):
+  """Guards the time it takes to import pydrive against regressions."""
+
+  def test_01_No_Heavy_Modules_Imported(self):
+    code = ('import sys\n'
+            'import pydrive.drive\n'
+            'print(" ".join(m for m in %r if m in sys.modules))'
+            % HEAVY_MODULES)
+    self.assertEqual(RunPython(code).strip(), '')
+
+  def test_02_Import_Time(self):
+    import_time = MeasureImportTime('import pydrive.drive')
+    self.assertTrue(import_time < IMPORT_TIME_BUDGET,
+                    'Importing pydrive.drive took %.3fs' % import_time)
+
+
+if __name__ == '__main__':
+  unittest.main()
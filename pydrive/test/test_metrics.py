@@ -0,0 +1,74 @@
+import unittest
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.metrics import Metrics
+
+
+class MetricsTest(unittest.TestCase):
+  """Tests metrics.Metrics, against fakedrive.FakeDrive."""
+
+  def setUp(self):
+    self.fake = FakeDrive()
+    self.gauth = self.fake.Authorize(GoogleAuth())
+    self.gauth.retry_policy.initial_delay = 0
+    self.drive = GoogleDrive(self.gauth)
+
+  def test_01_Disabled(self):
+    self.assertEqual(self.gauth.ExportMetrics(), '')
+    self.assertFalse(self.gauth.hooks)
+
+  def test_02_Requests(self):
+    metrics = self.gauth.EnableMetrics()
+    file1 = self.drive.CreateFile()
+    file1.SetContentString('hello')
+    file1.Upload()
+    self.fake.InjectError(503, method='GET')
+    self.drive.CreateFile({'id': file1['id']}).GetContentString()
+    self.gauth.Refresh()
+    text = self.gauth.ExportMetrics()
+    self.assertIn('# TYPE pydrive_requests_total counter', text)
+    self.assertIn('pydrive_requests_total{operation="files.get",'
+                  'method="GET",status="503"} 1', text)
+    self.assertIn('pydrive_requests_total{operation="files.get",'
+                  'method="GET",status="200"} 1', text)
+    self.assertIn('pydrive_retries_total{operation="files.get",'
+                  'status="503"} 1', text)
+    self.assertIn('pydrive_received_bytes_total{operation="media.download"} 5',
+                  text)
+    # Resumable uploads are a POST of the metadata and a PUT of the content.
+    self.assertIn('pydrive_request_duration_seconds_count'
+                  '{operation="files.insert"} 2', text)
+    self.assertIn('pydrive_request_duration_seconds_bucket'
+                  '{operation="files.insert",le="+Inf"} 2', text)
+    self.assertIn('pydrive_token_refreshes_total{result="success"} 1', text)
+    self.assertIn('pydrive_requests_in_flight 0', text)
+    self.assertGreater(metrics.sent_bytes.values[('files.insert',)], 0)
+
+  def test_03_Histogram_And_Cache_Lookups(self):
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.latency.Observe(0.05, ('files.get',))
+    metrics.latency.Observe(0.5, ('files.get',))
+    metrics.latency.Observe(5, ('files.get',))
+    metrics.RecordCacheLookup('metadata', True)
+    metrics.RecordCacheLookup('metadata', False)
+    text = metrics.Export()
+    for line in ['le="0.1"} 1', 'le="1"} 2', 'le="+Inf"} 3']:
+      self.assertIn('pydrive_request_duration_seconds_bucket'
+                    '{operation="files.get",' + line, text)
+    self.assertIn('pydrive_request_duration_seconds_sum'
+                  '{operation="files.get"} 5.55', text)
+    self.assertIn('pydrive_cache_lookups_total{cache="metadata",'
+                  'result="hit"} 1', text)
+
+  def test_04_Reinstall(self):
+    self.gauth.EnableMetrics()
+    metrics = self.gauth.EnableMetrics()
+    self.drive.CreateFile().Upload()
+    self.assertEqual(
+        metrics.requests.values[('files.insert', 'POST', '200')], 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
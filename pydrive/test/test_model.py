@@ -0,0 +1,99 @@
+import json
+import unittest
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.model import DriveJsonModel
+from pydrive.model import ListParser
+from pydrive.model import LoadDecoder
+
+
+class DriveJsonModelTest(unittest.TestCase):
+  """Tests model.DriveJsonModel and decoding responses with it."""
+
+  def test_01_Load_Decoder(self):
+    self.assertIs(LoadDecoder('json'), json.loads)
+    self.assertIsNotNone(LoadDecoder())
+    self.assertIs(LoadDecoder(len), len)
+    self.assertRaises(ValueError, LoadDecoder, 'simplejson')
+
+  def test_02_Deserialize(self):
+    model = DriveJsonModel('json')
+    self.assertEqual(model.deserialize(b'{"id": "a"}'), {'id': 'a'})
+    self.assertEqual(model.deserialize(b'not json'), 'not json')
+    model = DriveJsonModel('json', data_wrapper=True)
+    self.assertEqual(model.deserialize(b'{"data": {"id": "a"}}'), {'id': 'a'})
+
+  def test_03_Decoders_Give_Same_Files(self):
+    fake = FakeDrive()
+    for i in range(5):
+      fake.AddFile({'title': u'file%d é' % i})
+    listings = []
+    for decoder in ('json', 'auto', json.loads):
+      gauth = GoogleAuth()
+      gauth.json_decoder = decoder
+      drive = GoogleDrive(fake.Authorize(gauth))
+      files = drive.ListFile().GetList()
+      listings.append([(f['id'], f['title']) for f in files])
+      file1 = drive.CreateFile({'id': files[0]['id']})
+      self.assertEqual(file1['title'], u'file0 é')
+      file1['title'] = u'renamed é'
+      file1.Upload()
+      self.assertEqual(file1.metadata['title'], u'renamed é')
+      file1['title'] = u'file0 é'
+      file1.Upload()
+    self.assertEqual(listings[0], listings[1])
+    self.assertEqual(listings[0], listings[2])
+
+
+  def test_04_ListParser_Any_Block_Size(self):
+    page = {'kind': 'drive#fileList', 'nextPageToken': 'token', 'count': 123,
+            'items': [{'id': str(i), 'title': u'\u00e9 "]}' * i,
+                       'labels': {'starred': i % 2 == 0}, 'size': 1.5}
+                      for i in range(20)]}
+    content = json.dumps(page, ensure_ascii=False).encode('utf-8')
+    for block_size in (1, 3, 64, len(content)):
+      parser = ListParser()
+      self.assertEqual(list(parser.Parse(content, block_size)), page['items'])
+      self.assertEqual(parser.envelope, {'kind': 'drive#fileList',
+                                         'nextPageToken': 'token',
+                                         'count': 123})
+
+  def test_05_ListParser_Numbers_Split(self):
+    for text in ('{"etag": -25000000000.0, "items": [1, 2.5e-3, -0, 10]}',
+                 '{"items": [12345, 6.75E+2], "count": 1e5}'):
+      content = text.encode('utf-8')
+      envelope = json.loads(text)
+      items = envelope.pop('items')
+      for block_size in (1, 2, 3, 5, len(content)):
+        parser = ListParser()
+        self.assertEqual(list(parser.Parse(content, block_size)), items)
+        self.assertEqual(parser.envelope, envelope)
+
+  def test_06_ListParser_Items_As_Completed(self):
+    parser = ListParser()
+    self.assertEqual(parser.Feed(b'{"items": [{"id": "a"}, {"id"'),
+                     [{'id': 'a'}])
+    self.assertEqual(parser.Feed(b': "b"}]}'), [{'id': 'b'}])
+    self.assertEqual(parser.Close(), [])
+    for content in (b'{"items": [{}', b'[]', b'{"items": []} {}'):
+      self.assertRaises(ValueError, list, ListParser().Parse(content))
+
+  def test_07_IterList(self):
+    fake = FakeDrive()
+    for i in range(25):
+      fake.AddFile({'title': 'file%d' % i})
+    drive = GoogleDrive(fake.Authorize(GoogleAuth()))
+    file_list = drive.ListFile({'maxResults': 10})
+    files = list(file_list.IterList())
+    self.assertEqual([f['id'] for f in files],
+                     [f['id'] for f in drive.ListFile().GetList()])
+    self.assertTrue(files[0].uploaded)
+    self.assertEqual(files[0].GetChanges(), {})
+    self.assertIsNone(file_list['pageToken'])
+    self.assertEqual(file_list['maxResults'], 10)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,8 +1,48 @@
+import datetime
+import threading
 import unittest
 import os
 import time
 
 from pydrive.auth import GoogleAuth
+from pydrive.auth import LoadAuth
+
+
+class FakeCredentials(object):
+  """Credentials whose token expires at token_expiry."""
+  refresh_token = 'refresh_token'
+
+  def __init__(self, expires_in):
+    self.token_expiry = self.Expiry(expires_in)
+    self.refreshes = 0
+
+  @staticmethod
+  def Expiry(expires_in):
+    return datetime.datetime.utcnow() + datetime.timedelta(seconds=expires_in)
+
+  @property
+  def access_token_expired(self):
+    return self.token_expiry <= datetime.datetime.utcnow()
+
+  def refresh(self, http):
+    time.sleep(0.1)
+    self.refreshes += 1
+    self.token_expiry = self.Expiry(3600)
+
+  def authorize(self, http):
+    return http
+
+
+class FakeApi(object):
+  """Object with a LoadAuth decorated method."""
+
+  def __init__(self, auth):
+    self.auth = auth
+    self.http = None
+
+  @LoadAuth
+  def Call(self):
+    return self.auth.credentials.access_token_expired
 
 class GoogleAuthTest(unittest.TestCase):
   """Tests basic OAuth2 operations of auth.GoogleAuth."""
@@ -58,6 +98,34 @@ class GoogleAuthTest(unittest.TestCase):
     self.assertEqual(ga.access_token_expired, False)
     time.sleep(1)
 
+  def test_06_ExpiredTokenRefreshedOnce(self):
+    ga = GoogleAuth('settings/default.yaml')
+    ga.credentials = FakeCredentials(-1)
+    ga.service = object()
+    ga.LocalWebserverAuth = lambda: ga.credentials.refresh(None)
+    expired = []
+    threads = [threading.Thread(target=lambda: expired.append(
+        FakeApi(ga).Call())) for _ in range(10)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(ga.credentials.refreshes, 1)
+    self.assertEqual(expired, [False] * 10)
+
+  def test_07_ExpiringTokenRefreshedInBackground(self):
+    ga = GoogleAuth('settings/default.yaml')
+    ga.settings['token_refresh_margin'] = 60
+    ga.settings['save_credentials'] = False
+    ga.credentials = FakeCredentials(30)
+    ga.service = object()
+    self.assertTrue(ga.access_token_expiring)
+    FakeApi(ga).Call()
+    FakeApi(ga).Call()
+    with ga.refresh_lock:  # Wait for the background refresh.
+      self.assertEqual(ga.credentials.refreshes, 1)
+    self.assertFalse(ga.access_token_expiring)
+
   def DeleteOldCredentialsFile(self, credentials):
     try:
       os.remove(credentials)
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pydrive.ratelimit import FileTokenBucket
+from pydrive.ratelimit import RateLimiter
+from pydrive.ratelimit import TokenBucket
+
+
+class RateLimitTest(unittest.TestCase):
+  """Tests ratelimit.TokenBucket and ratelimit.RateLimiter."""
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def AssertDuration(self, function, minimum, maximum):
+    start = time.time()
+    function()
+    duration = time.time() - start
+    self.assertTrue(minimum <= duration <= maximum,
+                    'Took %.3fs, expected %.3fs to %.3fs'
+                    % (duration, minimum, maximum))
+
+  def test_01_Burst_Then_Rate(self):
+    bucket = TokenBucket(rate=20, capacity=5)
+    self.AssertDuration(lambda: [bucket.Consume() for _ in range(5)], 0, 0.05)
+    self.AssertDuration(lambda: [bucket.Consume() for _ in range(4)],
+                        0.15, 0.3)
+
+  def test_02_Debt(self):
+    bucket = TokenBucket(rate=100)
+    self.AssertDuration(lambda: bucket.Consume(110), 0.05, 0.2)
+    self.assertTrue(bucket.tokens < 0)
+
+  def test_03_Shared_File(self):
+    path = os.path.join(self.tmp_dir, 'bucket')
+    first = FileTokenBucket(path, rate=20, capacity=2)
+    second = FileTokenBucket(path, rate=20, capacity=2)
+    self.AssertDuration(lambda: (first.Consume(), second.Consume()), 0, 0.05)
+    self.AssertDuration(lambda: (first.Consume(), second.Consume()),
+                        0.05, 0.2)
+
+  def test_04_Writes_And_Bytes(self):
+    limiter = RateLimiter(writes_per_second=20, bytes_per_second=1000)
+    self.assertEqual(limiter.queries, None)
+    self.AssertDuration(lambda: [limiter.AcquireRequest('GET')
+                                 for _ in range(100)], 0, 0.05)
+    self.AssertDuration(lambda: [limiter.AcquireRequest('POST')
+                                 for _ in range(22)], 0.05, 0.2)
+    self.AssertDuration(lambda: limiter.AcquireBytes(1100), 0.05, 0.2)
+
+
+if __name__ == '__main__':
+  unittest.main()
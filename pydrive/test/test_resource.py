@@ -0,0 +1,130 @@
+import sys
+import threading
+import unittest
+
+from pydrive.apiattr import ApiResource
+from pydrive.files import GoogleDriveFile
+
+
+def _Resource():
+  return {'id': 'abc', 'title': 'a.txt', 'labels': {'starred': False},
+          'owners': [{'displayName': 'Ann'}], 'exportLinks': {}}
+
+
+class ApiResourceTest(unittest.TestCase):
+  """Tests the change tracking of apiattr.ApiResource, offline."""
+
+  def setUp(self):
+    self.file1 = GoogleDriveFile(metadata=_Resource(), uploaded=True)
+
+  def test_01_No_Changes(self):
+    self.assertEqual(self.file1.GetChanges(), {})
+    self.file1['title'] = 'a.txt'  # Same value.
+    self.assertEqual(self.file1.GetChanges(), {})
+
+  def test_02_Set_Keys(self):
+    self.file1['title'] = 'b.txt'
+    self.file1.update({'description': 'new'})
+    self.file1.setdefault('mimeType', 'text/plain')
+    self.assertEqual(self.file1.GetChanges(),
+                     {'title': 'b.txt', 'description': 'new',
+                      'mimeType': 'text/plain'})
+    self.file1.UpdateMetadata()
+    self.assertEqual(self.file1.GetChanges(), {})
+    self.assertEqual(self.file1.metadata['title'], 'b.txt')
+
+  def test_03_Nested_Changes(self):
+    self.file1['labels']['starred'] = True
+    self.file1.get('owners').append({'displayName': 'Bob'})
+    changes = self.file1.GetChanges()
+    self.assertEqual(changes['labels'], {'starred': True})
+    self.assertEqual(len(changes['owners']), 2)
+    self.assertEqual(self.file1.metadata['labels'], {'starred': False})
+    self.assertNotIn('exportLinks', changes)
+
+  def test_04_Nested_Read_Is_No_Change(self):
+    self.assertEqual(self.file1['labels']['starred'], False)
+    self.assertEqual(self.file1.GetChanges(), {})
+
+  def test_05_Deleted_Keys_Leave_Snapshot(self):
+    del self.file1['title']
+    self.file1.pop('labels')
+    self.file1.UpdateMetadata()
+    self.assertNotIn('title', self.file1.metadata)
+    self.assertNotIn('labels', self.file1.metadata)
+    self.assertEqual(dict(self.file1.metadata), dict(self.file1))
+
+  def test_06_UpdateMetadata_From_Response(self):
+    self.file1['labels']['starred'] = True
+    response = _Resource()
+    response['labels'] = {'starred': True}
+    response['version'] = '2'
+    self.file1.UpdateMetadata(response)
+    self.assertEqual(self.file1.GetChanges(), {})
+    self.assertEqual(dict(self.file1.metadata), dict(self.file1))
+    self.file1['labels']['starred'] = False
+    self.assertEqual(self.file1.GetChanges(), {'labels': {'starred': False}})
+
+  def test_07_Not_Uploaded(self):
+    file1 = GoogleDriveFile(metadata={'title': 'new'})
+    self.assertEqual(file1.GetChanges(), {'title': 'new'})
+
+  def test_08_Plain_Resource(self):
+    resource = ApiResource(_Resource())
+    self.assertEqual(resource.GetChanges(), {})
+    resource['owners'][0]['displayName'] = 'Bob'
+    self.assertEqual(resource.GetChanges(),
+                     {'owners': [{'displayName': 'Bob'}]})
+
+  def test_09_From_Resource(self):
+    file1 = GoogleDriveFile._FromResource(_Resource(), auth=None)
+    self.assertEqual(dict(file1), dict(self.file1))
+    self.assertEqual(file1.metadata, self.file1.metadata)
+    self.assertTrue(file1.uploaded)
+    self.assertEqual(file1.GetChanges(), {})
+    file1['labels']['starred'] = True
+    file1['title'] = 'b.txt'
+    self.assertEqual(file1.GetChanges(),
+                     {'labels': {'starred': True}, 'title': 'b.txt'})
+
+  def test_10_Other_Dict_Changes(self):
+    self.file1.popitem()
+    self.file1.UpdateMetadata()
+    self.assertEqual(dict(self.file1.metadata), dict(self.file1))
+    self.file1.clear()
+    self.file1.UpdateMetadata()
+    self.assertEqual(self.file1.metadata, {})
+    self.file1 |= {'title': 'c.txt'}
+    self.assertIsInstance(self.file1, GoogleDriveFile)
+    self.assertEqual(self.file1.GetChanges(), {'title': 'c.txt'})
+
+  def test_11_Concurrent_Reads(self):
+    interval = getattr(sys, 'getswitchinterval', lambda: None)()
+    if interval is not None:
+      sys.setswitchinterval(1e-6)
+    try:
+      for _ in range(50):
+        file1 = GoogleDriveFile(metadata=_Resource(), uploaded=True)
+        start = threading.Event()
+        values = []
+
+        def Read():
+          start.wait()
+          values.append(file1['owners'])
+          file1.GetChanges()
+        threads = [threading.Thread(target=Read) for _ in range(8)]
+        for thread in threads:
+          thread.start()
+        start.set()
+        for thread in threads:
+          thread.join()
+        self.assertEqual(len(set(map(id, values))), 1)
+        values[0].append({'displayName': 'Bob'})
+        self.assertEqual(len(file1.GetChanges()['owners']), 2)
+    finally:
+      if interval is not None:
+        sys.setswitchinterval(interval)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,115 @@
+import errno
+import json
+import socket
+import unittest
+
+from apiclient.errors import HttpError
+from httplib2 import Response
+
+from pydrive.retry import IsRetryableResponse
+from pydrive.retry import RetryBudget
+from pydrive.retry import RetryPolicy
+
+
+def MakeHttpError(status, reason=None, headers=None):
+  resp = Response(dict(headers or {}, status=status))
+  content = json.dumps({'error': {'errors': [{'reason': reason}]}})
+  return HttpError(resp, content.encode('utf-8'))
+
+
+class FailingCall(object):
+  """Callable raising the given errors before it succeeds."""
+
+  def __init__(self, *errors):
+    self.errors = list(errors)
+    self.calls = 0
+
+  def __call__(self):
+    self.calls += 1
+    if self.errors:
+      raise self.errors.pop(0)
+    return 'result'
+
+
+class RetryPolicyTest(unittest.TestCase):
+  """Tests retry.RetryPolicy and retry.RetryBudget."""
+
+  def test_01_Retryable_Responses(self):
+    self.assertTrue(IsRetryableResponse(Response({'status': 503}), b''))
+    self.assertTrue(IsRetryableResponse(Response({'status': 429}), b''))
+    self.assertTrue(RetryPolicy().IsRetryable(
+        MakeHttpError(403, 'userRateLimitExceeded')))
+    self.assertFalse(RetryPolicy().IsRetryable(
+        MakeHttpError(403, 'insufficientPermissions')))
+    self.assertFalse(RetryPolicy().IsRetryable(MakeHttpError(404)))
+    self.assertTrue(RetryPolicy().IsRetryable(socket.timeout()))
+    self.assertFalse(RetryPolicy().IsRetryable(ValueError()))
+
+  def test_02_Retries_Until_Success(self):
+    call = FailingCall(MakeHttpError(503), MakeHttpError(429))
+    self.assertEqual(RetryPolicy(initial_delay=0).Call(call), 'result')
+    self.assertEqual(call.calls, 3)
+
+  def test_03_Gives_Up_After_Max_Retries(self):
+    call = FailingCall(*[MakeHttpError(500)] * 3)
+    policy = RetryPolicy(max_retries=2, initial_delay=0)
+    self.assertRaises(HttpError, policy.Call, call)
+    self.assertEqual(call.calls, 3)
+
+  def test_04_Does_Not_Retry_Permanent_Errors(self):
+    call = FailingCall(MakeHttpError(404))
+    self.assertRaises(HttpError, RetryPolicy(initial_delay=0).Call, call)
+    self.assertEqual(call.calls, 1)
+
+  def test_05_Budget_Shared_Between_Calls(self):
+    budget = RetryBudget(max_tokens=1, token_ratio=0.5)
+    policy = RetryPolicy(initial_delay=0, budget=budget)
+    self.assertEqual(policy.Call(FailingCall(MakeHttpError(503))), 'result')
+    call = FailingCall(MakeHttpError(503))
+    self.assertRaises(HttpError, policy.Call, call)
+    self.assertEqual(call.calls, 1)
+
+  def test_06_Non_Idempotent_Requests(self):
+    policy = RetryPolicy()
+    uri = 'https://www.googleapis.com/drive/v2/files'
+    self.assertFalse(policy.IsRetryable(MakeHttpError(503), 'POST', uri))
+    self.assertFalse(policy.IsRetryable(socket.timeout(), 'POST', uri))
+    self.assertTrue(policy.IsRetryable(MakeHttpError(429), 'POST', uri))
+    self.assertTrue(policy.IsRetryable(
+        MakeHttpError(403, 'rateLimitExceeded'), 'POST', uri))
+    self.assertTrue(policy.IsRetryable(
+        socket.error(errno.ECONNREFUSED, 'refused'), 'POST', uri))
+    self.assertTrue(policy.IsRetryable(MakeHttpError(503), 'PUT', uri))
+    self.assertTrue(policy.IsRetryable(MakeHttpError(503), 'POST',
+                                       uri + '/abc/trash'))
+    call = FailingCall(MakeHttpError(503))
+    self.assertRaises(HttpError, RetryPolicy(initial_delay=0).CallRequest,
+                      'POST', uri, call)
+    self.assertEqual(call.calls, 1)
+
+  def test_07_Delay(self):
+    policy = RetryPolicy(initial_delay=1, max_delay=4)
+    for retry_number in range(5):
+      delay = policy.GetDelay(retry_number)
+      self.assertTrue(0 <= delay <= min(4, 2 ** retry_number))
+    error = MakeHttpError(429, headers={'retry-after': '3'})
+    self.assertEqual(policy.GetDelay(0, error), 3)
+    error = MakeHttpError(429, headers={'retry-after': '7'})
+    self.assertEqual(policy.GetDelay(0, error), 4)
+    for value in ('-5', 'nan', 'inf', 'soon',
+                  'Wed, 21 Oct 2015 07:28:00 GMT'):
+      error = MakeHttpError(429, headers={'retry-after': value})
+      self.assertTrue(0 <= policy.GetDelay(0, error) <= 1)
+      self.assertTrue(policy.IsRetryable(error))
+
+  def test_08_Long_Retry_After_Not_Retried(self):
+    policy = RetryPolicy(initial_delay=0, max_delay=4)
+    call = FailingCall(MakeHttpError(503, headers={'retry-after': '3600'}))
+    self.assertRaises(HttpError, policy.Call, call)
+    self.assertEqual(call.calls, 1)
+    call = FailingCall(MakeHttpError(503, headers={'retry-after': '0'}))
+    self.assertEqual(policy.Call(call), 'result')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,139 @@
+import threading
+import unittest
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.files import ApiRequestError
+from pydrive.singleflight import SingleFlight
+
+
+def RunThreads(count, target):
+  """Runs target in count threads started together, and joins them."""
+  start = threading.Event()
+
+  def Run():
+    start.wait()
+    target()
+
+  threads = [threading.Thread(target=Run) for _ in range(count)]
+  for thread in threads:
+    thread.start()
+  start.set()
+  for thread in threads:
+    thread.join()
+
+
+class SingleFlightTest(unittest.TestCase):
+  """Tests singleflight.SingleFlight."""
+
+  def test_01_Concurrent_Calls_Shared(self):
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def Call():
+      calls.append(1)
+      release.wait()
+      return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        single_flight.Do('key', Call))) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    while single_flight.shared < 3:
+      threading.Event().wait(0.001)
+    release.set()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(calls), 1)
+    self.assertEqual(len(set(map(id, results))), 1)
+    self.assertEqual(single_flight.Do('key', lambda: 'again'), 'again')
+
+  def test_02_Errors_Shared(self):
+    single_flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def Call():
+      release.wait()
+      raise ValueError('failed')
+
+    def Run():
+      try:
+        single_flight.Do('key', Call)
+      except ValueError as error:
+        errors.append(error)
+
+    threads = [threading.Thread(target=Run) for _ in range(3)]
+    for thread in threads:
+      thread.start()
+    while single_flight.shared < 2:
+      threading.Event().wait(0.001)
+    release.set()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(errors), 3)
+    self.assertEqual(len(set(map(id, errors))), 1)
+
+
+class RequestCoalescingTest(unittest.TestCase):
+  """Tests GoogleDrive.EnableRequestCoalescing(), against FakeDrive."""
+
+  def setUp(self):
+    self.fake = FakeDrive(latency=0.2)
+    self.resource = self.fake.AddFile(
+        {'title': 'a.txt', 'mimeType': 'text/plain'}, b'hello')
+    self.drive = GoogleDrive(self.fake.Authorize(GoogleAuth()))
+    self.single_flight = self.drive.EnableRequestCoalescing()
+
+  def Requests(self, method, prefix):
+    return sum(1 for request in self.fake.requests
+               if request[0] == method and request[1].startswith(prefix))
+
+  def test_01_Metadata(self):
+    files = [self.drive.CreateFile({'id': self.resource['id']})
+             for _ in range(4)]
+    queue = list(files)
+    RunThreads(4, lambda: queue.pop().FetchMetadata())
+    self.assertEqual(self.Requests('GET', '/drive/v2/files/'), 1)
+    self.assertEqual(self.single_flight.shared, 3)
+    for file1 in files:
+      self.assertEqual(file1['title'], 'a.txt')
+      self.assertEqual(file1.GetChanges(), {})
+    files[0]['title'] = 'b.txt'
+    self.assertEqual(files[1]['title'], 'a.txt')
+    files[0].Trash()
+    self.assertFalse(files[1].metadata['labels']['trashed'])
+    self.assertFalse(files[1]['labels']['trashed'])
+
+  def test_02_Content(self):
+    files = self.drive.ListFile().GetList() + self.drive.ListFile().GetList()
+    contents = []
+    queue = list(files)
+    RunThreads(2, lambda: contents.append(queue.pop().GetContentString()))
+    self.assertEqual(contents, ['hello', 'hello'])
+    self.assertEqual(self.Requests('GET', '/drive/v2/files/'), 1)
+
+  def test_03_Errors(self):
+    self.fake.InjectError(404, 'notFound', method='GET')
+    files = [self.drive.CreateFile({'id': self.resource['id']})
+             for _ in range(3)]
+    errors = []
+
+    def Fetch(file1):
+      try:
+        file1.FetchMetadata()
+      except ApiRequestError as error:
+        errors.append(error)
+
+    queue = list(files)
+    RunThreads(3, lambda: Fetch(queue.pop()))
+    self.assertEqual(len(errors), 3)
+    files[0].FetchMetadata()
+    self.assertEqual(files[0]['title'], 'a.txt')
+
+
+if __name__ == '__main__':
+  unittest.main()
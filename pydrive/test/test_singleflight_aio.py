@@ -0,0 +1,37 @@
+import asyncio
+import unittest
+
+from pydrive.singleflight import SingleFlight
+
+
+class SingleFlightAsyncTest(unittest.TestCase):
+  """Tests singleflight.SingleFlight.DoAsync(), needing Python 3.6."""
+
+  def test_01_Coroutines_Shared(self):
+    single_flight = SingleFlight()
+    calls = []
+
+    async def Call(value):
+      calls.append(value)
+      await asyncio.sleep(0.01)
+      return value
+
+    async def Main():
+      first = await asyncio.gather(
+          *[single_flight.DoAsync('key', Call, i) for i in range(5)])
+      second = await single_flight.DoAsync('key', Call, 5)
+      return first, second
+
+    loop = asyncio.new_event_loop()
+    try:
+      first, second = loop.run_until_complete(Main())
+    finally:
+      loop.close()
+    self.assertEqual(first, [0] * 5)
+    self.assertEqual(second, 5)
+    self.assertEqual(calls, [0, 5])
+    self.assertEqual(single_flight.shared, 4)
+
+
+if __name__ == '__main__':
+  unittest.main()
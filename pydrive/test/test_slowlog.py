@@ -0,0 +1,100 @@
+import logging
+import unittest
+
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+from pydrive.fakedrive import FakeDrive
+from pydrive.slowlog import _SanitizeParams
+
+
+class RecordingHandler(logging.Handler):
+  """Keeps the records it handles."""
+
+  def __init__(self):
+    logging.Handler.__init__(self)
+    self.records = []
+
+  def emit(self, record):
+    self.records.append(record)
+
+
+class SlowCallLogTest(unittest.TestCase):
+  """Tests slowlog.SlowCallLog, against fakedrive.FakeDrive."""
+
+  def setUp(self):
+    self.fake = FakeDrive()
+    self.gauth = self.fake.Authorize(GoogleAuth())
+    self.drive = GoogleDrive(self.gauth)
+    self.handler = RecordingHandler()
+    self.logger = logging.getLogger('pydrive.test.slowlog')
+    self.logger.addHandler(self.handler)
+    self.logger.setLevel(logging.INFO)
+
+  def tearDown(self):
+    self.logger.removeHandler(self.handler)
+
+  def test_01_Slow_Calls_Logged(self):
+    self.gauth.EnableSlowCallLog(threshold=0, logger=self.logger)
+    file1 = self.drive.CreateFile({'title': 'a'})
+    file1.Upload(param={'ocr': True})
+    self.drive.ListFile({'q': "title = 'a'"}).GetList()
+    self.assertEqual(len(self.handler.records), 2)
+    call = self.handler.records[1].args[0]
+    self.assertEqual(call.operation, 'GoogleDriveFileList._GetList')
+    self.assertEqual(call.params['q'], "title = 'a'")
+    self.assertGreater(call.bytes, 0)
+    self.assertGreater(call.request, 0)
+    self.assertGreater(call.parse, 0)
+    self.assertAlmostEqual(call.auth + call.parse + call.request +
+                           call.wait + call.construction, call.total, places=6)
+    self.assertIn('_GetList', str(call))
+    upload = self.handler.records[0].args[0]
+    self.assertEqual(upload.operation, 'GoogleDriveFile._FilesInsert')
+    self.assertEqual(upload.params['body'], '<dict>')
+    self.assertEqual(upload.params['ocr'], True)
+    self.assertEqual(_SanitizeParams({'pageToken': 'secret', 'q': 'x' * 200}),
+                     {'pageToken': '<redacted>', 'q': 'x' * 100 + '...'})
+
+  def test_02_Fast_Calls_Not_Logged(self):
+    self.gauth.EnableSlowCallLog(threshold=60, logger=self.logger)
+    file1 = self.drive.CreateFile({'title': 'a'})
+    file1.Upload()
+    self.drive.CreateFile({'id': file1['id']}).FetchMetadata()
+    self.assertEqual(self.handler.records, [])
+
+  def test_03_Nested_Call_Counted_Once(self):
+    self.gauth.EnableSlowCallLog(threshold=0, logger=self.logger)
+    file1 = self.drive.CreateFile()
+    file1.SetContentString('hello')
+    file1.Upload()
+    del self.handler.records[:]
+    file2 = self.drive.CreateFile({'id': file1['id']})
+    file2.GetContentString()  # FetchMetadata() calls _DownloadFromUrl().
+    call = self.handler.records[-1].args[0]
+    self.assertEqual(call.file_id, file1['id'])
+    self.assertGreaterEqual(call.bytes, 5)
+
+  def test_04_Retry_Wait_Not_Counted_As_Parse(self):
+    self.gauth.EnableSlowCallLog(threshold=0, logger=self.logger)
+    self.gauth.retry_policy.GetDelay = lambda retry_number, error=None: 0.2
+    self.fake.InjectError(503, method='GET')
+    self.drive.ListFile().GetList()
+    call = self.handler.records[-1].args[0]
+    self.assertGreaterEqual(call.wait, 0.2)
+    self.assertLess(call.parse, 0.1)
+
+  def test_05_Sampled_Profiles(self):
+    log = self.gauth.EnableSlowCallLog(threshold=60, logger=self.logger,
+                                       profile_operation='_GetList',
+                                       profile_every=2)
+    for _ in range(5):
+      self.drive.ListFile().GetList()
+    self.assertEqual(len(log.profiles), 2)
+    operation, stats = log.profiles[0]
+    self.assertEqual(operation, 'GoogleDriveFileList._GetList')
+    self.assertGreater(stats.total_calls, 0)
+    self.assertIn('Profile of', self.handler.records[0].getMessage())
+
+
+if __name__ == '__main__':
+  unittest.main()
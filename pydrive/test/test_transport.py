@@ -0,0 +1,111 @@
+import gzip
+import socket
+import threading
+import unittest
+
+from six.moves import BaseHTTPServer
+
+from pydrive.transport import Urllib3Transport
+
+CONTENT = b'0123456789' * 10000
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+  """Serves CONTENT, gzipped on /gzip if accepted, redirected on /redirect."""
+  protocol_version = 'HTTP/1.1'
+
+  def do_GET(self):
+    if self.path == '/redirect':
+      self.Respond(302, b'', {'Location': '/'})
+    elif self.path == '/gzip':
+      if 'gzip' in self.headers.get('Accept-Encoding', ''):
+        self.Respond(200, gzip.compress(CONTENT), {'Content-Encoding': 'gzip'})
+      else:
+        self.Respond(200, CONTENT)
+    elif self.path == '/slow':
+      threading.Event().wait(0.5)
+      self.Respond(200, CONTENT)
+    else:
+      self.Respond(200, CONTENT)
+
+  def do_POST(self):
+    body = self.rfile.read(int(self.headers['Content-Length']))
+    self.Respond(201, body[::-1], {'X-Method': 'POST'})
+
+  def Respond(self, status, body, headers=None):
+    self.send_response(status)
+    for name, value in (headers or {}).items():
+      self.send_header(name, value)
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, *args):
+    pass
+
+
+class Urllib3TransportTest(unittest.TestCase):
+  """Tests transport.Urllib3Transport against a local HTTP server."""
+
+  @classmethod
+  def setUpClass(cls):
+    cls.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), Handler)
+    cls.url = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+    cls.thread = threading.Thread(target=cls.server.serve_forever)
+    cls.thread.daemon = True
+    cls.thread.start()
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.server.shutdown()
+    cls.server.server_close()
+
+  def test_01_Get(self):
+    http = Urllib3Transport()()
+    resp, content = http.request(self.url + '/')
+    self.assertEqual(resp.status, 200)
+    self.assertEqual(resp['content-length'], str(len(CONTENT)))
+    self.assertEqual(content, CONTENT)
+
+  def test_02_Post(self):
+    http = Urllib3Transport()()
+    resp, content = http.request(self.url + '/', method='POST', body=b'abc',
+                                 headers={'content-type': 'text/plain'})
+    self.assertEqual(resp.status, 201)
+    self.assertEqual(resp['x-method'], 'POST')
+    self.assertEqual(content, b'cba')
+
+  def test_03_Redirect_And_Gzip(self):
+    http = Urllib3Transport()()
+    self.assertEqual(http.request(self.url + '/redirect')[1], CONTENT)
+    self.assertEqual(http.request(self.url + '/gzip')[1], CONTENT)
+
+  def test_04_Transfer_Stats(self):
+    transport = Urllib3Transport()
+    resp, content = transport().request(self.url + '/gzip')
+    self.assertEqual(content, CONTENT)
+    self.assertEqual(resp['-content-encoding'], 'gzip')
+    self.assertEqual(resp['content-length'], str(len(CONTENT)))
+    transport().request(self.url + '/gzip',
+                        headers={b'Accept-Encoding': b'identity'})
+    stats = transport.stats
+    self.assertEqual((stats.responses, stats.compressed_responses), (2, 1))
+    self.assertEqual(stats.decoded_bytes, 2 * len(CONTENT))
+    self.assertEqual(stats.wire_bytes,
+                     len(CONTENT) + len(gzip.compress(CONTENT)))
+    self.assertTrue(stats.compression_ratio > 1.5)
+
+  def test_05_Timeout(self):
+    http = Urllib3Transport()(timeout=0.1)
+    self.assertRaises(socket.timeout, http.request, self.url + '/slow')
+
+  def test_06_Shared_Pool(self):
+    transport = Urllib3Transport(pool_size=1)
+    for _ in range(3):
+      transport().request(self.url + '/')
+    pool = transport.pool_manager.connection_from_url(self.url)
+    self.assertEqual(pool.num_connections, 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
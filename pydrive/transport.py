@@ -0,0 +1,250 @@
+import errno
+import io
+import socket
+import threading
+import zlib
+
+try:
+  _ConnectionError = ConnectionError
+except NameError:  # Python 2 has no ConnectionError.
+  _ConnectionError = socket.error
+
+# Size of the blocks response bodies are read in.
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_REDIRECTS = 5
+# Content encodings Urllib3Http decompresses, with the zlib window bits to use.
+DECODERS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'x-gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+
+class TransferStats(object):
+  """Thread-safe counters of the response bytes received by a transport.
+
+  'wire_bytes' counts bytes as received over the network, compressed or not,
+  and 'decoded_bytes' counts them after decompression, so their ratio shows
+  the savings of compression.
+  """
+
+  def __init__(self):
+    self.responses = 0
+    self.compressed_responses = 0
+    self.wire_bytes = 0
+    self.decoded_bytes = 0
+    self._lock = threading.Lock()
+
+  def Record(self, wire_bytes, decoded_bytes, compressed):
+    """Counts a received response body.
+
+    :param wire_bytes: size of the body as received.
+    :type wire_bytes: int.
+    :param decoded_bytes: size of the body after decompression.
+    :type decoded_bytes: int.
+    :param compressed: Whether the body was compressed.
+    :type compressed: bool.
+    """
+    with self._lock:
+      self.responses += 1
+      self.compressed_responses += int(compressed)
+      self.wire_bytes += wire_bytes
+      self.decoded_bytes += decoded_bytes
+
+  @property
+  def compression_ratio(self):
+    """Returns decoded bytes per byte received, 1.0 if nothing was received.
+
+    :returns: float -- the compression ratio.
+    """
+    with self._lock:
+      if not self.wire_bytes:
+        return 1.0
+      return float(self.decoded_bytes) / self.wire_bytes
+
+
+class Urllib3Transport(object):
+  """Factory of httplib2.Http compatible objects using urllib3.
+
+  All objects created by one factory share a single urllib3 pool of
+  keep-alive connections, limited to 'pool_size' connections per host, and
+  count the bytes they receive in 'stats'.
+  Set an instance as GoogleAuth.http_factory to use it for every request:
+
+    gauth.http_factory = Urllib3Transport(pool_size=32)
+
+  Requires the urllib3 package.
+  """
+
+  def __init__(self, pool_size=10, block=True, num_pools=10,
+               pool_manager=None, stats=None):
+    """Create an instance of Urllib3Transport.
+
+    :param pool_size: maximum number of connections kept per host.
+    :type pool_size: int.
+    :param block: Whether requests wait for a free connection when all
+      'pool_size' connections of a host are in use, rather than opening
+      connections which are discarded afterwards.
+    :type block: bool.
+    :param num_pools: number of hosts to keep connections to.
+    :type num_pools: int.
+    :param pool_manager: pool to use instead of creating one.
+    :type pool_manager: urllib3.PoolManager
+    :param stats: counters to record received bytes in, new ones if not given.
+    :type stats: TransferStats
+    """
+    if pool_manager is None:
+      import urllib3
+      pool_manager = urllib3.PoolManager(num_pools=num_pools,
+                                         maxsize=pool_size, block=block)
+    self.pool_manager = pool_manager
+    self.stats = stats if stats is not None else TransferStats()
+
+  def __call__(self, timeout=None):
+    """Creates an http object using the shared pool.
+
+    :param timeout: socket timeout of connecting and reading, in seconds.
+    :type timeout: float.
+    :returns: Urllib3Http -- the http object.
+    """
+    return Urllib3Http(self.pool_manager, timeout=timeout, stats=self.stats)
+
+
+class Urllib3Http(object):
+  """httplib2.Http compatible object sending requests through urllib3.
+
+  Can be authorized by oauth2client credentials and used by
+  google-api-python-client in place of httplib2.Http. Like httplib2, it asks
+  for gzip compressed responses unless told otherwise, and decompresses them
+  transparently.
+  """
+
+  def __init__(self, pool_manager, timeout=None, stats=None):
+    """Create an instance of Urllib3Http.
+
+    :param pool_manager: the pool to take connections from.
+    :type pool_manager: urllib3.PoolManager
+    :param timeout: socket timeout of connecting and reading, in seconds.
+    :type timeout: float.
+    :param stats: counters to record received bytes in, if any.
+    :type stats: TransferStats
+    """
+    self.pool_manager = pool_manager
+    self.timeout = timeout
+    self.stats = stats
+
+  def request(self, uri, method='GET', body=None, headers=None,
+              redirections=DEFAULT_MAX_REDIRECTS, connection_type=None):
+    """Sends a request, with the signature of httplib2.Http.request().
+
+    The response body is read and decompressed in blocks of CHUNK_SIZE bytes,
+    and the connection is returned to the pool right after.
+
+    :returns: tuple -- httplib2.Response and content of the response.
+    :raises: socket.timeout, ConnectionError
+    """
+    import httplib2
+    import urllib3
+
+    headers = NormalizeHeaders(headers)
+    headers.setdefault('accept-encoding', 'gzip, deflate')
+    retries = urllib3.Retry(total=None, connect=0, read=0, status=0,
+                            redirect=redirections, raise_on_redirect=False)
+    try:
+      response = self.pool_manager.urlopen(
+          method, uri, body=body, headers=headers, retries=retries,
+          timeout=urllib3.Timeout(connect=self.timeout, read=self.timeout),
+          preload_content=False, decode_content=False)
+      info = dict((k.lower(), v) for k, v in response.headers.items())
+      try:
+        wire_bytes, content = _ReadBody(response, info)
+      finally:
+        response.release_conn()
+    except urllib3.exceptions.MaxRetryError as error:
+      raise _TranslateError(error.reason)
+    except urllib3.exceptions.HTTPError as error:
+      raise _TranslateError(error)
+    if self.stats is not None:
+      self.stats.Record(wire_bytes, len(content),
+                        '-content-encoding' in info)
+    info['status'] = str(response.status)
+    resp = httplib2.Response(info)
+    resp.reason = response.reason
+    return resp, content
+
+
+def NormalizeHeaders(headers):
+  """Returns headers with lower case str names and str values.
+
+  oauth2client passes header names and values as bytes on Python 3.
+
+  :param headers: the headers to normalize.
+  :type headers: dict.
+  :returns: dict -- the normalized headers.
+  """
+  normalized = {}
+  for name, value in (headers or {}).items():
+    if isinstance(name, bytes):
+      name = name.decode('latin-1')
+    if isinstance(value, bytes):
+      value = value.decode('latin-1')
+    normalized[name.lower()] = value
+  return normalized
+
+
+def _ReadBody(response, info):
+  """Reads and decompresses a response body block by block.
+
+  The body is still returned whole, as httplib2 returns it, but its blocks
+  are written to one buffer which becomes the returned body without being
+  copied, and decompressed blocks are at most CHUNK_SIZE bytes. Reading a
+  body thus takes little more memory than the body itself.
+
+  As httplib2 does, the 'content-encoding' header of a decompressed response
+  is renamed to '-content-encoding' and its 'content-length' is updated.
+
+  :returns: tuple -- number of bytes received and the decompressed body.
+  """
+  wbits = DECODERS.get(info.get('content-encoding', '').lower())
+  decoder = zlib.decompressobj(wbits) if wbits is not None else None
+  wire_bytes = 0
+  body = io.BytesIO()
+  for block in response.stream(CHUNK_SIZE, decode_content=False):
+    wire_bytes += len(block)
+    if decoder is None:
+      body.write(block)
+      continue
+    try:
+      _Decompress(decoder, block, body)
+    except zlib.error:
+      if wbits != zlib.MAX_WBITS or wire_bytes != len(block):
+        raise
+      # Some servers send raw deflate data without the zlib header.
+      decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+      _Decompress(decoder, block, body)
+  if decoder is not None:
+    body.write(decoder.flush())
+    info['-content-encoding'] = info.pop('content-encoding')
+  content = body.getvalue()
+  if decoder is not None:
+    info['content-length'] = str(len(content))
+  return wire_bytes, content
+
+
+def _Decompress(decoder, data, body):
+  """Decompresses data into body, CHUNK_SIZE bytes at a time."""
+  while data:
+    body.write(decoder.decompress(data, CHUNK_SIZE))
+    data = decoder.unconsumed_tail
+
+
+def _TranslateError(error):
+  """Translates a urllib3 error to the error httplib2 would raise."""
+  import urllib3
+
+  if isinstance(error, urllib3.exceptions.NewConnectionError):
+    # Connecting failed, so the request was not sent and may be retried.
+    return _ConnectionError(errno.ECONNREFUSED, str(error))
+  if isinstance(error, urllib3.exceptions.TimeoutError):
+    return socket.timeout(str(error))
+  return _ConnectionError(str(error))
@@ -17,4 +17,9 @@ setup(
         "oauth2client >= 4.0.0",
         "PyYAML >= 3.0",
     ],
+    extras_require={
+        "async": ["aiohttp >= 3.0; python_version >= '3.6'"],
+        "urllib3": ["urllib3 >= 1.24"],
+        "orjson": ["orjson >= 3.0"],
+    },
 )